@@ -1,10 +1,11 @@
 import sqlite3
 from datetime import datetime
+from config import DATABASE_PATH
 
-def inicializar_bd():
+def inicializar_bd(ruta_db=DATABASE_PATH):
     """Crea y configura las tablas con mejoras para alertas y presupuestos."""
     try:
-        conn = sqlite3.connect('SISTEMA_CONTABLE/DATOS/contabilidad.db')
+        conn = sqlite3.connect(ruta_db)
         cursor = conn.cursor()
 
         # --- Tabla de Clientes (sin cambios) ---
@@ -1,6 +1,7 @@
 
 import pandas as pd
 import sqlite3
+from config import DATABASE_PATH
 
 def leer_y_poblar_clientes(ruta_excel):
     """
@@ -10,7 +11,7 @@ def leer_y_poblar_clientes(ruta_excel):
     try:
         # Omitimos las primeras filas que no contienen datos de clientes
         df = pd.read_excel(ruta_excel, header=None, skiprows=6)
-        conn = sqlite3.connect('SISTEMA_CONTABLE/DATOS/contabilidad.db')
+        conn = sqlite3.connect(DATABASE_PATH)
         cursor = conn.cursor()
 
         grupo_familiar_actual = None
@@ -2,6 +2,7 @@
 import sqlite3
 import pandas as pd
 from datetime import datetime
+from config import DATABASE_PATH
 from .database import inicializar_bd
 from .lector_cobros import leer_y_poblar_clientes
 from .generador_cxc import generar_pdf_cxc
@@ -13,9 +14,11 @@ def obtener_siguiente_numero_cxc():
     # Por ahora, usaremos un número inicial basado en la fecha.
     return datetime.now().strftime("25-%H%M%S")
 
-def ejecutar_flujo_cxc():
+def ejecutar_flujo_cxc(progreso=None):
     """
     Orquesta el flujo completo del módulo de Cuentas por Cobro.
+    `progreso(fraccion, mensaje)` se llama antes de cada cliente.
+    Retorna las rutas de los PDF generados.
     """
     print("=============================================")
     print("INICIANDO MÓDULO DE CUENTAS POR COBRO (CXC)")
@@ -27,7 +30,7 @@ def ejecutar_flujo_cxc():
 
     # 2. Lógica principal: Obtener montos y generar archivos
     df_cobros = pd.read_excel('SISTEMA_CONTABLE/DATOS/SISTEMA_DE_COBROS.xlsx', header=None)
-    conn = sqlite3.connect('SISTEMA_CONTABLE/DATOS/contabilidad.db')
+    conn = sqlite3.connect(DATABASE_PATH)
     cursor = conn.cursor()
 
     # Obtenemos todos los clientes de la BD
@@ -36,7 +39,10 @@ def ejecutar_flujo_cxc():
 
     clientes_a_procesar = [c for c in todos_los_clientes if c[5] or c[4] is None] # Titulares o individuales
 
-    for cliente_db in clientes_a_procesar:
+    pdfs_generados = []
+    for numero, cliente_db in enumerate(clientes_a_procesar):
+        if progreso:
+            progreso(numero / len(clientes_a_procesar), f"Cliente {numero + 1} de {len(clientes_a_procesar)}")
         cliente_info = {
             'id': cliente_db[0],
             'nombre_completo': cliente_db[1],
@@ -79,6 +85,7 @@ def ejecutar_flujo_cxc():
         ruta_pdf = generar_pdf_cxc(cliente_info, valor_a_cobrar, numero_cxc)
 
         if ruta_pdf:
+            pdfs_generados.append(ruta_pdf)
             # Generar Correo
             cuenta_cobro_info = {'numero_cxc': numero_cxc}
             crear_correo_cxc(cliente_info, cuenta_cobro_info, ruta_pdf)
@@ -88,6 +95,7 @@ def ejecutar_flujo_cxc():
     print("\n=============================================")
     print("MÓDULO CXC FINALIZADO")
     print("=============================================")
+    return pdfs_generados
 
 if __name__ == '__main__':
     ejecutar_flujo_cxc()
@@ -1,187 +1,102 @@
 from flask import Flask, render_template, request, redirect, url_for, jsonify, flash, send_file
+from markupsafe import Markup, escape
+import os
+import sys
 import sqlite3
-from datetime import datetime, timedelta, date
+from datetime import datetime, date
 import json
 import io
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.chart import LineChart, BarChart, PieChart, Reference
 
+# Raíz del proyecto en el path para importar los módulos compartidos
+RAIZ_PROYECTO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if RAIZ_PROYECTO not in sys.path:
+    sys.path.insert(0, RAIZ_PROYECTO)
+
+import conexiones
+import perfilado
+import tendencias_fondo
+import trabajos_fondo
+from conexiones import get_db
+from cache_panel import (CacheVersionada, CacheFragmentos, CacheArchivos, registrar_cambio,
+                         respuesta_condicional, versiones)
+from SISTEMA_CONTABLE.NUCLEO.esquema_db import asegurar_esquema
+from SISTEMA_CONTABLE.NUCLEO.motor_alertas import clasificar_alertas, resumen_alertas
+from SISTEMA_CONTABLE.NUCLEO.motor_pagos import pagar_gastos
+from SISTEMA_CONTABLE.NUCLEO.motor_recurrencias import fecha_siguiente
+from SISTEMA_CONTABLE.NUCLEO.motor_flujo_caja import pronosticar_flujo
+from SISTEMA_CONTABLE.NUCLEO.motor_configuracion import configuracion
+from SISTEMA_CONTABLE.NUCLEO.motor_busqueda import buscar, MARCA_INICIO, MARCA_FIN
+from SISTEMA_CONTABLE.NUCLEO.motor_importacion import leer_archivo, importar_egresos
+from SISTEMA_CONTABLE.NUCLEO.motor_proyecciones import (proyeccion_recurrentes, resumir_por_mes,
+                                                        resumir_por_presupuesto)
+from exportar_excel import crear_reporte_mensual, crear_reporte_periodo, leer_periodo, version_datos_mes
+from config import (DATABASE_PATH, GASTOS_POR_PAGINA, GASTOS_POR_PAGINA_MAXIMO,
+                    IMPORTACION_MAX_MB, EXPORTACIONES_EN_CACHE)
+
 
 app = Flask(__name__)
 app.secret_key = 'tu_clave_secreta_aqui_cambiala'
-DATABASE = 'SISTEMA_CONTABLE/DATOS/contabilidad.db'
-
-def get_db():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+app.config['MAX_CONTENT_LENGTH'] = IMPORTACION_MAX_MB * 1024 * 1024
+DATABASE = DATABASE_PATH
 
-def actualizar_presupuestos_mes(mes, anio):
-    """Actualiza los montos gastados de todos los presupuestos del mes especificado."""
-    conn = get_db()
-    presupuestos = conn.execute('''
-        SELECT id, categoria, etiqueta FROM Presupuestos 
-        WHERE mes = ? AND anio = ?
-    ''', (mes, anio)).fetchall()
+def crear_app(ruta_db=DATABASE):
+    """
+    Prepara la app para servir: pool de conexiones, esquema y detección de
+    tendencias en segundo plano. Importar este módulo no abre la base de
+    datos ni lanza hilos; se llama una vez por proceso (los workers de
+    servidor_produccion.py la llaman después del fork).
+    """
+    if 'pool_conexiones' in app.extensions:
+        return app
     
-    for presupuesto in presupuestos:
-        resultado = conn.execute('''
-            SELECT COALESCE(SUM(monto), 0) as total
-            FROM Egresos
-            WHERE categoria = ? 
-            AND etiqueta = ? 
-            AND estado = 'Pagado'
-            AND strftime('%m', fecha_vencimiento) = ?
-            AND strftime('%Y', fecha_vencimiento) = ?
-        ''', (presupuesto['categoria'], presupuesto['etiqueta'], 
-              f"{mes:02d}", str(anio))).fetchone()
-        
-        monto_gastado = resultado['total']
-        conn.execute('UPDATE Presupuestos SET monto_gastado = ? WHERE id = ?', 
-                    (monto_gastado, presupuesto['id']))
+    # Pool de conexiones: una conexión por request, compartida por rutas y funciones auxiliares
+    conexiones.init_app(app, ruta_db)
     
-    conn.commit()
-    conn.close()
-
-def detectar_alertas_tendencias():
-    """Detecta tendencias de exceso en presupuestos (3 meses consecutivos >10%)"""
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
+    # Columnas anio/mes, índices y triggers de presupuestos (idempotente)
+    with app.app_context():
+        asegurar_esquema(get_db())
+        registrar_lentas = configuracion.obtener('CONSULTAS_LENTAS_UMBRAL_MS', get_db())
     
-    try:
-        # Obtener todas las categorías únicas de presupuestos
-        categorias = conn.execute('''
-            SELECT DISTINCT categoria, etiqueta 
-            FROM Presupuestos
-            WHERE monto_presupuestado > 0
-        ''').fetchall()
-        
-        mes_actual = datetime.now()
-        
-        for cat in categorias:
-            # Obtener últimos 3 meses de esta categoría
-            meses_analizar = []
-            for i in range(3):
-                fecha = mes_actual - timedelta(days=30*i)
-                mes = fecha.month
-                anio = fecha.year
-                
-                presupuesto = conn.execute('''
-                    SELECT * FROM Presupuestos 
-                    WHERE categoria = ? AND etiqueta = ? 
-                    AND mes = ? AND anio = ?
-                ''', (cat['categoria'], cat['etiqueta'], mes, anio)).fetchone()
-                
-                if presupuesto and presupuesto['monto_presupuestado'] > 0:
-                    porcentaje = (presupuesto['monto_gastado'] / presupuesto['monto_presupuestado']) * 100
-                    meses_analizar.append({
-                        'mes': mes,
-                        'anio': anio,
-                        'porcentaje': porcentaje,
-                        'exceso': porcentaje - 100 if porcentaje > 100 else 0,
-                        'presupuestado': presupuesto['monto_presupuestado'],
-                        'gastado': presupuesto['monto_gastado']
-                    })
-            
-            # Verificar si hay 3 meses consecutivos con exceso >10%
-            if len(meses_analizar) == 3:
-                todos_exceden = all(m['porcentaje'] > 110 for m in meses_analizar)
-                
-                if todos_exceden:
-                    promedio_presupuestado = sum(m['presupuestado'] for m in meses_analizar) / 3
-                    promedio_gastado = sum(m['gastado'] for m in meses_analizar) / 3
-                    porcentaje_exceso = ((promedio_gastado - promedio_presupuestado) / promedio_presupuestado) * 100
-                    
-                    # Verificar si ya existe esta alerta
-                    existe = conn.execute('''
-                        SELECT id FROM AlertasTendencias 
-                        WHERE categoria = ? AND etiqueta = ? AND activa = 1
-                    ''', (cat['categoria'], cat['etiqueta'])).fetchone()
-                    
-                    if not existe:
-                        conn.execute('''
-                            INSERT INTO AlertasTendencias 
-                            (categoria, etiqueta, tipo_tendencia, meses_consecutivos, 
-                             porcentaje_exceso, promedio_presupuestado, promedio_gastado)
-                            VALUES (?, ?, 'EXCESO', 3, ?, ?, ?)
-                        ''', (cat['categoria'], cat['etiqueta'], porcentaje_exceso, 
-                              promedio_presupuestado, promedio_gastado))
-                        conn.commit()
-        
-        conn.close()
-    except Exception as e:
-        print(f"Error en detectar_alertas_tendencias: {e}")
-        conn.close()
+    # Las cachés leen la versión de las tablas de la base (VersionesTablas)
+    versiones.usar_base(get_db)
+    
+    # Alertas de tendencias: se recalculan en segundo plano tras cada escritura
+    tendencias_fondo.init_app(app)
+    
+    # Exportaciones largas en un pool de procesos, con progreso en la tabla TrabajosExportacion
+    trabajos_fondo.init_app(app)
+    
+    # Tiempos por ruta, conteo de SQL y registro de consultas lentas (ver perfilado.py)
+    if perfilado.activo() or registrar_lentas:
+        perfilado.init_app(app)
+    return app
+
+# Datos del dashboard: se recalculan solo si cambian estas tablas o cambia el día
+cache_dashboard = CacheVersionada('dashboard', (
+    'Configuracion', 'Egresos', 'Presupuestos', 'Tareas', 'AlertasTendencias'
+))
+
+# Bloques de dashboard.html y presupuestos.html ya renderizados, cada uno
+# con sus tablas: {% call fragmento('nombre', 'Tabla', ...) %}
+cache_fragmentos = CacheFragmentos()
+
+@app.template_global()
+def fragmento(nombre, *tablas, variante=(), caller=None):
+    # ?sin_cache=1 también vuelve a renderizar los fragmentos
+    usar_cache = request.args.get('sin_cache') != '1'
+    return Markup(cache_fragmentos.renderizar(nombre, tablas, caller, variante, usar_cache))
 
 # ===============================================
 # DASHBOARD PRINCIPAL
 # ===============================================
 
-@app.route('/')
-def dashboard():
-    conn = get_db()
-    today = date.today()
-    
-    config = dict(conn.execute('SELECT clave, valor FROM Configuracion').fetchall())
-    dias_anticipada = int(config.get('dias_alerta_anticipada', 7))
-    dias_critica = int(config.get('dias_alerta_critica', 3))
-    
-    alertas = {
-        'vencidos': [], 'hoy': [], 'criticos': [], 
-        'importantes': [], 'normales': [], 'descuentos_por_vencer': []
-    }
-    
-    query = """
-        SELECT id, descripcion, monto, fecha_vencimiento, categoria, etiqueta,
-               tiene_descuento, fecha_limite_descuento, porcentaje_descuento, monto_descuento
-        FROM Egresos
-        WHERE estado = 'Pendiente' 
-        AND date(fecha_vencimiento) <= date('now', '+30 days')
-        ORDER BY fecha_vencimiento ASC
-    """
-    gastos_pendientes = conn.execute(query).fetchall()
-    
-    for gasto in gastos_pendientes:
-        fecha_venc = datetime.strptime(gasto['fecha_vencimiento'], '%Y-%m-%d').date()
-        dias_restantes = (fecha_venc - today).days
-        
-        descuento_perdido = 0
-        if gasto['tiene_descuento'] and gasto['fecha_limite_descuento']:
-            fecha_desc = datetime.strptime(gasto['fecha_limite_descuento'], '%Y-%m-%d').date()
-            dias_descuento = (fecha_desc - today).days
-            if dias_descuento < 0:
-                descuento_perdido = gasto['monto_descuento']
-        
-        alerta_obj = {
-            'id': gasto['id'], 'descripcion': gasto['descripcion'],
-            'monto': gasto['monto'], 'categoria': gasto['categoria'],
-            'etiqueta': gasto['etiqueta'], 'fecha_vencimiento': fecha_venc.strftime('%Y-%m-%d'),
-            'dias_restantes': dias_restantes, 'descuento_perdido': descuento_perdido,
-            'tiene_descuento': gasto['tiene_descuento'],
-            'fecha_limite_descuento': gasto['fecha_limite_descuento']
-        }
-        
-        if dias_restantes < 0:
-            alertas['vencidos'].append(alerta_obj)
-        elif dias_restantes == 0:
-            alertas['hoy'].append(alerta_obj)
-        elif dias_restantes <= dias_critica:
-            alertas['criticos'].append(alerta_obj)
-        elif dias_restantes <= dias_anticipada:
-            alertas['importantes'].append(alerta_obj)
-        else:
-            alertas['normales'].append(alerta_obj)
-        
-        if gasto['tiene_descuento'] and gasto['fecha_limite_descuento']:
-            fecha_desc = datetime.strptime(gasto['fecha_limite_descuento'], '%Y-%m-%d').date()
-            dias_desc = (fecha_desc - today).days
-            if 0 <= dias_desc <= 3:
-                alertas['descuentos_por_vencer'].append({
-                    **alerta_obj,
-                    'dias_restantes_descuento': dias_desc,
-                    'monto_ahorro': gasto['monto_descuento']
-                })
+def calcular_dashboard(conn, today):
+    """Ejecuta las consultas del dashboard y retorna los datos para la plantilla"""
+    # Gastos pendientes clasificados por días restantes (NUCLEO/motor_alertas.py)
+    alertas = clasificar_alertas(conn, today)
     
     mes_actual = today.month
     anio_actual = today.year
@@ -191,10 +106,10 @@ def dashboard():
                SUM(CASE WHEN estado = 'Pagado' THEN monto ELSE 0 END) as pagado,
                SUM(CASE WHEN estado = 'Pendiente' THEN monto ELSE 0 END) as pendiente
         FROM Egresos
-        WHERE strftime('%m', fecha_vencimiento) = ? AND strftime('%Y', fecha_vencimiento) = ?
+        WHERE anio = ? AND mes = ?
         GROUP BY etiqueta
     """
-    stats = conn.execute(stats_query, (f"{mes_actual:02d}", str(anio_actual))).fetchall()
+    stats = conn.execute(stats_query, (anio_actual, mes_actual)).fetchall()
     total_pendiente_mes = sum([s['pendiente'] for s in stats])
     
     presupuestos_excedidos = conn.execute('''
@@ -222,67 +137,194 @@ def dashboard():
     alertas_tendencias = conn.execute('''
         SELECT * FROM AlertasTendencias
         WHERE activa = 1
-        ORDER BY severidad DESC, fecha_deteccion DESC
+        ORDER BY 
+            CASE severidad 
+                WHEN 'Alta' THEN 1 
+                WHEN 'Media' THEN 2 
+                ELSE 3 
+            END,
+            fecha_deteccion DESC
         LIMIT 5
     ''').fetchall()
     
-    conn.close()
+    # Próximas ocurrencias de los gastos recurrentes (proyectadas, no existen en Egresos)
+    proyeccion = proyeccion_recurrentes.proyectar(conn, hoy=today)
+    
+    # Saldo de caja pronosticado a 30/60/90 días contra flujo_minimo_caja
+    flujo_caja = pronosticar_flujo(conn, hoy=today)
+    
+    return {
+        'alertas': alertas, 'stats': stats,
+        'flujo_caja': flujo_caja,
+        'proyeccion_meses': resumir_por_mes(proyeccion),
+        'proximos_recurrentes': proyeccion[:8],
+        'total_pendiente_mes': total_pendiente_mes,
+        'presupuestos_excedidos': presupuestos_excedidos,
+        'tareas_urgentes': tareas_urgentes,
+        'alertas_tendencias': alertas_tendencias
+    }
+
+@app.route('/')
+def dashboard():
+    today = date.today()
+    # ?sin_cache=1 recalcula siempre (útil para depurar)
+    usar_cache = request.args.get('sin_cache') != '1'
+    datos = cache_dashboard.obtener(lambda: calcular_dashboard(get_db(), today), usar_cache)
     
-    return render_template('dashboard.html', 
-                         alertas=alertas, stats=stats,
-                         total_pendiente_mes=total_pendiente_mes,
-                         presupuestos_excedidos=presupuestos_excedidos,
-                         tareas_urgentes=tareas_urgentes,
-                         alertas_tendencias=alertas_tendencias,
+    return render_template('dashboard.html', **datos,
                          fecha_actual=today.strftime('%d de %B de %Y'))
 
 # ===============================================
 # GESTIÓN DE GASTOS
 # ===============================================
 
-@app.route('/gastos')
-def gestion_gastos():
-    conn = get_db()
-    filtro_etiqueta = request.args.get('etiqueta', 'TODOS')
-    filtro_estado = request.args.get('estado', 'TODOS')
-    filtro_mes = request.args.get('mes', datetime.now().strftime('%Y-%m'))
+def filtros_gastos(args):
+    """
+    Lee los filtros del listado de gastos y arma el WHERE común
+    para la página, los totales y la API.
+    Retorna (filtros, condiciones, params).
+    """
+    filtro_etiqueta = args.get('etiqueta', 'TODOS')
+    filtro_estado = args.get('estado', 'TODOS')
+    filtro_mes = args.get('mes', datetime.now().strftime('%Y-%m'))
     
-    query = 'SELECT * FROM Egresos WHERE 1=1'
+    condiciones = []
     params = []
     
     if filtro_etiqueta != 'TODOS':
-        query += ' AND etiqueta = ?'
+        condiciones.append('etiqueta = ?')
         params.append(filtro_etiqueta)
     
     if filtro_estado != 'TODOS':
-        query += ' AND estado = ?'
+        condiciones.append('estado = ?')
         params.append(filtro_estado)
     
     if filtro_mes != 'TODOS':
-        query += " AND strftime('%Y-%m', fecha_vencimiento) = ?"
-        params.append(filtro_mes)
-    
-    query += ' ORDER BY fecha_vencimiento DESC'
-    gastos = conn.execute(query, params).fetchall()
+        try:
+            anio_filtro, mes_filtro = (int(parte) for parte in filtro_mes.split('-'))
+        except ValueError:
+            filtro_mes = datetime.now().strftime('%Y-%m')
+            anio_filtro, mes_filtro = datetime.now().year, datetime.now().month
+        condiciones.append('anio = ? AND mes = ?')
+        params.extend([anio_filtro, mes_filtro])
+    
+    filtros = {'etiqueta': filtro_etiqueta, 'estado': filtro_estado, 'mes': filtro_mes}
+    return filtros, condiciones, params
+
+def tamano_pagina_gastos(args):
+    """Tamaño de página pedido con ?por_pagina=, acotado a GASTOS_POR_PAGINA_MAXIMO"""
+    try:
+        por_pagina = int(args.get('por_pagina', GASTOS_POR_PAGINA))
+    except ValueError:
+        por_pagina = GASTOS_POR_PAGINA
+    return max(1, min(por_pagina, GASTOS_POR_PAGINA_MAXIMO))
+
+def consultar_pagina_gastos(conn, args):
+    """
+    Una página del listado de gastos, ordenado por (fecha_vencimiento, id)
+    descendente, con los gastos sin fecha al final. Paginación por cursor:
+    la página siguiente empieza después de ?despues_fecha=&despues_id= (el
+    último gasto mostrado; ?despues_sin_fecha=1 si no tenía fecha), así no
+    se recorren las filas anteriores como con OFFSET.
+    Los totales salen de una sola consulta agregada sobre todos los filtros.
+    """
+    filtros, condiciones, params = filtros_gastos(args)
+    por_pagina = tamano_pagina_gastos(args)
+    where = ' AND '.join(condiciones) or '1=1'
+    
+    totales = conn.execute(f'''
+        SELECT COUNT(*) as cantidad,
+               COALESCE(SUM(monto), 0) as total_general,
+               COALESCE(SUM(CASE WHEN estado = 'Pendiente' THEN monto ELSE 0 END), 0) as total_pendiente,
+               COALESCE(SUM(CASE WHEN estado = 'Pagado' THEN monto ELSE 0 END), 0) as total_pagado
+        FROM Egresos
+        WHERE {where}
+    ''', params).fetchone()
+    
+    despues_fecha = args.get('despues_fecha')
+    despues_sin_fecha = args.get('despues_sin_fecha') == '1'
+    despues_id = args.get('despues_id', type=int)
+    params_pagina = list(params)
+    if despues_id is not None and despues_sin_fecha:
+        # El cursor está entre los gastos sin fecha: solo quedan los de id menor
+        where += ' AND fecha_vencimiento IS NULL AND id < ?'
+        params_pagina.append(despues_id)
+    elif despues_id is not None and despues_fecha:
+        where += (' AND (fecha_vencimiento IS NULL OR fecha_vencimiento < ?'
+                  ' OR (fecha_vencimiento = ? AND id < ?))')
+        params_pagina.extend([despues_fecha, despues_fecha, despues_id])
+    else:
+        despues_id = None
+    
+    # Se pide una fila de más para saber si hay página siguiente.
+    # NULLS LAST es el orden de DESC en SQLite; explícito porque el cursor depende de él
+    gastos = conn.execute(f'''
+        SELECT * FROM Egresos
+        WHERE {where}
+        ORDER BY fecha_vencimiento DESC NULLS LAST, id DESC
+        LIMIT ?
+    ''', params_pagina + [por_pagina + 1]).fetchall()
+    
+    siguiente = None
+    if len(gastos) > por_pagina:
+        gastos = gastos[:por_pagina]
+        ultimo = gastos[-1]
+        if ultimo['fecha_vencimiento'] is None:
+            siguiente = {'despues_sin_fecha': 1, 'despues_id': ultimo['id']}
+        else:
+            siguiente = {'despues_fecha': ultimo['fecha_vencimiento'], 'despues_id': ultimo['id']}
+    
+    return {
+        'gastos': gastos,
+        'totales': totales,
+        'filtros': filtros,
+        'por_pagina': por_pagina,
+        'es_primera_pagina': despues_id is None,
+        'siguiente': siguiente
+    }
+
+@app.route('/gastos')
+def gestion_gastos():
+    conn = get_db()
+    pagina = consultar_pagina_gastos(conn, request.args)
+    filtros = pagina['filtros']
     
-    total_general = sum([g['monto'] for g in gastos])
-    total_pendiente = sum([g['monto'] for g in gastos if g['estado'] == 'Pendiente'])
-    total_pagado = sum([g['monto'] for g in gastos if g['estado'] == 'Pagado'])
+    # Enlace a la página siguiente conservando los filtros
+    url_siguiente = None
+    if pagina['siguiente']:
+        url_siguiente = url_for('gestion_gastos', **filtros, por_pagina=pagina['por_pagina'],
+                                **pagina['siguiente'])
     
     # Obtener categorías activas para el formulario
     categorias = conn.execute('SELECT nombre FROM Categorias WHERE activa = 1 ORDER BY orden').fetchall()
     
-    conn.close()
-    
-    return render_template('gastos.html', gastos=gastos,
-                         total_general=total_general,
-                         total_pendiente=total_pendiente,
-                         total_pagado=total_pagado,
-                         filtro_etiqueta=filtro_etiqueta,
-                         filtro_estado=filtro_estado,
-                         filtro_mes=filtro_mes,
+    return render_template('gastos.html', gastos=pagina['gastos'],
+                         total_general=pagina['totales']['total_general'],
+                         total_pendiente=pagina['totales']['total_pendiente'],
+                         total_pagado=pagina['totales']['total_pagado'],
+                         cantidad_total=pagina['totales']['cantidad'],
+                         filtro_etiqueta=filtros['etiqueta'],
+                         filtro_estado=filtros['estado'],
+                         filtro_mes=filtros['mes'],
+                         es_primera_pagina=pagina['es_primera_pagina'],
+                         url_primera=url_for('gestion_gastos', **filtros),
+                         url_siguiente=url_siguiente,
                          categorias=categorias)
 
+@app.route('/api/gastos')
+@respuesta_condicional('Egresos')
+def api_gastos():
+    """Misma consulta que /gastos en JSON, para cargar la tabla página por página"""
+    pagina = consultar_pagina_gastos(get_db(), request.args)
+    
+    return jsonify({
+        'gastos': [dict(g) for g in pagina['gastos']],
+        'totales': dict(pagina['totales']),
+        'filtros': pagina['filtros'],
+        'por_pagina': pagina['por_pagina'],
+        'siguiente': pagina['siguiente']
+    })
+
 @app.route('/gasto', methods=['POST'])
 def anadir_gasto():
     descripcion = request.form['descripcion']
@@ -299,20 +341,21 @@ def anadir_gasto():
     
     es_recurrente = 1 if request.form.get('es_recurrente') else 0
     frecuencia = request.form.get('frecuencia') if es_recurrente else None
+    proximo_vencimiento = fecha_siguiente(fecha_vencimiento, frecuencia) if es_recurrente else None
     
     conn = get_db()
     conn.execute('''
         INSERT INTO Egresos (
             descripcion, monto, fecha_vencimiento, categoria, etiqueta,
             tiene_descuento, fecha_limite_descuento, porcentaje_descuento, monto_descuento,
-            es_recurrente, frecuencia
+            es_recurrente, frecuencia, proximo_vencimiento
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
     ''', (descripcion, monto, fecha_vencimiento, categoria, etiqueta,
           tiene_descuento, fecha_limite_descuento, porcentaje_descuento, monto_descuento,
-          es_recurrente, frecuencia))
+          es_recurrente, frecuencia, proximo_vencimiento))
     conn.commit()
-    conn.close()
+    registrar_cambio('Egresos', 'Presupuestos')
     
     flash(f'✅ Gasto "{descripcion}" añadido correctamente', 'success')
     return redirect(url_for('gestion_gastos'))
@@ -321,58 +364,103 @@ def anadir_gasto():
 def pagar_gasto(gasto_id):
     usuario = request.form.get('usuario', 'Usuario Anónimo')
     conn = get_db()
-    gasto = conn.execute('SELECT * FROM Egresos WHERE id = ?', (gasto_id,)).fetchone()
+    gasto = conn.execute('SELECT id FROM Egresos WHERE id = ?', (gasto_id,)).fetchone()
     
     if not gasto:
         flash('❌ Gasto no encontrado', 'error')
         return redirect(url_for('gestion_gastos'))
     
-    fecha_venc = datetime.strptime(gasto['fecha_vencimiento'], '%Y-%m-%d')
-    mes, anio = fecha_venc.month, fecha_venc.year
+    resultado = pagar_gastos(conn, [gasto_id], usuario)
+    registrar_cambio('Egresos', 'Presupuestos')
     
-    conn.execute("UPDATE Egresos SET estado = 'Pagado', fecha_pago = CURRENT_TIMESTAMP, usuario_que_pago = ? WHERE id = ?", 
-                (usuario, gasto_id))
-    conn.commit()
-    conn.close()
-    
-    actualizar_presupuestos_mes(mes, anio)
-    
-    if gasto['es_recurrente']:
-        from dateutil.relativedelta import relativedelta
-        freq_map = {'Mensual': 1, 'Trimestral': 3, 'Semestral': 6, 'Anual': 12}
-        meses = freq_map.get(gasto['frecuencia'], 1)
-        proxima_fecha = fecha_venc + relativedelta(months=meses)
-        
-        fecha_limite_desc = None
-        if gasto['tiene_descuento'] and gasto['fecha_limite_descuento']:
-            fecha_desc_original = datetime.strptime(gasto['fecha_limite_descuento'], '%Y-%m-%d')
-            dias_diferencia = (fecha_venc - fecha_desc_original).days
-            fecha_limite_desc = proxima_fecha - relativedelta(days=dias_diferencia)
-        
-        conn = get_db()
-        conn.execute('''
-            INSERT INTO Egresos (descripcion, monto, fecha_vencimiento, categoria, etiqueta,
-                                tiene_descuento, fecha_limite_descuento, porcentaje_descuento, monto_descuento,
-                                es_recurrente, frecuencia)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (gasto['descripcion'], gasto['monto'], proxima_fecha.strftime('%Y-%m-%d'),
-              gasto['categoria'], gasto['etiqueta'], gasto['tiene_descuento'],
-              fecha_limite_desc.strftime('%Y-%m-%d') if fecha_limite_desc else None,
-              gasto['porcentaje_descuento'], gasto['monto_descuento'], 1, gasto['frecuencia']))
-        conn.commit()
-        conn.close()
-        flash(f'✅ Gasto pagado. Próximo vencimiento: {proxima_fecha.strftime("%Y-%m-%d")}', 'success')
+    if not resultado['pagados']:
+        flash('⚠️ Este gasto ya estaba pagado', 'warning')
+    elif resultado['siguientes']:
+        proxima_fecha = resultado['siguientes'][0]['fecha_vencimiento']
+        flash(f'✅ Gasto pagado. Próximo vencimiento: {proxima_fecha}', 'success')
     else:
         flash('✅ Gasto pagado. Presupuestos actualizados.', 'success')
     
     return redirect(url_for('gestion_gastos'))
 
+@app.route('/api/gastos/pagar', methods=['POST'])
+def api_pagar_gastos():
+    """
+    Pago masivo: recibe {"ids": [...], "usuario": "..."} en JSON (o campos
+    de formulario ids/usuario) y paga todos en una sola transacción
+    """
+    datos = request.get_json(silent=True)
+    if datos is not None and not isinstance(datos, dict):
+        return jsonify({'error': 'El cuerpo JSON debe ser un objeto con ids y usuario'}), 400
+    datos = datos or {}
+    ids = datos.get('ids') or request.form.getlist('ids')
+    usuario = datos.get('usuario') or request.form.get('usuario', 'Usuario Anónimo')
+    
+    if not isinstance(ids, list) or not ids:
+        return jsonify({'error': 'Se requiere una lista de ids'}), 400
+    try:
+        ids = [int(gasto_id) for gasto_id in ids]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Los ids deben ser números enteros'}), 400
+    
+    resultado = pagar_gastos(get_db(), ids, usuario)
+    if resultado['pagados']:
+        registrar_cambio('Egresos', 'Presupuestos')
+    
+    return jsonify(resultado)
+
+def importar_archivo_subido():
+    """
+    Importa el archivo del campo 'archivo' del formulario.
+    Retorna (resultado, None) o (None, mensaje de error).
+    """
+    archivo = request.files.get('archivo')
+    if not archivo or not archivo.filename:
+        return None, 'Se requiere un archivo .csv o .xlsx'
+    
+    try:
+        filas = leer_archivo(archivo.stream, archivo.filename, request.form.get('hoja') or None)
+        resultado = importar_egresos(get_db(), filas,
+                                     simular=bool(request.form.get('simular')),
+                                     categoria_defecto=request.form.get('categoria') or None)
+    except ValueError as e:
+        # Formato no soportado, columnas faltantes, hoja inexistente o archivo ilegible
+        return None, str(e)
+    
+    if resultado['insertadas'] and not request.form.get('simular'):
+        registrar_cambio('Egresos', 'Presupuestos')
+    return resultado, None
+
+@app.route('/gastos/importar', methods=['POST'])
+def importar_gastos():
+    resultado, error = importar_archivo_subido()
+    if error:
+        flash(f'❌ No se pudo importar: {error}', 'error')
+        return redirect(url_for('gestion_gastos'))
+    
+    flash(f"📥 Importación: {resultado['insertadas']} insertados, "
+          f"{resultado['omitidas']} ya existían, {resultado['rechazadas']} rechazados "
+          f"({resultado['filas_por_segundo']:,} filas/s)",
+          'success' if not resultado['rechazadas'] else 'warning')
+    for error_fila in resultado['errores'][:5]:
+        flash(f"⚠️ Fila {error_fila['fila']}: {error_fila['motivo']}", 'warning')
+    return redirect(url_for('gestion_gastos'))
+
+@app.route('/api/gastos/importar', methods=['POST'])
+def api_importar_gastos():
+    """Importación masiva (multipart: archivo, hoja, categoria, simular); responde el resumen en JSON"""
+    resultado, error = importar_archivo_subido()
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify(resultado)
+
 @app.route('/gasto/eliminar/<int:gasto_id>', methods=['POST'])
 def eliminar_gasto(gasto_id):
     conn = get_db()
     conn.execute("DELETE FROM Egresos WHERE id = ?", (gasto_id,))
     conn.commit()
-    conn.close()
+    registrar_cambio('Egresos', 'Presupuestos')
+    proyeccion_recurrentes.invalidar(gasto_id)
     flash('🗑️ Gasto eliminado', 'warning')
     return redirect(url_for('gestion_gastos'))
 
@@ -381,7 +469,6 @@ def editar_gasto_form(gasto_id):
     conn = get_db()
     gasto = conn.execute('SELECT * FROM Egresos WHERE id = ?', (gasto_id,)).fetchone()
     categorias = conn.execute('SELECT nombre FROM Categorias WHERE activa = 1 ORDER BY orden').fetchall()
-    conn.close()
     
     if not gasto:
         flash('❌ Gasto no encontrado', 'error')
@@ -405,18 +492,21 @@ def editar_gasto(gasto_id):
     
     es_recurrente = 1 if request.form.get('es_recurrente') else 0
     frecuencia = request.form.get('frecuencia') if es_recurrente else None
+    proximo_vencimiento = fecha_siguiente(fecha_vencimiento, frecuencia) if es_recurrente else None
     
     conn = get_db()
     conn.execute('''
         UPDATE Egresos SET descripcion = ?, monto = ?, fecha_vencimiento = ?, 
         categoria = ?, etiqueta = ?, tiene_descuento = ?, fecha_limite_descuento = ?,
-        porcentaje_descuento = ?, monto_descuento = ?, es_recurrente = ?, frecuencia = ?
+        porcentaje_descuento = ?, monto_descuento = ?, es_recurrente = ?, frecuencia = ?,
+        proximo_vencimiento = ?
         WHERE id = ?
     ''', (descripcion, monto, fecha_vencimiento, categoria, etiqueta,
           tiene_descuento, fecha_limite_descuento, porcentaje_descuento, monto_descuento,
-          es_recurrente, frecuencia, gasto_id))
+          es_recurrente, frecuencia, proximo_vencimiento, gasto_id))
     conn.commit()
-    conn.close()
+    registrar_cambio('Egresos', 'Presupuestos')
+    proyeccion_recurrentes.invalidar(gasto_id)
     
     flash('✅ Gasto actualizado correctamente', 'success')
     return redirect(url_for('gestion_gastos'))
@@ -434,9 +524,7 @@ def presupuestos():
     # Pestaña activa
     tab = request.args.get('tab', 'mes_actual')
     
-    # Actualizar presupuestos antes de mostrar
-    actualizar_presupuestos_mes(mes_actual, anio_actual)
-    detectar_alertas_tendencias()
+    # Solo lectura: monto_gastado lo mantienen los triggers de Egresos
     
     # Presupuestos del mes actual
     presupuestos_mes = conn.execute('''
@@ -449,11 +537,11 @@ def presupuestos():
     gastos_reales = conn.execute('''
         SELECT categoria, etiqueta, SUM(monto) as total
         FROM Egresos
-        WHERE strftime('%m', fecha_vencimiento) = ? 
-        AND strftime('%Y', fecha_vencimiento) = ?
+        WHERE anio = ? 
+        AND mes = ?
         AND estado = 'Pagado'
         GROUP BY categoria, etiqueta
-    ''', (f"{mes_actual:02d}", str(anio_actual))).fetchall()
+    ''', (anio_actual, mes_actual)).fetchall()
     
     # Templates activos
     templates = conn.execute('''
@@ -472,13 +560,21 @@ def presupuestos():
     alertas_tendencias = conn.execute('''
         SELECT * FROM AlertasTendencias
         WHERE activa = 1
-        ORDER BY severidad DESC, fecha_deteccion DESC
+        ORDER BY 
+            CASE severidad 
+                WHEN 'Alta' THEN 1 
+                WHEN 'Media' THEN 2 
+                ELSE 3 
+            END,
+            fecha_deteccion DESC
     ''').fetchall()
     
-    conn.close()
+    # Compromisos de los gastos recurrentes en los próximos meses (proyectados)
+    compromisos_recurrentes = resumir_por_presupuesto(conn, proyeccion_recurrentes.proyectar(conn))
     
     return render_template('presupuestos.html',
                             presupuestos=presupuestos_mes,
+                            compromisos_recurrentes=compromisos_recurrentes,
                             gastos_reales=gastos_reales,
                             templates=templates,
                             categorias=categorias,
@@ -503,8 +599,8 @@ def crear_presupuesto():
             SELECT COALESCE(SUM(monto), 0) as total
             FROM Egresos
             WHERE categoria = ? AND etiqueta = ? AND estado = 'Pagado'
-            AND strftime('%m', fecha_vencimiento) = ? AND strftime('%Y', fecha_vencimiento) = ?
-        ''', (categoria, etiqueta, f"{mes:02d}", str(anio))).fetchone()
+            AND anio = ? AND mes = ?
+        ''', (categoria, etiqueta, anio, mes)).fetchone()
         
         monto_gastado = resultado['total']
         
@@ -513,12 +609,11 @@ def crear_presupuesto():
             VALUES (?, ?, ?, ?, ?, ?)
         ''', (mes, anio, categoria, etiqueta, monto_presupuestado, monto_gastado))
         conn.commit()
+        registrar_cambio('Presupuestos')
         flash(f'✅ Presupuesto creado. Gastado: ${monto_gastado:,.0f} de ${monto_presupuestado:,.0f}', 'success')
     except sqlite3.IntegrityError:
         flash('⚠️ Ya existe un presupuesto para esa categoría en ese mes', 'warning')
-    finally:
-        conn.close()
-    
+
     return redirect(url_for('presupuestos'))
 
 @app.route('/presupuesto/editar/<int:presupuesto_id>', methods=['GET'])
@@ -526,7 +621,6 @@ def editar_presupuesto_form(presupuesto_id):
     conn = get_db()
     presupuesto = conn.execute('SELECT * FROM Presupuestos WHERE id = ?', (presupuesto_id,)).fetchone()
     categorias = conn.execute('SELECT nombre FROM Categorias WHERE activa = 1 ORDER BY orden').fetchall()
-    conn.close()
     
     if not presupuesto:
         flash('❌ Presupuesto no encontrado', 'error')
@@ -553,7 +647,7 @@ def editar_presupuesto(presupuesto_id):
     conn.execute('UPDATE Presupuestos SET monto_presupuestado = ? WHERE id = ?', 
                 (monto_presupuestado, presupuesto_id))
     conn.commit()
-    conn.close()
+    registrar_cambio('Presupuestos')
     
     flash('✅ Presupuesto actualizado correctamente', 'success')
     return redirect(url_for('presupuestos'))
@@ -577,7 +671,7 @@ def eliminar_presupuesto(presupuesto_id):
     
     conn.execute('DELETE FROM Presupuestos WHERE id = ?', (presupuesto_id,))
     conn.commit()
-    conn.close()
+    registrar_cambio('Presupuestos')
     
     flash('🗑️ Presupuesto eliminado correctamente', 'success')
     return redirect(url_for('presupuestos'))
@@ -611,12 +705,11 @@ def crear_template():
             VALUES (?, ?, ?, ?, ?, ?, ?)
         ''', (categoria, etiqueta, monto_base, monto_febrero, monto_junio, monto_diciembre, observaciones))
         conn.commit()
+        registrar_cambio('PresupuestosTemplates')
         flash('✅ Template creado correctamente', 'success')
     except sqlite3.IntegrityError:
         flash('⚠️ Ya existe un template para esa categoría y etiqueta', 'warning')
-    finally:
-        conn.close()
-    
+
     return redirect(url_for('presupuestos', tab='templates'))
 
 @app.route('/template/editar/<int:template_id>', methods=['GET'])
@@ -624,7 +717,6 @@ def editar_template_form(template_id):
     conn = get_db()
     template = conn.execute('SELECT * FROM PresupuestosTemplates WHERE id = ?', (template_id,)).fetchone()
     categorias = conn.execute('SELECT nombre FROM Categorias WHERE activa = 1 ORDER BY orden').fetchall()
-    conn.close()
     
     if not template:
         flash('❌ Template no encontrado', 'error')
@@ -654,7 +746,7 @@ def editar_template(template_id):
         WHERE id = ?
     ''', (monto_base, monto_febrero, monto_junio, monto_diciembre, observaciones, template_id))
     conn.commit()
-    conn.close()
+    registrar_cambio('PresupuestosTemplates')
     
     flash('✅ Template actualizado. Los cambios se aplicarán desde el próximo mes.', 'success')
     return redirect(url_for('presupuestos', tab='templates'))
@@ -667,7 +759,7 @@ def pausar_template(template_id):
     nuevo_estado = 0 if template['activo'] else 1
     conn.execute('UPDATE PresupuestosTemplates SET activo = ? WHERE id = ?', (nuevo_estado, template_id))
     conn.commit()
-    conn.close()
+    registrar_cambio('PresupuestosTemplates')
     
     mensaje = '⏸️ Template pausado' if nuevo_estado == 0 else '▶️ Template reactivado'
     flash(mensaje, 'success')
@@ -678,7 +770,7 @@ def eliminar_template(template_id):
     conn = get_db()
     conn.execute('DELETE FROM PresupuestosTemplates WHERE id = ?', (template_id,))
     conn.commit()
-    conn.close()
+    registrar_cambio('PresupuestosTemplates')
     
     flash('🗑️ Template eliminado correctamente', 'warning')
     return redirect(url_for('presupuestos', tab='templates'))
@@ -691,7 +783,6 @@ def eliminar_template(template_id):
 def gestionar_categorias():
     conn = get_db()
     categorias = conn.execute('SELECT * FROM Categorias ORDER BY orden, nombre').fetchall()
-    conn.close()
     return render_template('categorias.html', categorias=categorias)
 
 @app.route('/categoria/crear', methods=['POST'])
@@ -711,12 +802,11 @@ def crear_categoria():
             VALUES (?, ?, ?, ?)
         ''', (nombre, descripcion, color, nuevo_orden))
         conn.commit()
+        registrar_cambio('Categorias')
         flash(f'✅ Categoría "{nombre}" creada correctamente', 'success')
     except sqlite3.IntegrityError:
         flash('⚠️ Ya existe una categoría con ese nombre', 'warning')
-    finally:
-        conn.close()
-    
+
     return redirect(url_for('gestionar_categorias'))
 
 @app.route('/categoria/editar/<int:categoria_id>', methods=['POST'])
@@ -732,7 +822,7 @@ def editar_categoria(categoria_id):
         WHERE id = ?
     ''', (nombre, descripcion, color, categoria_id))
     conn.commit()
-    conn.close()
+    registrar_cambio('Categorias')
     
     flash('✅ Categoría actualizada correctamente', 'success')
     return redirect(url_for('gestionar_categorias'))
@@ -745,7 +835,7 @@ def desactivar_categoria(categoria_id):
     nuevo_estado = 0 if categoria['activa'] else 1
     conn.execute('UPDATE Categorias SET activa = ? WHERE id = ?', (nuevo_estado, categoria_id))
     conn.commit()
-    conn.close()
+    registrar_cambio('Categorias')
     
     mensaje = '⏸️ Categoría desactivada' if nuevo_estado == 0 else '▶️ Categoría reactivada'
     flash(mensaje, 'success')
@@ -768,7 +858,6 @@ def tareas():
             (filtro_estado,)
         ).fetchall()
     
-    conn.close()
     return render_template('tareas.html', tareas=tareas_list, filtro_estado=filtro_estado)
 
 @app.route('/tarea/crear', methods=['POST'])
@@ -785,7 +874,7 @@ def crear_tarea():
         VALUES (?, ?, ?, ?, ?)
     ''', (descripcion, fecha_vencimiento, prioridad, categoria, cliente_relacionado))
     conn.commit()
-    conn.close()
+    registrar_cambio('Tareas')
     
     flash('✅ Tarea creada correctamente', 'success')
     return redirect(url_for('tareas'))
@@ -796,44 +885,190 @@ def completar_tarea(tarea_id):
     conn.execute("UPDATE Tareas SET estado = 'Completada', fecha_completado = CURRENT_TIMESTAMP WHERE id = ?", 
                 (tarea_id,))
     conn.commit()
-    conn.close()
+    registrar_cambio('Tareas')
     
     flash('✅ Tarea completada', 'success')
     return redirect(url_for('tareas'))
 
+# ===============================================
+# BÚSQUEDA
+# ===============================================
+
+@app.template_filter('resaltar')
+def resaltar(texto):
+    """Escapa el texto de un resultado y resalta los términos encontrados"""
+    if not texto:
+        return ''
+    return Markup(str(escape(texto)).replace(MARCA_INICIO, '<mark>').replace(MARCA_FIN, '</mark>'))
+
+def parametros_busqueda(args):
+    """(texto, tipo, pagina) desde la query string; tipo vacío = todos"""
+    texto = args.get('q', '').strip()
+    tipo = args.get('tipo') or None
+    pagina = max(args.get('pagina', 1, type=int), 1)
+    return texto, tipo, pagina
+
+@app.route('/buscar')
+def buscar_texto():
+    texto, tipo, pagina = parametros_busqueda(request.args)
+    busqueda = buscar(get_db(), texto, tipo, pagina)
+    
+    # Enlaces de página conservando búsqueda y filtro
+    url_anterior = url_siguiente = None
+    if pagina > 1:
+        url_anterior = url_for('buscar_texto', q=texto, tipo=tipo, pagina=pagina - 1)
+    if pagina < busqueda['paginas']:
+        url_siguiente = url_for('buscar_texto', q=texto, tipo=tipo, pagina=pagina + 1)
+    
+    return render_template('buscar.html', texto=texto, tipo=tipo, busqueda=busqueda,
+                         url_anterior=url_anterior, url_siguiente=url_siguiente)
+
+@app.route('/api/buscar')
+def api_buscar():
+    """Misma búsqueda que /buscar en JSON (?q=, ?tipo=gastos|tareas|clientes, ?pagina=)"""
+    texto, tipo, pagina = parametros_busqueda(request.args)
+    busqueda = buscar(get_db(), texto, tipo, pagina)
+    
+    # Las marcas de resaltado se entregan como <mark> ya escapado
+    for resultado in busqueda['resultados']:
+        resultado['titulo'] = str(resaltar(resultado['titulo']))
+        resultado['fragmento'] = str(resaltar(resultado['fragmento']))
+    return jsonify(busqueda)
+
+# ===============================================
+# REPORTES EXCEL
+# ===============================================
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Reportes mensuales ya generados, por (anio, mes) y huella de sus datos
+cache_exportaciones = CacheArchivos('exportaciones', EXPORTACIONES_EN_CACHE)
+
+@app.route('/exportar/<int:anio>/<int:mes>')
+def exportar_mes(anio, mes):
+    """
+    Descarga el reporte mensual de exportar_excel.py. Los bytes quedan en
+    memoria con la huella de los gastos y presupuestos del mes: mientras
+    no cambien, volver a descargarlo no genera el libro otra vez.
+    """
+    if not 1 <= mes <= 12:
+        flash(f'❌ Mes inválido: {mes}', 'error')
+        return redirect(url_for('dashboard'))
+    
+    version = version_datos_mes(get_db(), mes, anio)
+    
+    def generar():
+        archivo = io.BytesIO()
+        crear_reporte_mensual(mes, anio, app.extensions['pool_conexiones'].ruta_db, archivo)
+        return archivo.getvalue()
+    
+    datos = cache_exportaciones.obtener((anio, mes), version, generar)
+    return send_file(io.BytesIO(datos), mimetype=XLSX_MIMETYPE, as_attachment=True,
+                     download_name=f"Reporte_{anio}_{mes:02d}.xlsx", etag=version)
+
+@app.route('/exportar/periodo')
+def exportar_periodo():
+    """
+    Descarga el reporte consolidado de ?desde=AAAA-MM&hasta=AAAA-MM
+    (por defecto de enero al mes actual). El libro se arma en memoria.
+    """
+    try:
+        hasta = leer_periodo(request.args.get('hasta') or date.today().strftime('%Y-%m'))
+        desde = leer_periodo(request.args.get('desde') or f"{hasta[0]}-01")
+        archivo = io.BytesIO()
+        crear_reporte_periodo(desde, hasta, app.extensions['pool_conexiones'].ruta_db, archivo)
+    except ValueError as e:
+        flash(f'❌ {e}', 'error')
+        return redirect(url_for('dashboard'))
+    
+    archivo.seek(0)
+    nombre = f"Reporte_{desde[0]}_{desde[1]:02d}_a_{hasta[0]}_{hasta[1]:02d}.xlsx"
+    return send_file(archivo, mimetype=XLSX_MIMETYPE, as_attachment=True, download_name=nombre)
+
 # ===============================================
 # API Y UTILIDADES
 # ===============================================
 
 @app.route('/api/alertas/resumen')
+@respuesta_condicional('Egresos', 'Configuracion')
 def api_alertas_resumen():
     conn = get_db()
     today = date.today()
     
-    vencidos = conn.execute('''
-        SELECT COUNT(*) as total FROM Egresos 
-        WHERE estado = 'Pendiente' AND date(fecha_vencimiento) < date('now')
-    ''').fetchone()['total']
+    resumen = resumen_alertas(conn, today)
     
-    hoy = conn.execute('''
-        SELECT COUNT(*) as total FROM Egresos 
-        WHERE estado = 'Pendiente' AND date(fecha_vencimiento) = date('now')
-    ''').fetchone()['total']
-    
-    proximos_3 = conn.execute('''
-        SELECT COUNT(*) as total FROM Egresos 
-        WHERE estado = 'Pendiente' 
-        AND date(fecha_vencimiento) BETWEEN date('now', '+1 day') AND date('now', '+3 days')
-    ''').fetchone()['total']
-    
-    conn.close()
+    vencidos = resumen['vencidos']['cantidad']
+    hoy = resumen['hoy']['cantidad']
+    # Siempre 1 a 3 días, aunque el grupo 'criticos' siga a dias_alerta_critica
+    proximos = resumen.pop('proximos_3_dias')['cantidad']
     
     return jsonify({
         'vencidos': vencidos,
         'hoy': hoy,
-        'proximos_3_dias': proximos_3,
-        'total_critico': vencidos + hoy + proximos_3
+        'proximos_3_dias': proximos,
+        'total_critico': vencidos + hoy + proximos,
+        'grupos': resumen
     })
 
+@app.route('/api/proyecciones/recurrentes')
+@respuesta_condicional('Egresos')
+def api_proyecciones_recurrentes():
+    """Ocurrencias futuras de los gastos recurrentes (?meses= horizonte)"""
+    conn = get_db()
+    meses = request.args.get('meses', configuracion.obtener('MESES_PROYECCION_RECURRENTES', conn), type=int)
+    meses = max(1, min(meses, 36))
+    proyeccion = proyeccion_recurrentes.proyectar(conn, meses)
+    
+    return jsonify({
+        'meses': meses,
+        'por_mes': resumir_por_mes(proyeccion),
+        'ocurrencias': proyeccion
+    })
+
+@app.route('/api/flujo-caja')
+@respuesta_condicional('Egresos', 'Configuracion')
+def api_flujo_caja():
+    """
+    Pronóstico de caja día por día (?dias=, por defecto 90). ?saldo= y
+    ?minimo= permiten simular otros valores sin guardarlos.
+    """
+    dias = max(1, min(request.args.get('dias', 90, type=int), 366))
+    return jsonify(pronosticar_flujo(get_db(),
+                                     saldo_inicial=request.args.get('saldo', type=float),
+                                     minimo=request.args.get('minimo', type=float),
+                                     dias=dias, incluir_serie=True))
+
+@app.route('/configuracion/saldo-caja', methods=['POST'])
+def actualizar_saldo_caja():
+    try:
+        saldo = float(request.form['saldo'])
+    except (KeyError, ValueError):
+        flash('❌ El saldo debe ser un número', 'error')
+        return redirect(url_for('dashboard'))
+    
+    conn = get_db()
+    configuracion.guardar(conn, 'saldo_caja_actual', saldo,
+                          'Saldo actual en caja (punto de partida del flujo de caja)')
+    conn.commit()
+    registrar_cambio('Configuracion')
+    
+    flash(f'✅ Saldo de caja actualizado: ${saldo:,.0f}', 'success')
+    return redirect(url_for('dashboard'))
+
+@app.route('/api/pool/estadisticas')
+def api_pool_estadisticas():
+    """Contadores de aciertos/fallos del pool de conexiones"""
+    return jsonify(app.extensions['pool_conexiones'].estadisticas())
+
+@app.route('/api/cache/estadisticas')
+def api_cache_estadisticas():
+    """Tasa de aciertos de las cachés del panel (dashboard, fragmentos, reportes, configuración)"""
+    return jsonify(dict(cache_dashboard.estadisticas(),
+                        fragmentos=cache_fragmentos.estadisticas(),
+                        exportaciones=cache_exportaciones.estadisticas(),
+                        configuracion=configuracion.estadisticas()))
+
 if __name__ == '__main__':
+    # Servidor de desarrollo; para la oficina usar servidor_produccion.py
+    crear_app()
     app.run(host='0.0.0.0', port=8000, debug=True)
\ No newline at end of file
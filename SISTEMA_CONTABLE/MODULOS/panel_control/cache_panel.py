@@ -0,0 +1,391 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Caché del Panel de Control
+Versiones de datos por tabla (las suben triggers en la base con cada
+escritura, de cualquier proceso) y cachés de resultados calculados que se
+invalidan cuando cambia esa versión o cuando cambia el día. También las respuestas condicionales (ETag /
+Last-Modified) de la API JSON, los fragmentos de plantilla ya
+renderizados (CacheFragmentos) y los archivos generados (CacheArchivos).
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from email.utils import formatdate
+from flask import request, make_response, g, has_app_context
+
+
+# Versión y momento del último cambio de cada tabla, que suben los triggers
+# de esquema_db.asegurar_versiones_tablas en cada escritura
+SQL_VERSIONES_BASE = "SELECT tabla, version, modificado FROM VersionesTablas"
+
+
+class VersionesDatos:
+    """
+    Versiones de datos por tabla.
+
+    La principal está en la base: los triggers de VersionesTablas la suben
+    con cada INSERT, UPDATE o DELETE, venga de una ruta, de un script
+    (importar_egresos.py, recalcular_presupuestos.py...) o de otro worker.
+    Encima hay un contador en memoria del proceso que suben las rutas con
+    registrar_cambio(); es el único que queda si la base no tiene
+    VersionesTablas.
+
+    Dentro de un request VersionesTablas se lee una sola vez (se guarda en
+    flask.g) mientras la conexión no escriba nada: total_changes sube con
+    cualquier escritura, triggers incluidos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_tabla = {}
+        self._modificado = {}
+        self._global = 0
+        # Identifica este proceso: los contadores vuelven a 0 al reiniciar
+        self.inicio = time.time()
+        self.instancia = f"{os.getpid():x}{int(self.inicio):x}"
+        # Función que entrega la conexión del request (conexiones.get_db)
+        self.conexion = None
+        # Con varios procesos los contadores locales no ven las escrituras
+        # de los otros: sin versión en la base no se usa la caché
+        self.varios_procesos = False
+
+    def usar_base(self, conexion):
+        """Lee las versiones de la base con la conexión que entregue conexion()"""
+        self.conexion = conexion
+
+    def incrementar(self, *tablas):
+        with self._lock:
+            ahora = time.time()
+            for tabla in tablas:
+                self._por_tabla[tabla] = self._por_tabla.get(tabla, 0) + 1
+                self._modificado[tabla] = ahora
+            self._global += 1
+            return self._global
+
+    def version_global(self):
+        return self._global
+
+    def de_base(self, *tablas):
+        """
+        {tabla: (versión, modificado)} de VersionesTablas para esas tablas
+        ((0, None) si nunca cambiaron); None si no hay base o no tiene la tabla.
+        """
+        if self.conexion is None:
+            return None
+        conn = self.conexion()
+        leidas = g.get('versiones_base') if has_app_context() else None
+        if leidas is None or leidas[0] != conn.total_changes:
+            try:
+                filas = conn.execute(SQL_VERSIONES_BASE).fetchall()
+                guardadas = {tabla: (version, modificado) for tabla, version, modificado in filas}
+            except sqlite3.OperationalError:
+                guardadas = None
+            leidas = (conn.total_changes, guardadas)
+            if has_app_context():
+                g.versiones_base = leidas
+        if leidas[1] is None:
+            return None
+        return {tabla: leidas[1].get(tabla, (0, None)) for tabla in tablas}
+
+    def olvidar_leidas(self):
+        """Descarta las versiones leídas en este request (tras una escritura)"""
+        if has_app_context():
+            g.pop('versiones_base', None)
+
+    def _locales(self, tablas):
+        with self._lock:
+            return tuple(self._por_tabla.get(tabla, 0) for tabla in tablas)
+
+    def de(self, *tablas):
+        """
+        Versión combinada de un grupo de tablas (tupla comparable): la de la
+        base más la local. None si no es confiable (varios procesos y sin
+        versión en la base).
+        """
+        base = self.de_base(*tablas)
+        if base is None:
+            return None if self.varios_procesos else (None, self._locales(tablas))
+        return (tuple(base[tabla][0] for tabla in tablas), self._locales(tablas))
+
+    def etiqueta(self, *tablas):
+        """
+        (ETag, momento del último cambio) de esas tablas. Con versión en la
+        base es el mismo en todos los procesos; None si no es confiable.
+        """
+        base = self.de_base(*tablas)
+        if base is not None:
+            version = '.'.join(str(base[tabla][0]) for tabla in tablas)
+            return version, max([base[tabla][1] or 0 for tabla in tablas], default=0)
+        if self.varios_procesos:
+            return None
+        version = '.'.join(str(v) for v in self._locales(tablas))
+        with self._lock:
+            modificado = max([self._modificado.get(tabla, self.inicio) for tabla in tablas],
+                             default=self.inicio)
+        return f"{self.instancia}-{version}", modificado
+
+
+versiones = VersionesDatos()
+
+
+def registrar_cambio(*tablas):
+    """Marca que las tablas indicadas cambiaron (invalida las cachés que dependen de ellas)"""
+    versiones.olvidar_leidas()
+    return versiones.incrementar(*tablas)
+
+
+def respuesta_condicional(*tablas):
+    """
+    Decorador para rutas JSON que solo cambian cuando cambian `tablas`
+    o cuando cambia el día. Agrega ETag y Last-Modified y, si el cliente
+    manda un If-None-Match (o If-Modified-Since) vigente, responde 304
+    sin ejecutar la ruta (solo lee la versión de las tablas).
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            etiqueta = versiones.etiqueta(*tablas)
+            if etiqueta is None:
+                return vista(*args, **kwargs)
+
+            hoy = datetime.now().date()
+            version, ultimo_cambio = etiqueta
+            etag = f"{version}-{hoy.strftime('%Y%m%d')}"
+
+            # Lo que cambió por última vez: los datos o el día
+            medianoche = time.mktime(hoy.timetuple())
+            modificado = int(max(ultimo_cambio, medianoche))
+
+            if request.if_none_match:
+                vigente = request.if_none_match.contains_weak(etag)
+            elif request.if_modified_since:
+                vigente = request.if_modified_since.timestamp() >= modificado
+            else:
+                vigente = False
+
+            if vigente:
+                respuesta = make_response('', 304)
+            else:
+                respuesta = make_response(vista(*args, **kwargs))
+            respuesta.set_etag(etag)
+            respuesta.headers['Last-Modified'] = formatdate(modificado, usegmt=True)
+            respuesta.headers['Cache-Control'] = 'no-cache'
+            return respuesta
+        return envoltura
+    return decorador
+
+
+def segundos_hasta_medianoche(ahora=None):
+    ahora = ahora or datetime.now()
+    manana = (ahora + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (manana - ahora).total_seconds()
+
+
+class CacheVersionada:
+    """
+    Guarda UN valor calculado, válido mientras no cambie la versión de las
+    tablas de las que depende y hasta la medianoche (los cálculos por
+    "días restantes" cambian de día aunque no cambien los datos).
+    """
+
+    def __init__(self, nombre, tablas, versiones_datos=versiones):
+        self.nombre = nombre
+        self.tablas = tablas
+        self.versiones = versiones_datos
+        self.activa = True
+        self._lock = threading.Lock()
+        self._clave = None
+        self._valor = None
+        self._expira = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.omitidas = 0
+
+    def obtener(self, calcular, usar_cache=True):
+        """
+        Retorna el valor en caché o lo calcula con calcular().
+        Con usar_cache=False (o la caché desactivada) siempre recalcula.
+        """
+        version = self.versiones.de(*self.tablas) if usar_cache and self.activa else None
+        if version is None:
+            with self._lock:
+                self.omitidas += 1
+            return calcular()
+
+        clave = (version, datetime.now().date())
+        with self._lock:
+            if self._clave == clave and time.time() < self._expira:
+                self.aciertos += 1
+                return self._valor
+            self.fallos += 1
+
+        valor = calcular()
+        with self._lock:
+            self._clave = clave
+            self._valor = valor
+            self._expira = time.time() + segundos_hasta_medianoche()
+        return valor
+
+    def invalidar(self):
+        with self._lock:
+            self._clave = None
+            self._valor = None
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                'nombre': self.nombre,
+                'activa': self.activa,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'omitidas': self.omitidas,
+                'tasa_aciertos': round(self.aciertos / total * 100, 1) if total else 0.0,
+                'version': self.versiones.de(*self.tablas)
+            }
+
+
+class CacheFragmentos:
+    """
+    HTML ya renderizado de bloques de las plantillas. Cada fragmento depende
+    de sus propias tablas, así que pagar un gasto vuelve a renderizar las
+    alertas pero no la tabla de categorías. Vale hasta la medianoche, igual
+    que CacheVersionada (los "días restantes" cambian con el día).
+
+    En la plantilla:
+        {% call fragmento('categorias', 'Categorias') %} ... {% endcall %}
+    """
+
+    def __init__(self, versiones_datos=versiones, maximo=200):
+        self.versiones = versiones_datos
+        self.maximo = maximo
+        self.activa = True
+        self._lock = threading.Lock()
+        self._guardados = {}     # (nombre, variante) -> (clave, html, segundos de render)
+        self._metricas = {}      # nombre -> contadores y tiempos
+
+    def _metrica(self, nombre):
+        if nombre not in self._metricas:
+            self._metricas[nombre] = {'aciertos': 0, 'fallos': 0, 'omitidas': 0,
+                                      'render_ms': 0.0, 'ahorrado_ms': 0.0}
+        return self._metricas[nombre]
+
+    def renderizar(self, nombre, tablas, renderizar, variante=(), usar_cache=True):
+        """
+        HTML del fragmento: el guardado si las tablas no cambiaron, o el que
+        produce renderizar() (el cuerpo del {% call %}). `variante` separa
+        copias del mismo fragmento (p. ej. por mes).
+        """
+        version = self.versiones.de(*tablas) if usar_cache and self.activa else None
+        if version is None:
+            inicio = time.perf_counter()
+            html = renderizar()
+            with self._lock:
+                metrica = self._metrica(nombre)
+                metrica['omitidas'] += 1
+                metrica['render_ms'] += (time.perf_counter() - inicio) * 1000
+            return html
+
+        id_fragmento = (nombre, tuple(variante))
+        clave = (version, datetime.now().date())
+        with self._lock:
+            guardado = self._guardados.get(id_fragmento)
+            if guardado and guardado[0] == clave:
+                metrica = self._metrica(nombre)
+                metrica['aciertos'] += 1
+                metrica['ahorrado_ms'] += guardado[2] * 1000
+                return guardado[1]
+
+        inicio = time.perf_counter()
+        html = renderizar()
+        segundos = time.perf_counter() - inicio
+        with self._lock:
+            metrica = self._metrica(nombre)
+            metrica['fallos'] += 1
+            metrica['render_ms'] += segundos * 1000
+            self._guardados.pop(id_fragmento, None)
+            if len(self._guardados) >= self.maximo:
+                # El más antiguo primero (los dict conservan el orden de inserción)
+                self._guardados.pop(next(iter(self._guardados)))
+            self._guardados[id_fragmento] = (clave, html, segundos)
+        return html
+
+    def invalidar(self):
+        with self._lock:
+            self._guardados.clear()
+
+    def estadisticas(self):
+        """Aciertos y tiempo de render ahorrado por fragmento y en total"""
+        with self._lock:
+            fragmentos = {nombre: dict(metrica) for nombre, metrica in self._metricas.items()}
+            guardados = len(self._guardados)
+        for metrica in fragmentos.values():
+            total = metrica['aciertos'] + metrica['fallos']
+            metrica['tasa_aciertos'] = round(metrica['aciertos'] / total * 100, 1) if total else 0.0
+            renderizados = metrica['fallos'] + metrica['omitidas']
+            metrica['render_promedio_ms'] = round(metrica['render_ms'] / renderizados, 3) if renderizados else 0.0
+            metrica['render_ms'] = round(metrica['render_ms'], 2)
+            metrica['ahorrado_ms'] = round(metrica['ahorrado_ms'], 2)
+        return {
+            'activa': self.activa,
+            'guardados': guardados,
+            'ahorrado_ms': round(sum(m['ahorrado_ms'] for m in fragmentos.values()), 2),
+            'fragmentos': fragmentos,
+        }
+
+
+class CacheArchivos:
+    """
+    Archivos generados (bytes) por clave, válidos mientras no cambie la
+    versión que calcula quien llama (p. ej. una huella de los datos). Guarda
+    hasta `maximo` archivos; cuando se llena sale el usado hace más tiempo.
+    No depende de VersionesDatos: la versión la calcula quien llama.
+    """
+
+    def __init__(self, nombre, maximo):
+        self.nombre = nombre
+        self.maximo = maximo
+        self._lock = threading.Lock()
+        self._archivos = {}      # clave -> (versión, bytes)
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave, version, generar):
+        """Los bytes guardados si la versión coincide; si no, los de generar()"""
+        with self._lock:
+            guardado = self._archivos.pop(clave, None)
+            if guardado and guardado[0] == version:
+                self.aciertos += 1
+                # Al final: el más reciente en usarse
+                self._archivos[clave] = guardado
+                return guardado[1]
+            self.fallos += 1
+
+        datos = generar()
+        with self._lock:
+            self._archivos.pop(clave, None)
+            while self._archivos and len(self._archivos) >= self.maximo:
+                self._archivos.pop(next(iter(self._archivos)))
+            self._archivos[clave] = (version, datos)
+        return datos
+
+    def invalidar(self):
+        with self._lock:
+            self._archivos.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                'nombre': self.nombre,
+                'archivos': len(self._archivos),
+                'bytes': sum(len(datos) for _, datos in self._archivos.values()),
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / total * 100, 1) if total else 0.0,
+            }
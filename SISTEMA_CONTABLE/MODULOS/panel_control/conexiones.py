@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Gestor de Conexiones del Panel de Control
+Mantiene un pool de conexiones SQLite reutilizables y entrega una sola
+conexión por request a través de flask.g
+"""
+
+import sqlite3
+import threading
+from flask import g, current_app
+from SISTEMA_CONTABLE.NUCLEO.motor_consultas_lentas import ConexionMedida
+
+# PRAGMAs que se aplican UNA sola vez, al crear cada conexión del pool
+PRAGMAS_CONEXION = [
+    "PRAGMA journal_mode = WAL",     # Lectores no bloquean al escritor
+    "PRAGMA synchronous = NORMAL",   # Seguro con WAL y mucho más rápido que FULL
+    "PRAGMA busy_timeout = 5000",    # Esperar hasta 5 s si la BD está bloqueada
+    "PRAGMA cache_size = -16000",    # ~16 MB de caché de páginas por conexión
+]
+
+MAX_CONEXIONES_LIBRES = 8
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones SQLite seguro entre hilos.
+    Las conexiones libres se guardan en una pila; si no hay ninguna libre
+    se crea una nueva (fallo) y al devolverla se conserva si hay cupo.
+    """
+
+    def __init__(self, ruta_db, max_libres=MAX_CONEXIONES_LIBRES):
+        self.ruta_db = ruta_db
+        self.max_libres = max_libres
+        self._libres = []
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.descartadas = 0
+        # Ganchos opcionales al entregar/recibir la conexión de un request (perfilado.py)
+        self.al_obtener = None
+        self.al_devolver = None
+
+    def _crear_conexion(self):
+        # ConexionMedida: perfilado.py mide cada sentencia con conn.medidor
+        conn = sqlite3.connect(self.ruta_db, check_same_thread=False, factory=ConexionMedida)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS_CONEXION:
+            conn.execute(pragma)
+        return conn
+
+    def obtener(self):
+        """Entrega una conexión libre del pool o crea una nueva"""
+        with self._lock:
+            if self._libres:
+                self.aciertos += 1
+                return self._libres.pop()
+            self.fallos += 1
+        return self._crear_conexion()
+
+    def devolver(self, conn):
+        """Regresa una conexión al pool, descartando transacciones a medias"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.ProgrammingError:
+            # La conexión fue cerrada por quien la usó: no se puede reutilizar
+            with self._lock:
+                self.descartadas += 1
+            return
+
+        with self._lock:
+            if len(self._libres) < self.max_libres:
+                self._libres.append(conn)
+                return
+            self.descartadas += 1
+        conn.close()
+
+    def cerrar_todas(self):
+        """Cierra todas las conexiones libres (al apagar el servidor)"""
+        with self._lock:
+            libres, self._libres = self._libres, []
+        for conn in libres:
+            conn.close()
+
+    def estadisticas(self):
+        """Retorna los contadores de aciertos y fallos del pool"""
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'descartadas': self.descartadas,
+                'libres': len(self._libres),
+                'max_libres': self.max_libres,
+                'tasa_aciertos': round(self.aciertos / total * 100, 1) if total else 0.0
+            }
+
+
+def get_db():
+    """
+    Retorna la conexión del request actual.
+    Todas las rutas y funciones auxiliares de un mismo request comparten
+    la misma conexión; se devuelve al pool al terminar el request.
+    """
+    if 'db' not in g:
+        pool = current_app.extensions['pool_conexiones']
+        g.db = pool.obtener()
+        if pool.al_obtener:
+            pool.al_obtener(g.db)
+    return g.db
+
+
+def liberar_db(exception=None):
+    """Devuelve la conexión del request al pool (teardown de Flask)"""
+    conn = g.pop('db', None)
+    if conn is not None:
+        pool = current_app.extensions['pool_conexiones']
+        if pool.al_devolver:
+            pool.al_devolver(conn)
+        pool.devolver(conn)
+
+
+def init_app(app, ruta_db, max_libres=MAX_CONEXIONES_LIBRES):
+    """Registra el pool de conexiones en la aplicación Flask"""
+    pool = PoolConexiones(ruta_db, max_libres)
+    app.extensions['pool_conexiones'] = pool
+    app.teardown_appcontext(liberar_db)
+    return pool
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Perfilado de Peticiones del Panel de Control (opcional)
+Mide cada request: tiempo total por ruta y, con los cursores medidos de la
+conexión del pool, cuántas sentencias SQL ejecuta y cuánto tardan.
+
+Se activa con PERFILADO_ACTIVO = True en config.py o con la variable de
+entorno PANEL_PERFILADO=1 (servidor_produccion.py --perfilado). Agrega el
+encabezado Server-Timing a cada respuesta y la página /debug/perf con los
+percentiles por ruta y las consultas que más tiempo suman.
+
+El tiempo de cada sentencia es solo el que pasa dentro de SQLite: su
+execute más cada fetch de sus filas (CursorMedido). Lo que Python hace
+entre una lectura y otra queda en app y no en sql, así que la diferencia
+entre ambos es el costo de la ruta fuera de la base de datos. El conteo
+delata los N+1 (la misma consulta repetida dentro de un request).
+
+Aunque el perfilado esté apagado, si CONSULTAS_LENTAS_UMBRAL_MS > 0 (al
+arrancar el panel; después se puede cambiar en la tabla Configuracion) los
+mismos hooks guardan en ConsultasLentas las sentencias que pasan el umbral
+(ver NUCLEO/motor_consultas_lentas.py y reporte_consultas_lentas.py).
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from flask import g, request, render_template, jsonify, redirect, url_for
+from config import (PERFILADO_ACTIVO, PERFILADO_MUESTRAS_POR_RUTA, PERFILADO_TOP_CONSULTAS,
+                    PERFILADO_UMBRAL_REPETICIONES)
+from SISTEMA_CONTABLE.NUCLEO.motor_consultas_lentas import TrazadorSQL, guardar_lentas
+from SISTEMA_CONTABLE.NUCLEO.motor_configuracion import obtener
+
+
+def activo():
+    """Indica si el perfilado está encendido (config.py o PANEL_PERFILADO=1)"""
+    return PERFILADO_ACTIVO or os.environ.get('PANEL_PERFILADO') == '1'
+
+
+def percentil(ordenados, p):
+    """Percentil p (0-100) por rango más cercano sobre una lista ya ordenada"""
+    if not ordenados:
+        return 0.0
+    indice = max(int(round(p / 100 * len(ordenados) + 0.5)) - 1, 0)
+    return ordenados[min(indice, len(ordenados) - 1)]
+
+
+class PerfilRequest(TrazadorSQL):
+    """Sentencias SQL de un request, medidas por los cursores de la conexión del pool"""
+
+    def __init__(self, ruta, umbral_ms=None, guardar_sentencias=True):
+        super().__init__(umbral_ms, guardar_sentencias)
+        self.ruta = ruta
+        self.inicio = time.perf_counter()
+
+    def terminar(self):
+        """Cierra las sentencias abiertas y retorna la duración del request"""
+        super().terminar()
+        return time.perf_counter() - self.inicio
+
+    def repeticion_maxima(self):
+        """(consulta, veces) de la sentencia más repetida en el request"""
+        conteo = defaultdict(int)
+        for sql, _ in self.sentencias:
+            conteo[sql] += 1
+        if not conteo:
+            return None, 0
+        sql = max(conteo, key=conteo.get)
+        return sql, conteo[sql]
+
+
+class EstadisticasPerfilado:
+    """Acumulado del proceso: últimas muestras por ruta y totales por consulta"""
+
+    def __init__(self, muestras=PERFILADO_MUESTRAS_POR_RUTA):
+        self._lock = threading.Lock()
+        self.muestras = muestras
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.desde = time.time()
+            self._rutas = defaultdict(lambda: deque(maxlen=self.muestras))   # ruta -> (ms, sentencias, ms_sql)
+            self._consultas = defaultdict(lambda: {'veces': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rutas': set()})
+            self._repeticiones = {}   # ruta -> (veces, consulta) peor N+1 visto
+
+    def registrar(self, ruta, duracion, perfil):
+        sql_repetida, veces = perfil.repeticion_maxima()
+        with self._lock:
+            self._rutas[ruta].append((duracion * 1000, perfil.cantidad, perfil.segundos * 1000))
+            for sql, segundos in perfil.sentencias:
+                consulta = self._consultas[sql]
+                consulta['veces'] += 1
+                consulta['total_ms'] += segundos * 1000
+                consulta['max_ms'] = max(consulta['max_ms'], segundos * 1000)
+                consulta['rutas'].add(ruta)
+            if veces >= PERFILADO_UMBRAL_REPETICIONES and veces > self._repeticiones.get(ruta, (0,))[0]:
+                self._repeticiones[ruta] = (veces, sql_repetida)
+
+    def resumen(self, top=PERFILADO_TOP_CONSULTAS):
+        """Percentiles por ruta, consultas con más tiempo total y posibles N+1"""
+        with self._lock:
+            rutas = {ruta: list(muestras) for ruta, muestras in self._rutas.items()}
+            consultas = sorted(self._consultas.items(), key=lambda c: c[1]['total_ms'], reverse=True)[:top]
+            consultas = [dict(datos, sql=sql, rutas=sorted(datos['rutas'])) for sql, datos in consultas]
+            repeticiones = dict(self._repeticiones)
+
+        filas_rutas = []
+        for ruta, muestras in rutas.items():
+            tiempos = sorted(m[0] for m in muestras)
+            filas_rutas.append({
+                'ruta': ruta,
+                'peticiones': len(muestras),
+                'p50_ms': round(percentil(tiempos, 50), 2),
+                'p95_ms': round(percentil(tiempos, 95), 2),
+                'p99_ms': round(percentil(tiempos, 99), 2),
+                'max_ms': round(tiempos[-1], 2),
+                'sentencias_promedio': round(sum(m[1] for m in muestras) / len(muestras), 1),
+                'sql_promedio_ms': round(sum(m[2] for m in muestras) / len(muestras), 2),
+                'repeticion_maxima': repeticiones.get(ruta),
+            })
+        filas_rutas.sort(key=lambda r: r['p95_ms'], reverse=True)
+
+        for consulta in consultas:
+            consulta['total_ms'] = round(consulta['total_ms'], 2)
+            consulta['max_ms'] = round(consulta['max_ms'], 2)
+            consulta['promedio_ms'] = round(consulta['total_ms'] / consulta['veces'], 3)
+
+        return {
+            'pid': os.getpid(),
+            'desde': datetime.fromtimestamp(self.desde).strftime('%Y-%m-%d %H:%M:%S'),
+            'rutas': filas_rutas,
+            'consultas': consultas,
+        }
+
+
+estadisticas = EstadisticasPerfilado()
+
+
+def _al_obtener_conexion(conn):
+    """Pone el perfil del request como medidor de la conexión que recibe"""
+    perfil = g.get('perfil')
+    if perfil is not None:
+        # El umbral puede cambiar en la tabla Configuracion sin reiniciar
+        perfil.fijar_umbral(obtener('CONSULTAS_LENTAS_UMBRAL_MS', conn))
+        conn.medidor = perfil
+
+
+def _al_devolver_conexion(conn):
+    """Quita el medidor y guarda las consultas lentas del request"""
+    conn.medidor = None
+    perfil = g.get('perfil')
+    if perfil is None:
+        return
+    # También evalúa la última sentencia si sus filas no se leyeron completas
+    perfil.terminar()
+    if not perfil.lentas:
+        return
+    try:
+        # El pool descartaría igual la transacción a medias al recibirla
+        if conn.in_transaction:
+            conn.rollback()
+        guardar_lentas(conn, perfil, perfil.ruta)
+    except sqlite3.Error as e:
+        print(f"⚠️ No se pudieron guardar las consultas lentas: {e}")
+
+
+def _iniciar_request():
+    ruta = f"{request.method} {request.url_rule.rule if request.url_rule else '(sin ruta)'}"
+    g.perfil = PerfilRequest(ruta, guardar_sentencias=activo())
+
+
+def _terminar_request(respuesta):
+    perfil = g.get('perfil')
+    if perfil is None or not activo() or request.endpoint in ('static', 'debug_perf'):
+        return respuesta
+    duracion = perfil.terminar()
+    estadisticas.registrar(perfil.ruta, duracion, perfil)
+
+    # sql: solo execute y fetch dentro de SQLite; app: el request completo
+    respuesta.headers['Server-Timing'] = (
+        f'app;dur={duracion * 1000:.2f}, '
+        f'sql;dur={perfil.segundos * 1000:.2f};desc="{perfil.cantidad} sentencias"'
+    )
+    return respuesta
+
+
+def debug_perf():
+    """Percentiles por ruta y consultas más costosas (?formato=json para JSON)"""
+    resumen = estadisticas.resumen()
+    if request.args.get('formato') == 'json':
+        return jsonify(resumen)
+    return render_template('debug_perf.html', resumen=resumen,
+                           umbral_repeticiones=PERFILADO_UMBRAL_REPETICIONES)
+
+
+def debug_perf_reiniciar():
+    estadisticas.reiniciar()
+    return redirect(url_for('debug_perf'))
+
+
+def init_app(app):
+    """
+    Registra los hooks de trazado en la aplicación; la página /debug/perf
+    solo si el perfilado está activo.
+    """
+    pool = app.extensions['pool_conexiones']
+    pool.al_obtener = _al_obtener_conexion
+    pool.al_devolver = _al_devolver_conexion
+
+    app.before_request(_iniciar_request)
+    app.after_request(_terminar_request)
+    if not activo():
+        return
+    app.add_url_rule('/debug/perf', 'debug_perf', debug_perf)
+    app.add_url_rule('/debug/perf/reiniciar', 'debug_perf_reiniciar', debug_perf_reiniciar,
+                     methods=['POST'])
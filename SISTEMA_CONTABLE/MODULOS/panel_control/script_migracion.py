@@ -1,65 +1,66 @@
 
-import pandas as pd
 import sqlite3
-from datetime import datetime
+from openpyxl import load_workbook
+from config import DATABASE_PATH
+from SISTEMA_CONTABLE.NUCLEO.esquema_db import asegurar_esquema
+from SISTEMA_CONTABLE.NUCLEO.motor_importacion import importar_egresos
+
+def leer_egresos_historicos(libro):
+    """
+    Genera (número de fila, {columna: valor}) con los egresos de la hoja
+    'EGRESOS DE CAJA', traduciendo el código de egreso a categoría con la
+    hoja 'Códigos'. Lee las hojas en modo read_only, fila por fila.
+    """
+    # 1. Hoja de códigos para traducir (columna A = código, B = concepto)
+    mapa_codigos = {}
+    for fila in libro['Códigos'].iter_rows(min_row=2, values_only=True):
+        if fila[0] is not None:
+            mapa_codigos[fila[0]] = fila[1]
+
+    # 2. Hoja de egresos: encabezado en la fila 8, datos desde la 9
+    for numero, fila in enumerate(libro['EGRESOS DE CAJA'].iter_rows(min_row=9, values_only=True), start=9):
+        # Validar que la fila parece un registro de gasto válido
+        if fila[0] is None or fila[1] is None or fila[6] is None:
+            continue
+
+        try:
+            codigo_egreso = int(fila[1])
+        except (TypeError, ValueError):
+            codigo_egreso = fila[1]
+
+        # Asumimos que todos los gastos históricos ya están 'Pagados';
+        # la fecha de vencimiento es la misma fecha del gasto
+        yield numero, {
+            'fecha_vencimiento': fila[0],
+            'descripcion': fila[3],
+            'etiqueta': fila[5],
+            'monto': fila[6],
+            'categoria': str(mapa_codigos.get(codigo_egreso, 'Categoría Desconocida')),
+            'estado': 'Pagado',
+        }
 
 def migrar_egresos_historicos(ruta_excel):
     """
     Lee el historial de egresos del archivo Excel principal y lo inserta
     en la tabla Egresos de la base de datos.
+    Se puede ejecutar varias veces: los egresos ya migrados se omiten.
     """
+    conn = None
     try:
         print("Iniciando migración de egresos históricos...")
-        # 1. Leer la hoja de códigos para traducir
-        df_codigos = pd.read_excel(ruta_excel, sheet_name='Códigos')
-        mapa_codigos = pd.Series(df_codigos.iloc[:, 1].values, index=df_codigos.iloc[:, 0]).to_dict()
-
-        # 2. Leer la hoja de egresos, omitiendo encabezados
-        df_egresos = pd.read_excel(ruta_excel, sheet_name='EGRESOS DE CAJA', skiprows=7)
-
-        conn = sqlite3.connect('SISTEMA_CONTABLE/DATOS/contabilidad.db')
-        cursor = conn.cursor()
-
-        gastos_a_insertar = []
-        for i, row in df_egresos.iterrows():
-            # Validar que la fila parece un registro de gasto válido
-            if pd.isna(row.iloc[0]) or pd.isna(row.iloc[1]) or pd.isna(row.iloc[6]):
-                continue
-
-            fecha = row.iloc[0]
-            # Convertir fecha si es necesario (a veces pandas lee fechas como timestamps)
-            if isinstance(fecha, datetime):
-                fecha = fecha.date()
-
-            codigo_egreso = int(row.iloc[1])
-            descripcion = row.iloc[3]
-            etiqueta = row.iloc[5]
-            monto = pd.to_numeric(row.iloc[6], errors='coerce')
-
-            # Traducir código a categoría
-            categoria = mapa_codigos.get(codigo_egreso, 'Categoría Desconocida')
-
-            # Asumimos que todos los gastos históricos ya están 'Pagados'
-            estado = 'Pagado'
+        libro = load_workbook(ruta_excel, read_only=True, data_only=True)
 
-            if pd.notna(monto):
-                gastos_a_insertar.append((
-                    str(descripcion),
-                    monto,
-                    str(fecha), # Fecha de vencimiento es la misma fecha del gasto para datos históricos
-                    str(categoria),
-                    str(etiqueta),
-                    estado
-                ))
+        conn = sqlite3.connect(DATABASE_PATH)
+        asegurar_esquema(conn)
 
-        # 3. Insertar todos los gastos en la base de datos
-        cursor.executemany('''
-            INSERT INTO Egresos (descripcion, monto, fecha_vencimiento, categoria, etiqueta, estado)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', gastos_a_insertar)
+        # 3. Insertar en lotes, en una sola transacción (ver NUCLEO/motor_importacion.py)
+        resultado = importar_egresos(conn, leer_egresos_historicos(libro))
+        libro.close()
 
-        conn.commit()
-        print(f"¡Migración completada! Se han insertado {len(gastos_a_insertar)} registros de egresos.")
+        print(f"¡Migración completada! Se han insertado {resultado['insertadas']} registros de egresos "
+              f"({resultado['omitidas']} ya existían, {resultado['rechazadas']} rechazados).")
+        for error in resultado['errores']:
+            print(f"   Fila {error['fila']}: {error['motivo']}")
 
     except Exception as e:
         print(f"Error durante la migración: {e}")
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Servidor de Producción del Panel de Control
+Servidor WSGI en Python puro (sin dependencias extra) para la oficina:
+- Un pool de hilos por proceso atiende varias peticiones a la vez.
+- Opcionalmente varios procesos (workers pre-forkeados, solo Linux/macOS)
+  comparten el mismo socket.
+- CTRL+C / SIGTERM: deja de aceptar conexiones, termina las peticiones en
+  curso (hasta SERVER_ESPERA_CIERRE segundos) y cierra las conexiones.
+
+Uso (desde la raíz del proyecto):
+    python SISTEMA_CONTABLE/MODULOS/panel_control/servidor_produccion.py
+    python SISTEMA_CONTABLE/MODULOS/panel_control/servidor_produccion.py --procesos 4
+
+Comparación con el servidor de desarrollo: ver benchmark_servidor.py
+"""
+
+import os
+import sys
+import signal
+import socket
+import argparse
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler
+
+RAIZ_PROYECTO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if RAIZ_PROYECTO not in sys.path:
+    sys.path.insert(0, RAIZ_PROYECTO)
+
+from config import (SERVER_HOST, SERVER_PORT, SERVER_HILOS, SERVER_PROCESOS,
+                    SERVER_ESPERA_CIERRE)
+
+
+class ManejadorPeticiones(WSGIRequestHandler):
+    """Manejador de wsgiref sin el log de cada petición en consola"""
+
+    def log_message(self, formato, *args):
+        pass
+
+
+class ServidorWSGIHilos(WSGIServer):
+    """WSGIServer de la librería estándar que atiende cada conexión en un pool de hilos"""
+
+    def __init__(self, sock, hilos):
+        super().__init__(sock.getsockname()[:2], ManejadorPeticiones, bind_and_activate=False)
+        # Usar el socket ya abierto (en modo pre-fork lo comparten todos los workers)
+        self.socket.close()
+        self.socket = sock
+        self.server_address = sock.getsockname()[:2]
+        self.server_name = socket.gethostname()
+        self.server_port = self.server_address[1]
+        self.setup_environ()
+        self.hilos = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='wsgi')
+
+    def process_request(self, request, client_address):
+        self.hilos.submit(self._atender, request, client_address)
+
+    def _atender(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def cerrar(self, espera):
+        """Espera las peticiones en curso hasta `espera` segundos. Retorna True si terminaron"""
+        terminador = threading.Thread(target=self.hilos.shutdown, daemon=True)
+        terminador.start()
+        terminador.join(espera)
+        return not terminador.is_alive()
+
+
+def crear_socket(host, puerto):
+    """Socket de escucha; se crea antes del fork para que lo hereden los workers"""
+    return socket.create_server((host, puerto), backlog=128)
+
+
+def ejecutar_worker(sock, hilos, espera, varios_procesos):
+    """Atiende peticiones en este proceso hasta recibir CTRL+C o SIGTERM"""
+    from app import crear_app
+    from cache_panel import versiones
+
+    # Las cachés se enteran de las escrituras de los otros workers por la
+    # versión en la base (VersionesTablas); los contadores locales no bastan
+    versiones.varios_procesos = varios_procesos
+
+    app = crear_app()
+    servidor = ServidorWSGIHilos(sock, hilos)
+    servidor.set_app(app)
+
+    def detener(signum, frame):
+        # shutdown() espera a que termine serve_forever: llamarlo desde otro hilo
+        threading.Thread(target=servidor.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGINT, detener)
+    signal.signal(signal.SIGTERM, detener)
+
+    servidor.serve_forever()
+
+    terminaron = servidor.cerrar(espera)
+    app.extensions['tendencias'].detener()
+    app.extensions['trabajos'].detener()
+    app.extensions['pool_conexiones'].cerrar_todas()
+    if not terminaron:
+        print(f"⚠️  Worker {os.getpid()}: peticiones sin terminar tras {espera} s")
+    return terminaron
+
+
+def ejecutar_preforked(sock, procesos, hilos, espera):
+    """Proceso padre: lanza los workers, reinicia los que caen y los detiene al salir"""
+    hijos = set()
+    deteniendo = False
+
+    def lanzar_worker():
+        pid = os.fork()
+        if pid == 0:
+            codigo = 1
+            try:
+                codigo = 0 if ejecutar_worker(sock, hilos, espera, varios_procesos=True) else 1
+            except Exception:
+                traceback.print_exc()
+            finally:
+                os._exit(codigo)
+        hijos.add(pid)
+
+    def detener(signum, frame):
+        nonlocal deteniendo
+        deteniendo = True
+        for pid in list(hijos):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for _ in range(procesos):
+        lanzar_worker()
+
+    signal.signal(signal.SIGINT, detener)
+    signal.signal(signal.SIGTERM, detener)
+
+    while hijos:
+        pid, estado = os.wait()
+        hijos.discard(pid)
+        if not deteniendo:
+            print(f"⚠️  Worker {pid} terminó inesperadamente; iniciando otro")
+            lanzar_worker()
+
+    sock.close()
+
+
+def servir(host=SERVER_HOST, puerto=SERVER_PORT, hilos=SERVER_HILOS,
+           procesos=SERVER_PROCESOS, espera=SERVER_ESPERA_CIERRE):
+    if procesos > 1 and not hasattr(os, 'fork'):
+        print("⚠️  Este sistema no permite workers pre-forkeados; se usa un solo proceso")
+        procesos = 1
+
+    print("=" * 70)
+    print("SISTEMA CONTABLE - SERVIDOR DE PRODUCCIÓN")
+    print("=" * 70)
+    print(f"\n📡 Escuchando en http://{host}:{puerto}")
+    print(f"⚙️  {procesos} proceso(s) x {hilos} hilos")
+    if os.environ.get('PANEL_PERFILADO') == '1':
+        print(f"🔬 Perfilado activo: http://{host}:{puerto}/debug/perf (por proceso)")
+    print("   Para detener el servidor, presiona CTRL+C\n")
+
+    sock = crear_socket(host, puerto)
+
+    if procesos > 1:
+        ejecutar_preforked(sock, procesos, hilos, espera)
+        terminaron = True
+    else:
+        terminaron = ejecutar_worker(sock, hilos, espera, varios_procesos=False)
+        sock.close()
+
+    print("\n🛑 Servidor detenido")
+    if not terminaron:
+        # Los hilos colgados impedirían que Python termine
+        os._exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor de producción del panel de control')
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--puerto', type=int, default=SERVER_PORT)
+    parser.add_argument('--hilos', type=int, default=SERVER_HILOS)
+    parser.add_argument('--procesos', type=int, default=SERVER_PROCESOS)
+    parser.add_argument('--perfilado', action='store_true',
+                        help='Activar Server-Timing y /debug/perf (ver perfilado.py)')
+    args = parser.parse_args()
+
+    if args.perfilado:
+        # Por variable de entorno para que la hereden los workers
+        os.environ['PANEL_PERFILADO'] = '1'
+
+    servir(args.host, args.puerto, args.hilos, args.procesos)
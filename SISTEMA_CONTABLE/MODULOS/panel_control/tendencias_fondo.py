@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Detección de Tendencias en Segundo Plano
+Ejecuta el motor de tendencias fuera del request: después de las
+escrituras (agrupando ráfagas) y periódicamente aunque no haya cambios.
+"""
+
+import threading
+from flask import request
+from cache_panel import registrar_cambio
+from SISTEMA_CONTABLE.NUCLEO.motor_tendencias import detectar_tendencias
+
+ESPERA_AGRUPAR = 2.0       # Segundos para agrupar varias escrituras seguidas
+INTERVALO_PERIODICO = 3600  # Ejecutar al menos una vez por hora (cambio de mes)
+
+
+class ProgramadorTendencias:
+    """Hilo único que ejecuta detectar_tendencias cuando se le solicita"""
+
+    def __init__(self, pool, espera=ESPERA_AGRUPAR, intervalo=INTERVALO_PERIODICO):
+        self.pool = pool
+        self.espera = espera
+        self.intervalo = intervalo
+        self.ultimo_resultado = None
+        self._pendiente = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._hilo = threading.Thread(target=self._ciclo, name='tendencias', daemon=True)
+            self._hilo.start()
+
+    def solicitar(self):
+        """Marca que hubo escrituras; el hilo ejecutará el motor en breve"""
+        self._pendiente.set()
+
+    def detener(self):
+        self._detener.set()
+        self._pendiente.set()
+
+    def _ciclo(self):
+        while not self._detener.is_set():
+            self._pendiente.wait(timeout=self.intervalo)
+            if self._detener.wait(timeout=self.espera):
+                break
+            self._pendiente.clear()
+            self.ejecutar()
+
+    def ejecutar(self):
+        """Ejecuta el motor con una conexión propia del pool"""
+        conn = self.pool.obtener()
+        try:
+            resultado = detectar_tendencias(conn)
+            self.ultimo_resultado = resultado
+            # Una pasada sin cambios no invalida las cachés ni los ETag
+            if resultado['insertadas'] or resultado['actualizadas'] or resultado['resueltas']:
+                registrar_cambio('AlertasTendencias')
+        except Exception as e:
+            print(f"Error en detección de tendencias: {e}")
+        finally:
+            self.pool.devolver(conn)
+
+
+def init_app(app):
+    """Registra el programador y lo dispara tras cada POST exitoso"""
+    programador = ProgramadorTendencias(app.extensions['pool_conexiones'])
+    app.extensions['tendencias'] = programador
+
+    @app.after_request
+    def _solicitar_tras_escritura(response):
+        if request.method == 'POST' and response.status_code < 400:
+            programador.solicitar()
+        return response
+
+    programador.iniciar()
+    return programador
@@ -0,0 +1,416 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Trabajos de Exportación en Segundo Plano
+Las exportaciones largas (volcado de egresos de varios años, reporte de
+un periodo, relación de la declaración, lote de cuentas de cobro) no se
+generan dentro del request: se guardan como fila de TrabajosExportacion
+(ver NUCLEO/motor_trabajos.py) y un hilo de cada proceso del servidor las
+reparte a un pool de procesos.
+
+Se usan procesos y no hilos porque armar un libro de openpyxl es trabajo
+de CPU en Python: en un hilo competiría por el GIL con los hilos que
+atienden las páginas. El proceso del trabajo abre su propia conexión y
+solo escribe su avance en la tabla.
+
+    POST /api/trabajos                  tipo=... y sus parámetros -> 202
+    GET  /api/trabajos                  últimos trabajos y cupos
+    GET  /api/trabajos/<id>             estado y progreso (para consultar cada pocos segundos)
+    POST /api/trabajos/<id>/cancelar
+    GET  /trabajos/<id>/descargar       archivo del trabajo completado
+
+Límites en config.py: TRABAJOS_SIMULTANEOS (entre todos los procesos),
+TRABAJOS_EN_COLA_MAXIMO, TRABAJOS_SIN_AVANCE_S y TRABAJOS_DIAS_CONSERVAR.
+"""
+
+import os
+import signal
+import sqlite3
+import threading
+import time
+import zipfile
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from flask import current_app, request, jsonify, send_file, url_for
+from conexiones import get_db
+from config import (TRABAJOS_FOLDER, TRABAJOS_SIMULTANEOS, TRABAJOS_EN_COLA_MAXIMO,
+                    TRABAJOS_SIN_AVANCE_S, TRABAJOS_DIAS_CONSERVAR)
+from exportar_excel import crear_reporte_mensual, crear_reporte_periodo, crear_listado_egresos, leer_periodo
+from SISTEMA_CONTABLE.NUCLEO.motor_trabajos import (
+    PENDIENTE, COMPLETADO, ERROR, CANCELADO, ESTADOS_FINALES, TrabajoCancelado, AvanceTrabajo,
+    asegurar_tabla, crear_trabajo, obtener_trabajo, listar_trabajos, contar_por_estado,
+    reclamar_siguiente, terminar_trabajo, cancelar_trabajo, marcar_interrumpidos, eliminar_antiguos)
+
+INTERVALO_REVISION = 2.0      # Segundos entre revisiones de la cola (trabajos de otros procesos)
+INTERVALO_LIMPIEZA = 3600     # Borrar trabajos viejos y sus archivos como mucho cada hora
+PRIORIDAD_PROCESOS = 10       # os.nice de los procesos de trabajos (más alto = menos prioridad)
+
+# ===============================================
+# TIPOS DE TRABAJO
+# ===============================================
+# validar(args) -> parámetros guardados en la fila (ValueError si no sirven)
+# ejecutar(ruta_db, parametros, base, progreso) -> (archivo, nombre de descarga)
+#   `base` es TRABAJOS_FOLDER/trabajo_<id>; el trabajo le agrega su extensión
+
+TipoTrabajo = namedtuple('TipoTrabajo', 'descripcion validar ejecutar')
+TIPOS_TRABAJO = {}
+
+
+def tipo_trabajo(nombre, descripcion, validar):
+    def registrar(ejecutar):
+        TIPOS_TRABAJO[nombre] = TipoTrabajo(descripcion, validar, ejecutar)
+        return ejecutar
+    return registrar
+
+
+def validar_mes(args):
+    try:
+        anio, mes = int(args['anio']), int(args['mes'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Se requieren anio y mes numéricos")
+    if not 1 <= mes <= 12:
+        raise ValueError(f"Mes inválido: {mes}")
+    return {'anio': anio, 'mes': mes}
+
+
+def validar_periodo(args):
+    """desde/hasta AAAA-MM; por defecto de enero al mes actual, como /exportar/periodo"""
+    hasta = leer_periodo(args.get('hasta') or date.today().strftime('%Y-%m'))
+    desde = leer_periodo(args.get('desde') or f"{hasta[0]}-01")
+    if desde > hasta:
+        raise ValueError("El periodo empieza después de terminar")
+    return {'desde': list(desde), 'hasta': list(hasta)}
+
+
+def sin_parametros(args):
+    return {}
+
+
+def nombre_periodo(prefijo, parametros):
+    (anio_desde, mes_desde), (anio_hasta, mes_hasta) = parametros['desde'], parametros['hasta']
+    return f"{prefijo}_{anio_desde}_{mes_desde:02d}_a_{anio_hasta}_{mes_hasta:02d}.xlsx"
+
+
+@tipo_trabajo('reporte_mensual', 'Reporte Excel de un mes', validar_mes)
+def trabajo_reporte_mensual(ruta_db, parametros, base, progreso):
+    archivo = crear_reporte_mensual(parametros['mes'], parametros['anio'], ruta_db, base + '.xlsx',
+                                    progreso=progreso)
+    return archivo, f"Reporte_{parametros['anio']}_{parametros['mes']:02d}.xlsx"
+
+
+@tipo_trabajo('reporte_periodo', 'Reporte Excel consolidado de varios meses', validar_periodo)
+def trabajo_reporte_periodo(ruta_db, parametros, base, progreso):
+    archivo = crear_reporte_periodo(tuple(parametros['desde']), tuple(parametros['hasta']), ruta_db,
+                                    base + '.xlsx', progreso=progreso)
+    return archivo, nombre_periodo('Reporte', parametros)
+
+
+@tipo_trabajo('egresos', 'Todos los egresos de un periodo, fila por fila', validar_periodo)
+def trabajo_egresos(ruta_db, parametros, base, progreso):
+    archivo = crear_listado_egresos(tuple(parametros['desde']), tuple(parametros['hasta']), ruta_db,
+                                    base + '.xlsx', progreso=progreso)
+    return archivo, nombre_periodo('Egresos', parametros)
+
+
+@tipo_trabajo('relacion', 'Relación de la declaración (SISTEMA_CONTABLE/main.py)', sin_parametros)
+def trabajo_relacion(ruta_db, parametros, base, progreso):
+    # pandas solo se importa en el proceso del trabajo
+    from SISTEMA_CONTABLE.NUCLEO.motor_procesamiento import cargar_configuracion, extraer_datos
+    from SISTEMA_CONTABLE.NUCLEO.generador_reportes import generar_reporte
+
+    progreso(0.1, "Extrayendo datos de la declaración")
+    datos = extraer_datos("SISTEMA_CONTABLE/DATOS/declaracion_completa.xlsx", cargar_configuracion())
+    if not datos:
+        raise ValueError("No se extrajeron datos de la declaración")
+    progreso(0.6, "Generando la relación")
+    archivo = generar_reporte(datos, "SISTEMA_CONTABLE/DATOS/plantilla_relacion.xlsx")
+    if not archivo:
+        raise ValueError("No se pudo generar la relación (ver la consola del servidor)")
+    return archivo, os.path.basename(archivo)
+
+
+@tipo_trabajo('cxc', 'Lote de cuentas de cobro en PDF (MODULOS/cxc)', sin_parametros)
+def trabajo_cxc(ruta_db, parametros, base, progreso):
+    from SISTEMA_CONTABLE.MODULOS.cxc.main_cxc import ejecutar_flujo_cxc
+
+    pdfs = ejecutar_flujo_cxc(progreso=progreso)
+    if not pdfs:
+        raise ValueError("No se generó ninguna cuenta de cobro")
+    # Los PDF (y sus correos) quedan en Salidas como siempre; el trabajo entrega una copia comprimida
+    archivo = base + '.zip'
+    with zipfile.ZipFile(archivo, 'w', zipfile.ZIP_DEFLATED) as comprimido:
+        for pdf in pdfs:
+            comprimido.write(pdf, os.path.basename(pdf))
+    return archivo, f"CuentasCobro_{date.today():%Y_%m_%d}.zip"
+
+
+# ===============================================
+# EJECUCIÓN (en el proceso del pool)
+# ===============================================
+
+def ejecutar_trabajo(ruta_db, trabajo_id, carpeta):
+    """Ejecuta un trabajo ya reclamado y deja su fila en un estado final"""
+    conn = sqlite3.connect(ruta_db, timeout=30)
+    base = os.path.join(carpeta, f"trabajo_{trabajo_id}")
+    try:
+        trabajo = obtener_trabajo(conn, trabajo_id)
+        inicio = time.perf_counter()
+        try:
+            tipo = TIPOS_TRABAJO[trabajo['tipo']]
+            archivo, nombre = tipo.ejecutar(ruta_db, trabajo['parametros'], base,
+                                            AvanceTrabajo(conn, trabajo_id))
+        except TrabajoCancelado:
+            borrar_archivos_parciales(base)
+            terminar_trabajo(conn, trabajo_id, CANCELADO, 'Cancelado')
+            return CANCELADO
+        except Exception as e:
+            borrar_archivos_parciales(base)
+            terminar_trabajo(conn, trabajo_id, ERROR, 'Falló', error=f"{type(e).__name__}: {e}")
+            print(f"❌ Trabajo {trabajo_id} ({trabajo['tipo']}) falló: {e}")
+            return ERROR
+        terminar_trabajo(conn, trabajo_id, COMPLETADO,
+                         f"Listo en {time.perf_counter() - inicio:.1f} s",
+                         archivo=os.path.abspath(archivo), nombre_descarga=nombre)
+        return COMPLETADO
+    finally:
+        conn.close()
+
+
+def preparar_proceso():
+    """
+    Inicializador de cada proceso del pool. CTRL+C le llega a todo el
+    grupo de procesos: lo atiende solo el servidor. Además baja su
+    prioridad para que, con pocos núcleos, el sistema atienda primero al
+    servidor (solo Linux/macOS; en Windows queda con la prioridad normal).
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if hasattr(os, 'nice'):
+        os.nice(PRIORIDAD_PROCESOS)
+
+
+def borrar_archivos_parciales(base):
+    for extension in ('.xlsx', '.zip'):
+        if os.path.exists(base + extension):
+            os.remove(base + extension)
+
+
+# ===============================================
+# COLA (un hilo por proceso del servidor)
+# ===============================================
+
+class ColaTrabajos:
+    """
+    Hilo que reclama los pendientes de la tabla y los entrega al pool de
+    procesos, sin pasar de `simultaneos`. Se despierta al crear o terminar
+    un trabajo y cada INTERVALO_REVISION segundos.
+    """
+
+    def __init__(self, pool, carpeta=TRABAJOS_FOLDER, simultaneos=TRABAJOS_SIMULTANEOS):
+        self.pool = pool
+        self.carpeta = carpeta
+        self.simultaneos = simultaneos
+        self.en_curso = 0
+        self._ejecutor = None
+        self._ultima_limpieza = 0.0
+        self._lock = threading.Lock()
+        self._pendiente = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._hilo = threading.Thread(target=self._ciclo, name='trabajos', daemon=True)
+            self._hilo.start()
+
+    def solicitar(self):
+        """Hay un trabajo nuevo o un cupo libre: revisar la cola ya"""
+        self._pendiente.set()
+
+    def detener(self):
+        """Deja de tomar trabajos y corta los que corren en este proceso (quedan en Error)"""
+        self._detener.set()
+        self._pendiente.set()
+        ejecutor, self._ejecutor = self._ejecutor, None
+        if ejecutor is not None:
+            # Los únicos hijos de multiprocessing del servidor son los del pool
+            for proceso in multiprocessing.active_children():
+                proceso.terminate()
+            ejecutor.shutdown(wait=True, cancel_futures=True)
+
+    def _ciclo(self):
+        while not self._detener.is_set():
+            self._pendiente.wait(timeout=INTERVALO_REVISION)
+            self._pendiente.clear()
+            if self._detener.is_set():
+                break
+            conn = self.pool.obtener()
+            try:
+                self.revisar(conn)
+            except Exception as e:
+                print(f"Error en la cola de trabajos: {e}")
+            finally:
+                self.pool.devolver(conn)
+
+    def revisar(self, conn):
+        """Marca los interrumpidos, limpia los viejos y lanza los pendientes que quepan"""
+        marcar_interrumpidos(conn, TRABAJOS_SIN_AVANCE_S)
+        if time.monotonic() - self._ultima_limpieza > INTERVALO_LIMPIEZA:
+            self._ultima_limpieza = time.monotonic()
+            for archivo in eliminar_antiguos(conn, TRABAJOS_DIAS_CONSERVAR):
+                # Solo se borran archivos propios (la relación queda en Salidas/Reportes)
+                if os.path.dirname(archivo) == os.path.abspath(self.carpeta) and os.path.exists(archivo):
+                    os.remove(archivo)
+
+        while self.en_curso < self.simultaneos:
+            trabajo_id = reclamar_siguiente(conn, self.simultaneos)
+            if trabajo_id is None:
+                break
+            self._lanzar(conn, trabajo_id)
+
+    def _lanzar(self, conn, trabajo_id):
+        if self._ejecutor is None:
+            os.makedirs(self.carpeta, exist_ok=True)
+            # spawn en todos los sistemas: es lo único que hay en Windows y
+            # evita hacer fork de un proceso con hilos
+            self._ejecutor = ProcessPoolExecutor(max_workers=self.simultaneos,
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=preparar_proceso)
+        with self._lock:
+            self.en_curso += 1
+        try:
+            futuro = self._ejecutor.submit(ejecutar_trabajo, self.pool.ruta_db, trabajo_id, self.carpeta)
+        except Exception as e:
+            with self._lock:
+                self.en_curso -= 1
+            terminar_trabajo(conn, trabajo_id, ERROR, 'Falló', error=f"No se pudo lanzar: {e}")
+            return
+        futuro.add_done_callback(lambda futuro: self._al_terminar(futuro, trabajo_id))
+
+    def _al_terminar(self, futuro, trabajo_id):
+        with self._lock:
+            self.en_curso -= 1
+        if futuro.cancelled() or futuro.exception() is not None:
+            if self._detener.is_set():
+                motivo = "Servidor detenido"
+            else:
+                # El proceso del trabajo murió (p. ej. sin memoria): el pool queda inservible
+                motivo = f"Proceso interrumpido: {futuro.exception()}"
+                print(f"❌ El proceso del trabajo {trabajo_id} terminó de forma inesperada: {futuro.exception()}")
+                ejecutor, self._ejecutor = self._ejecutor, None
+                if ejecutor is not None:
+                    ejecutor.shutdown(wait=False)
+            conn = self.pool.obtener()
+            try:
+                trabajo = obtener_trabajo(conn, trabajo_id)
+                if trabajo and trabajo['estado'] not in ESTADOS_FINALES:
+                    terminar_trabajo(conn, trabajo_id, ERROR, 'Falló', error=motivo)
+            finally:
+                self.pool.devolver(conn)
+        self.solicitar()
+
+
+# ===============================================
+# RUTAS
+# ===============================================
+
+def _respuesta_trabajo(trabajo):
+    trabajo = dict(trabajo)
+    trabajo.pop('archivo')
+    trabajo['url_estado'] = url_for('api_trabajo', trabajo_id=trabajo['id'])
+    if trabajo['estado'] == COMPLETADO:
+        trabajo['url_descarga'] = url_for('descargar_trabajo', trabajo_id=trabajo['id'])
+    return trabajo
+
+
+def api_crear_trabajo():
+    """Pone un trabajo en cola: tipo y sus parámetros por formulario, query o JSON"""
+    args = dict(request.args.items())
+    args.update(request.form.items())
+    cuerpo = request.get_json(silent=True)
+    if cuerpo is not None and not isinstance(cuerpo, dict):
+        return jsonify({'error': 'El cuerpo JSON debe ser un objeto con tipo y parámetros'}), 400
+    args.update(cuerpo or {})
+
+    tipo = TIPOS_TRABAJO.get(args.get('tipo'))
+    if tipo is None:
+        return jsonify({'error': f"Tipo de trabajo desconocido: {args.get('tipo')}",
+                        'tipos': {nombre: t.descripcion for nombre, t in TIPOS_TRABAJO.items()}}), 400
+    try:
+        parametros = tipo.validar(args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = get_db()
+    if contar_por_estado(conn).get(PENDIENTE, 0) >= TRABAJOS_EN_COLA_MAXIMO:
+        return jsonify({'error': f"Hay {TRABAJOS_EN_COLA_MAXIMO} trabajos en cola; intenta más tarde"}), 429
+
+    trabajo_id = crear_trabajo(conn, args['tipo'], parametros)
+    current_app.extensions['trabajos'].solicitar()
+    return jsonify(_respuesta_trabajo(obtener_trabajo(conn, trabajo_id))), 202
+
+
+def api_trabajos():
+    """Últimos trabajos (?limite=) y cuántos hay en cada estado"""
+    conn = get_db()
+    limite = max(1, min(request.args.get('limite', 50, type=int), 500))
+    return jsonify({
+        'trabajos': [_respuesta_trabajo(trabajo) for trabajo in listar_trabajos(conn, limite)],
+        'por_estado': contar_por_estado(conn),
+        'simultaneos': TRABAJOS_SIMULTANEOS,
+        'en_cola_maximo': TRABAJOS_EN_COLA_MAXIMO,
+        'tipos': {nombre: tipo.descripcion for nombre, tipo in TIPOS_TRABAJO.items()},
+    })
+
+
+def api_trabajo(trabajo_id):
+    trabajo = obtener_trabajo(get_db(), trabajo_id)
+    if trabajo is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    return jsonify(_respuesta_trabajo(trabajo))
+
+
+def api_cancelar_trabajo(trabajo_id):
+    conn = get_db()
+    trabajo = obtener_trabajo(conn, trabajo_id)
+    if trabajo is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    if trabajo['estado'] in ESTADOS_FINALES:
+        return jsonify({'error': f"El trabajo ya terminó ({trabajo['estado']})"}), 409
+    cancelar_trabajo(conn, trabajo_id)
+    return jsonify(_respuesta_trabajo(obtener_trabajo(conn, trabajo_id)))
+
+
+def descargar_trabajo(trabajo_id):
+    trabajo = obtener_trabajo(get_db(), trabajo_id)
+    if trabajo is None or trabajo['estado'] != COMPLETADO:
+        return jsonify({'error': 'El trabajo no existe o no ha terminado'}), 404
+    if not trabajo['archivo'] or not os.path.exists(trabajo['archivo']):
+        return jsonify({'error': 'El archivo del trabajo ya no existe'}), 410
+    return send_file(trabajo['archivo'], as_attachment=True, download_name=trabajo['nombre_descarga'])
+
+
+def init_app(app):
+    """Crea la tabla, registra las rutas e inicia el hilo de la cola"""
+    pool = app.extensions['pool_conexiones']
+    conn = pool.obtener()
+    try:
+        asegurar_tabla(conn)
+    finally:
+        pool.devolver(conn)
+
+    cola = ColaTrabajos(pool)
+    app.extensions['trabajos'] = cola
+
+    app.add_url_rule('/api/trabajos', 'api_crear_trabajo', api_crear_trabajo, methods=['POST'])
+    app.add_url_rule('/api/trabajos', 'api_trabajos', api_trabajos)
+    app.add_url_rule('/api/trabajos/<int:trabajo_id>', 'api_trabajo', api_trabajo)
+    app.add_url_rule('/api/trabajos/<int:trabajo_id>/cancelar', 'api_cancelar_trabajo',
+                     api_cancelar_trabajo, methods=['POST'])
+    app.add_url_rule('/trabajos/<int:trabajo_id>/descargar', 'descargar_trabajo', descargar_trabajo)
+
+    # Pendientes que quedaron de antes (otro proceso o un reinicio)
+    cola.iniciar()
+    cola.solicitar()
+    return cola
@@ -0,0 +1,331 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Esquema compartido de la base de datos
+Cambios de esquema idempotentes que usan el panel de control y los scripts
+"""
+
+from .motor_presupuestos import recalcular_presupuestos
+from .motor_proyecciones import sincronizar_proximo_vencimiento
+
+# Columnas generadas (VIRTUAL) que descomponen fecha_vencimiento en año y mes.
+# Permiten filtrar por mes con "anio = ? AND mes = ?" usando índices,
+# en lugar de strftime(), que obliga a recorrer toda la tabla.
+COLUMNAS_PERIODO_EGRESOS = [
+    ("anio", "INTEGER GENERATED ALWAYS AS (CAST(substr(fecha_vencimiento, 1, 4) AS INTEGER)) VIRTUAL"),
+    ("mes", "INTEGER GENERATED ALWAYS AS (CAST(substr(fecha_vencimiento, 6, 2) AS INTEGER)) VIRTUAL"),
+]
+
+INDICES_EGRESOS = [
+    ("idx_egresos_periodo", "Egresos(anio, mes)"),
+    ("idx_egresos_estado_fecha", "Egresos(estado, fecha_vencimiento)"),
+    ("idx_egresos_cat_etq_periodo", "Egresos(categoria, etiqueta, anio, mes)"),
+    # Orden del listado de gastos (fecha_vencimiento, id): paginación por cursor
+    ("idx_egresos_fecha", "Egresos(fecha_vencimiento)"),
+    # Flujo de caja: suma de pendientes por día sin leer la tabla (índice cubriente)
+    ("idx_egresos_estado_fecha_monto", "Egresos(estado, fecha_vencimiento, monto)"),
+    # Series recurrentes pendientes (proyecciones)
+    ("idx_egresos_recurrentes", "Egresos(es_recurrente, estado, fecha_vencimiento)"),
+]
+
+# Triggers que mantienen Presupuestos.monto_gastado al día de forma
+# incremental: restan el aporte anterior del egreso y suman el nuevo.
+SQL_RESTAR_VIEJO = '''
+        UPDATE Presupuestos SET monto_gastado = monto_gastado - OLD.monto
+        WHERE OLD.estado = 'Pagado'
+        AND categoria = OLD.categoria AND etiqueta = OLD.etiqueta
+        AND anio = OLD.anio AND mes = OLD.mes;'''
+
+SQL_SUMAR_NUEVO = '''
+        UPDATE Presupuestos SET monto_gastado = monto_gastado + NEW.monto
+        WHERE NEW.estado = 'Pagado'
+        AND categoria = NEW.categoria AND etiqueta = NEW.etiqueta
+        AND anio = NEW.anio AND mes = NEW.mes;'''
+
+TRIGGERS_PRESUPUESTOS = [
+    ("trg_egresos_presupuesto_insert",
+     f"AFTER INSERT ON Egresos WHEN NEW.estado = 'Pagado' BEGIN {SQL_SUMAR_NUEVO} END"),
+    ("trg_egresos_presupuesto_delete",
+     f"AFTER DELETE ON Egresos WHEN OLD.estado = 'Pagado' BEGIN {SQL_RESTAR_VIEJO} END"),
+    ("trg_egresos_presupuesto_update",
+     "AFTER UPDATE OF monto, estado, categoria, etiqueta, fecha_vencimiento ON Egresos "
+     "WHEN OLD.estado = 'Pagado' OR NEW.estado = 'Pagado' "
+     f"BEGIN {SQL_RESTAR_VIEJO} {SQL_SUMAR_NUEVO} END"),
+]
+
+
+def tabla_existe(conn, nombre):
+    """Indica si una tabla existe en la base de datos"""
+    fila = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (nombre,)
+    ).fetchone()
+    return fila is not None
+
+
+def asegurar_columnas_periodo(conn):
+    """
+    Agrega las columnas generadas anio/mes a Egresos y sus índices.
+    Retorna la lista de cambios aplicados (vacía si ya estaba todo).
+    """
+    cambios = []
+
+    # table_xinfo (y no table_info) incluye las columnas generadas
+    existentes = [col[1] for col in conn.execute("PRAGMA table_xinfo(Egresos)").fetchall()]
+
+    for nombre_columna, definicion in COLUMNAS_PERIODO_EGRESOS:
+        if nombre_columna not in existentes:
+            conn.execute(f"ALTER TABLE Egresos ADD COLUMN {nombre_columna} {definicion}")
+            cambios.append(f"columna Egresos.{nombre_columna}")
+
+    for nombre_indice, definicion in INDICES_EGRESOS:
+        if not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (nombre_indice,)
+        ).fetchone():
+            conn.execute(f"CREATE INDEX {nombre_indice} ON {definicion}")
+            cambios.append(f"índice {nombre_indice}")
+
+    return cambios
+
+
+def asegurar_triggers_presupuestos(conn):
+    """
+    Crea los triggers que mantienen Presupuestos.monto_gastado.
+    Si se acaban de crear, recalcula todo el historial una vez para
+    partir de totales correctos.
+    """
+    if not tabla_existe(conn, 'Presupuestos'):
+        return []
+
+    cambios = []
+    for nombre_trigger, definicion in TRIGGERS_PRESUPUESTOS:
+        if not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (nombre_trigger,)
+        ).fetchone():
+            conn.execute(f"CREATE TRIGGER {nombre_trigger} {definicion}")
+            cambios.append(f"trigger {nombre_trigger}")
+
+    if cambios:
+        recalcular_presupuestos(conn)
+    return cambios
+
+
+# Claves de Configuracion agregadas después de la instalación inicial
+CONFIGURACION_NUEVA = [
+    ('saldo_caja_actual', '0', 'Saldo actual en caja (punto de partida del flujo de caja)'),
+]
+
+
+# Antes Configuracion tenía su propio contador (ConfiguracionVersion y tres
+# triggers); ahora su versión está en VersionesTablas como la de las demás
+TRIGGERS_VERSION_CONFIGURACION_ANTIGUOS = [
+    "trg_configuracion_version_insert",
+    "trg_configuracion_version_update",
+    "trg_configuracion_version_delete",
+]
+
+
+def quitar_version_configuracion(conn):
+    """Borra ConfiguracionVersion y sus triggers si quedaron de una versión anterior"""
+    cambios = []
+    for nombre_trigger in TRIGGERS_VERSION_CONFIGURACION_ANTIGUOS:
+        if conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (nombre_trigger,)
+        ).fetchone():
+            conn.execute(f"DROP TRIGGER {nombre_trigger}")
+            cambios.append(f"sin trigger {nombre_trigger}")
+    if tabla_existe(conn, 'ConfiguracionVersion'):
+        conn.execute("DROP TABLE ConfiguracionVersion")
+        cambios.append("sin tabla ConfiguracionVersion")
+    return cambios
+
+
+# Tablas de las que dependen las cachés del panel (cache_panel) y el
+# servicio de configuración: cada escritura, de cualquier proceso, sube su
+# versión en VersionesTablas
+TABLAS_VERSIONADAS = ('Configuracion', 'Egresos', 'Presupuestos', 'PresupuestosTemplates',
+                      'Categorias', 'Tareas', 'AlertasTendencias')
+
+# Segundos desde 1970 (con fracción) en SQL, para Last-Modified
+SQL_AHORA_EPOCH = "(julianday('now') - 2440587.5) * 86400.0"
+
+
+def asegurar_versiones_tablas(conn):
+    """Crea VersionesTablas y los triggers que suben la versión de cada tabla"""
+    cambios = []
+    if not tabla_existe(conn, 'VersionesTablas'):
+        conn.execute('''
+            CREATE TABLE VersionesTablas (
+                tabla TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0,
+                modificado REAL
+            )
+        ''')
+        cambios.append("tabla VersionesTablas")
+
+    for tabla in TABLAS_VERSIONADAS:
+        if not tabla_existe(conn, tabla):
+            continue
+        conn.execute("INSERT OR IGNORE INTO VersionesTablas (tabla) VALUES (?)", (tabla,))
+        for evento in ('INSERT', 'UPDATE', 'DELETE'):
+            nombre_trigger = f"trg_version_{tabla.lower()}_{evento.lower()}"
+            if conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (nombre_trigger,)
+            ).fetchone():
+                continue
+            conn.execute(f'''
+                CREATE TRIGGER {nombre_trigger} AFTER {evento} ON {tabla} BEGIN
+                    UPDATE VersionesTablas SET version = version + 1, modificado = {SQL_AHORA_EPOCH}
+                    WHERE tabla = '{tabla}';
+                END
+            ''')
+            cambios.append(f"trigger {nombre_trigger}")
+    return cambios
+
+
+def asegurar_configuracion(conn):
+    """Inserta las claves nuevas de Configuracion sin tocar las existentes"""
+    if not tabla_existe(conn, 'Configuracion'):
+        return []
+    cambios = quitar_version_configuracion(conn)
+    for clave, valor, descripcion in CONFIGURACION_NUEVA:
+        cursor = conn.execute('''
+            INSERT OR IGNORE INTO Configuracion (clave, valor, descripcion)
+            VALUES (?, ?, ?)
+        ''', (clave, valor, descripcion))
+        if cursor.rowcount:
+            cambios.append(f"Configuracion.{clave}")
+    return cambios
+
+
+def asegurar_indice_alertas(conn):
+    """
+    Índice único parcial: una sola alerta ACTIVA por categoría, etiqueta y
+    tipo. Permite que el motor de tendencias haga upsert de sus alertas.
+    """
+    if not tabla_existe(conn, 'AlertasTendencias'):
+        return []
+    if conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_alertas_activa_unica'"
+    ).fetchone():
+        return []
+
+    # Desactivar duplicados previos, conservando la alerta más reciente
+    conn.execute('''
+        UPDATE AlertasTendencias SET activa = 0, fecha_resolucion = CURRENT_TIMESTAMP
+        WHERE activa = 1 AND id NOT IN (
+            SELECT MAX(id) FROM AlertasTendencias
+            WHERE activa = 1
+            GROUP BY categoria, etiqueta, tipo_alerta
+        )
+    ''')
+    conn.execute('''
+        CREATE UNIQUE INDEX idx_alertas_activa_unica
+        ON AlertasTendencias(categoria, etiqueta, tipo_alerta) WHERE activa = 1
+    ''')
+    return ["índice idx_alertas_activa_unica"]
+
+
+def asegurar_hash_importacion(conn):
+    """
+    Columna Egresos.hash_contenido con índice único parcial: la llenan las
+    importaciones masivas para no insertar dos veces el mismo gasto. Los
+    gastos creados a mano la dejan en NULL y no participan del índice.
+    """
+    cambios = []
+    existentes = [col[1] for col in conn.execute("PRAGMA table_xinfo(Egresos)").fetchall()]
+    if 'hash_contenido' not in existentes:
+        conn.execute("ALTER TABLE Egresos ADD COLUMN hash_contenido TEXT")
+        cambios.append("columna Egresos.hash_contenido")
+    if not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_egresos_hash_contenido'"
+    ).fetchone():
+        conn.execute('''
+            CREATE UNIQUE INDEX idx_egresos_hash_contenido
+            ON Egresos(hash_contenido) WHERE hash_contenido IS NOT NULL
+        ''')
+        cambios.append("índice idx_egresos_hash_contenido")
+    return cambios
+
+
+# Índices de texto completo (FTS5 con contenido externo: el texto vive
+# solo en la tabla original, el índice guarda los términos y el rowid)
+TABLAS_BUSQUEDA = {
+    'Egresos': ('busqueda_egresos', ('descripcion', 'observaciones', 'categoria')),
+    'Tareas': ('busqueda_tareas', ('descripcion', 'notas', 'cliente_relacionado')),
+    'Clientes': ('busqueda_clientes', ('nombre_completo', 'nit_cc', 'correo_electronico')),
+}
+
+
+def _triggers_busqueda(tabla, tabla_fts, columnas):
+    """Triggers que mantienen el índice FTS5 igual a la tabla original"""
+    lista = ', '.join(columnas)
+    nuevos = ', '.join(f"NEW.{c}" for c in columnas)
+    viejos = ', '.join(f"OLD.{c}" for c in columnas)
+    insertar = f"INSERT INTO {tabla_fts}(rowid, {lista}) VALUES (NEW.id, {nuevos});"
+    borrar = (f"INSERT INTO {tabla_fts}({tabla_fts}, rowid, {lista}) "
+              f"VALUES ('delete', OLD.id, {viejos});")
+    prefijo = f"trg_{tabla_fts}"
+    return [
+        (f"{prefijo}_insert", f"AFTER INSERT ON {tabla} BEGIN {insertar} END"),
+        (f"{prefijo}_delete", f"AFTER DELETE ON {tabla} BEGIN {borrar} END"),
+        # Solo las columnas indexadas: pagar un gasto no toca el índice
+        (f"{prefijo}_update", f"AFTER UPDATE OF {lista} ON {tabla} BEGIN {borrar} {insertar} END"),
+    ]
+
+
+def asegurar_busqueda(conn):
+    """
+    Crea las tablas FTS5 de búsqueda y sus triggers. Al crear una tabla
+    nueva la llena con el contenido actual ('rebuild').
+    Omite las tablas que no existen o a las que les falta alguna columna.
+    """
+    cambios = []
+    for tabla, (tabla_fts, columnas) in TABLAS_BUSQUEDA.items():
+        if not tabla_existe(conn, tabla):
+            continue
+        existentes = {col[1] for col in conn.execute(f"PRAGMA table_info({tabla})").fetchall()}
+        if not set(columnas) <= existentes:
+            continue
+
+        if not tabla_existe(conn, tabla_fts):
+            # unicode61 sin tildes: "credito" encuentra "Crédito";
+            # prefix acelera las búsquedas por prefijo de 2 y 3 letras
+            conn.execute(f'''
+                CREATE VIRTUAL TABLE {tabla_fts} USING fts5(
+                    {', '.join(columnas)},
+                    content='{tabla}', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2',
+                    prefix='2 3'
+                )
+            ''')
+            conn.execute(f"INSERT INTO {tabla_fts}({tabla_fts}) VALUES ('rebuild')")
+            cambios.append(f"búsqueda {tabla_fts}")
+
+        for nombre_trigger, definicion in _triggers_busqueda(tabla, tabla_fts, columnas):
+            if not conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (nombre_trigger,)
+            ).fetchone():
+                conn.execute(f"CREATE TRIGGER {nombre_trigger} {definicion}")
+                cambios.append(f"trigger {nombre_trigger}")
+    return cambios
+
+
+def asegurar_esquema(conn):
+    """
+    Aplica todos los cambios de esquema pendientes.
+    Es seguro llamarla en cada arranque: solo crea lo que falta.
+    """
+    if not tabla_existe(conn, 'Egresos'):
+        return []
+
+    cambios = asegurar_columnas_periodo(conn)
+    cambios += asegurar_triggers_presupuestos(conn)
+    cambios += asegurar_indice_alertas(conn)
+    cambios += asegurar_configuracion(conn)
+    cambios += asegurar_hash_importacion(conn)
+    cambios += asegurar_busqueda(conn)
+    cambios += asegurar_versiones_tablas(conn)
+    if sincronizar_proximo_vencimiento(conn):
+        cambios.append("Egresos.proximo_vencimiento de los recurrentes")
+    conn.commit()
+    return cambios
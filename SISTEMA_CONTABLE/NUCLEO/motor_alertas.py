@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Motor de Clasificación de Alertas de Pago
+Clasifica en SQLite los gastos pendientes en vencidos / hoy / críticos /
+importantes / normales (más los descuentos por vencer), con julianday y
+los umbrales del servicio de configuración. Lo usan el dashboard (detalle por
+gasto) y /api/alertas/resumen (conteos y montos por grupo).
+"""
+
+from datetime import date
+from .motor_configuracion import obtener
+
+GRUPOS_ALERTA = ['vencidos', 'hoy', 'criticos', 'importantes', 'normales']
+DIAS_HORIZONTE = 30          # Solo se alertan gastos que vencen en los próximos 30 días
+DIAS_AVISO_DESCUENTO = 3     # Descuentos que se pierden en 3 días o menos
+DIAS_PROXIMOS = 3            # /api/alertas/resumen: proximos_3_dias, fijo aunque cambie DIAS_ALERTA_CRITICA
+
+# Umbrales de Configuracion (con los de config.py si la clave no existe)
+# y días restantes calculados con julianday respecto a :hoy
+SQL_CLASIFICADOS = '''
+    WITH umbrales AS (
+        SELECT :critica AS critica, :anticipada AS anticipada
+    ),
+    pendientes AS (
+        SELECT id, descripcion, monto, fecha_vencimiento, categoria, etiqueta,
+               tiene_descuento, fecha_limite_descuento, porcentaje_descuento, monto_descuento,
+               CAST(julianday(fecha_vencimiento) - julianday(:hoy) AS INTEGER) AS dias_restantes,
+               CASE WHEN tiene_descuento AND fecha_limite_descuento IS NOT NULL
+                    THEN CAST(julianday(fecha_limite_descuento) - julianday(:hoy) AS INTEGER)
+               END AS dias_restantes_descuento
+        FROM Egresos
+        WHERE estado = 'Pendiente'
+        AND fecha_vencimiento <= date(:hoy, :horizonte)
+    )
+    SELECT p.*,
+           CASE
+               WHEN dias_restantes < 0 THEN 'vencidos'
+               WHEN dias_restantes = 0 THEN 'hoy'
+               WHEN dias_restantes <= u.critica THEN 'criticos'
+               WHEN dias_restantes <= u.anticipada THEN 'importantes'
+               ELSE 'normales'
+           END AS grupo,
+           CASE WHEN dias_restantes_descuento < 0 THEN monto_descuento ELSE 0 END AS descuento_perdido,
+           COALESCE(dias_restantes_descuento BETWEEN 0 AND :aviso_descuento, 0) AS descuento_por_vencer,
+           monto_descuento AS monto_ahorro
+    FROM pendientes p, umbrales u
+'''
+
+
+def _parametros(conn, hoy):
+    hoy = hoy or date.today()
+    return {
+        'hoy': hoy.isoformat(),
+        'horizonte': f'+{DIAS_HORIZONTE} days',
+        'critica': obtener('DIAS_ALERTA_CRITICA', conn),
+        'anticipada': obtener('DIAS_ALERTA_ANTICIPADA', conn),
+        'aviso_descuento': DIAS_AVISO_DESCUENTO,
+    }
+
+
+def clasificar_alertas(conn, hoy=None):
+    """
+    Retorna los gastos pendientes agrupados para el dashboard:
+    {'vencidos': [...], 'hoy': [...], ..., 'descuentos_por_vencer': [...]}.
+    Cada gasto es un dict con dias_restantes, grupo y descuento_perdido.
+    """
+    alertas = {grupo: [] for grupo in GRUPOS_ALERTA}
+    alertas['descuentos_por_vencer'] = []
+
+    filas = conn.execute(SQL_CLASIFICADOS + ' ORDER BY fecha_vencimiento ASC',
+                         _parametros(conn, hoy)).fetchall()
+    for fila in filas:
+        gasto = dict(fila)
+        alertas[gasto['grupo']].append(gasto)
+        if gasto['descuento_por_vencer']:
+            alertas['descuentos_por_vencer'].append(gasto)
+
+    return alertas
+
+
+def resumen_alertas(conn, hoy=None):
+    """
+    Conteos y montos por grupo en una sola pasada:
+    {'vencidos': {'cantidad': n, 'monto': x}, ..., 'descuentos_por_vencer': {...},
+     'proximos_3_dias': {...}}. proximos_3_dias son los que vencen de mañana
+    a DIAS_PROXIMOS días, sin importar los umbrales configurados.
+    """
+    columnas = [
+        f"SUM(grupo = '{grupo}') AS {grupo}_cantidad, "
+        f"TOTAL(CASE WHEN grupo = '{grupo}' THEN monto END) AS {grupo}_monto"
+        for grupo in GRUPOS_ALERTA
+    ]
+    columnas.append("SUM(descuento_por_vencer) AS descuentos_por_vencer_cantidad, "
+                    "TOTAL(CASE WHEN descuento_por_vencer THEN monto_ahorro END) "
+                    "AS descuentos_por_vencer_monto")
+    columnas.append("SUM(dias_restantes BETWEEN 1 AND :proximos) AS proximos_3_dias_cantidad, "
+                    "TOTAL(CASE WHEN dias_restantes BETWEEN 1 AND :proximos THEN monto END) "
+                    "AS proximos_3_dias_monto")
+
+    fila = conn.execute(f'''
+        WITH clasificados AS ({SQL_CLASIFICADOS})
+        SELECT {', '.join(columnas)}
+        FROM clasificados
+    ''', dict(_parametros(conn, hoy), proximos=DIAS_PROXIMOS)).fetchone()
+
+    return {
+        grupo: {
+            'cantidad': fila[f'{grupo}_cantidad'] or 0,
+            'monto': fila[f'{grupo}_monto']
+        }
+        for grupo in GRUPOS_ALERTA + ['descuentos_por_vencer', 'proximos_3_dias']
+    }
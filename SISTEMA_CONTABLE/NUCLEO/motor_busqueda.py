@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Motor de Búsqueda
+Búsqueda de texto completo sobre gastos, tareas y clientes usando los
+índices FTS5 que crea esquema_db.asegurar_busqueda.
+
+Cada palabra se busca por prefijo ("arrien" encuentra "Arriendo") y deben
+aparecer todas. Los resultados de las tres tablas se ordenan juntos por
+relevancia (bm25) y se paginan en SQLite.
+"""
+
+import json
+import re
+import time
+import unicodedata
+from .esquema_db import TABLAS_BUSQUEDA, tabla_existe
+
+# Marcas alrededor de los términos encontrados; quien muestre el texto las
+# cambia por su resaltado después de escapar el HTML
+MARCA_INICIO = '\x02'
+MARCA_FIN = '\x03'
+
+RESULTADOS_POR_PAGINA = 20
+
+# tipo -> (tabla original, pesos bm25, columnas de detalle). Los pesos
+# siguen el orden de columnas de TABLAS_BUSQUEDA: la descripción o el
+# nombre pesan más que el resto.
+TIPOS_BUSQUEDA = {
+    'gastos': ('Egresos', '10.0, 2.0, 4.0',
+               't.categoria AS grupo, t.fecha_vencimiento AS fecha, t.monto AS monto, t.estado AS estado'),
+    'tareas': ('Tareas', '10.0, 2.0, 4.0',
+               't.cliente_relacionado AS grupo, t.fecha_vencimiento AS fecha, NULL AS monto, t.estado AS estado'),
+    'clientes': ('Clientes', '10.0, 6.0, 3.0',
+                 't.ciudad AS grupo, NULL AS fecha, NULL AS monto, t.nit_cc AS estado'),
+}
+
+# Paso 1: solo rowid y puntaje, los mejores `tope` de cada tabla
+SQL_RANGO = '''
+    SELECT * FROM (
+        SELECT '{tipo}' AS tipo, rowid AS id, bm25({fts}, {pesos}) AS rango
+        FROM {fts}
+        WHERE {fts} MATCH :consulta
+        ORDER BY rango
+        LIMIT :tope
+    )
+'''
+
+# Paso 2: datos de la tabla original, solo para las filas de la página
+SQL_DETALLE = '''
+    SELECT t.id AS id, {columnas}, {detalle}
+    FROM {tabla} t
+    WHERE t.id IN (SELECT value FROM json_each(:ids))
+'''
+
+PALABRAS_FRAGMENTO = 12
+
+
+def normalizar(palabra):
+    """Minúsculas y sin tildes, como el tokenizador unicode61 del índice"""
+    descompuesta = unicodedata.normalize('NFKD', palabra.lower())
+    return ''.join(c for c in descompuesta if not unicodedata.combining(c))
+
+
+def preparar_consulta(texto):
+    """
+    Convierte lo que escribe el usuario en una consulta FTS5 segura:
+    cada palabra entre comillas (sin operadores ni sintaxis inválida) y
+    con * para buscar por prefijo. Retorna None si no hay palabras.
+    """
+    palabras = re.findall(r'\w+', texto or '')
+    if not palabras:
+        return None
+    return ' '.join(f'"{palabra}"*' for palabra in palabras)
+
+
+def _resaltar(texto, prefijos, palabras_max=None):
+    """
+    Marca las palabras de `texto` que empiezan por alguno de los prefijos.
+    Con palabras_max recorta a esa cantidad de palabras alrededor de la
+    primera coincidencia. Retorna (texto marcado, hubo coincidencia).
+
+    Hace en Python lo que highlight()/snippet() de FTS5: con prefijos muy
+    comunes, pedirlos a SQLite obliga a recorrer de nuevo todas las
+    coincidencias solo para resaltar una página.
+    """
+    if not texto:
+        return texto, False
+    piezas = re.split(r'(\w+)', str(texto))   # impares = palabras
+    posiciones = [i for i in range(1, len(piezas), 2)
+                  if normalizar(piezas[i]).startswith(prefijos)]
+    for i in posiciones:
+        piezas[i] = f"{MARCA_INICIO}{piezas[i]}{MARCA_FIN}"
+
+    if palabras_max and len(piezas) > 2 * palabras_max + 1:
+        # palabras_max palabras (con sus separadores) desde un poco antes de la coincidencia
+        centro = posiciones[0] if posiciones else 1
+        desde = max(centro - palabras_max // 2 * 2, 0)
+        hasta = min(desde + 2 * palabras_max, len(piezas))
+        recorte = ''.join(piezas[desde:hasta]).strip()
+        return (('…' if desde > 0 else '') + recorte + ('…' if hasta < len(piezas) else '')), bool(posiciones)
+    return ''.join(piezas), bool(posiciones)
+
+
+def tipos_disponibles(conn):
+    """Tipos de resultado cuya tabla FTS5 existe en esta base de datos"""
+    return [tipo for tipo, (tabla, _, _) in TIPOS_BUSQUEDA.items()
+            if tabla_existe(conn, TABLAS_BUSQUEDA[tabla][0])]
+
+
+def buscar(conn, texto, tipo=None, pagina=1, por_pagina=RESULTADOS_POR_PAGINA):
+    """
+    Busca `texto` en gastos, tareas y clientes (o solo en `tipo`).
+    Retorna {'consulta', 'resultados': [...], 'cantidades': {tipo: n},
+             'total', 'pagina', 'paginas', 'duracion_ms'}
+
+    Ordenar por bm25 obliga a puntuar todas las coincidencias, pero el
+    JOIN con la tabla original y el resaltado (en Python, ver _resaltar)
+    se hacen solo para las filas de la página.
+    """
+    inicio = time.perf_counter()
+    consulta = preparar_consulta(texto)
+    tipos = [t for t in tipos_disponibles(conn) if tipo in (None, t)]
+    pagina = max(pagina, 1)
+
+    resultado = {'consulta': consulta, 'resultados': [], 'cantidades': {}, 'total': 0,
+                 'pagina': pagina, 'paginas': 0}
+    if consulta is None or not tipos:
+        resultado['duracion_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+        return resultado
+
+    for t in tipos:
+        tabla_fts = TABLAS_BUSQUEDA[TIPOS_BUSQUEDA[t][0]][0]
+        resultado['cantidades'][t] = conn.execute(
+            f"SELECT COUNT(*) FROM {tabla_fts} WHERE {tabla_fts} MATCH ?", (consulta,)
+        ).fetchone()[0]
+    resultado['total'] = sum(resultado['cantidades'].values())
+    resultado['paginas'] = -(-resultado['total'] // por_pagina)
+
+    con_resultados = [t for t in tipos if resultado['cantidades'][t]]
+    if con_resultados:
+        desde = (pagina - 1) * por_pagina
+        union = ' UNION ALL '.join(
+            SQL_RANGO.format(tipo=t, fts=TABLAS_BUSQUEDA[TIPOS_BUSQUEDA[t][0]][0],
+                             pesos=TIPOS_BUSQUEDA[t][1])
+            for t in con_resultados
+        )
+        pagina_rango = conn.execute(f'''
+            SELECT tipo, id, rango FROM ({union})
+            ORDER BY rango, tipo, id
+            LIMIT :limite OFFSET :desde
+        ''', {'consulta': consulta, 'tope': desde + por_pagina,
+              'limite': por_pagina, 'desde': desde}).fetchall()
+
+        prefijos = tuple(normalizar(p) for p in re.findall(r'\w+', texto))
+        detalles = {}
+        for t in {fila[0] for fila in pagina_rango}:
+            tabla, _, detalle = TIPOS_BUSQUEDA[t]
+            columnas = TABLAS_BUSQUEDA[tabla][1]
+            ids = [fila[1] for fila in pagina_rango if fila[0] == t]
+            for fila in conn.execute(
+                SQL_DETALLE.format(tabla=tabla, detalle=detalle,
+                                   columnas=', '.join(f"t.{c} AS {c}" for c in columnas)),
+                {'ids': json.dumps(ids)}
+            ).fetchall():
+                detalles[(t, fila['id'])] = (fila, columnas)
+
+        for t, id_fila, rango in pagina_rango:
+            fila, columnas = detalles[(t, id_fila)]
+            titulo, _ = _resaltar(fila[columnas[0]], prefijos)
+
+            # Fragmento: la primera otra columna donde aparece la búsqueda
+            fragmento = None
+            for columna in columnas[1:]:
+                texto_columna, coincide = _resaltar(fila[columna], prefijos, PALABRAS_FRAGMENTO)
+                if coincide:
+                    fragmento = texto_columna
+                    break
+
+            resultado['resultados'].append({
+                'tipo': t, 'id': id_fila, 'rango': rango,
+                'titulo': titulo, 'fragmento': fragmento,
+                **{clave: fila[clave] for clave in ('grupo', 'fecha', 'monto', 'estado')}
+            })
+
+    resultado['duracion_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+    return resultado
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Servicio de Configuración
+Un solo punto para leer la configuración en tiempo de ejecución, por capas:
+
+    1. config.py (valores por defecto)
+    2. CONFIGURACION_ARCHIVO (JSON o INI, aplicado al importar config.py)
+    3. tabla Configuracion de la base de datos (la cambia el panel)
+
+Las claves no distinguen mayúsculas: 'DIAS_ALERTA_CRITICA' en config.py es
+'dias_alerta_critica' en la tabla. Los valores de la tabla (texto) se
+convierten al tipo del valor por defecto.
+
+La tabla se lee una vez por base de datos y queda en memoria del proceso.
+Los triggers de Configuracion suben su versión en VersionesTablas (ver
+esquema_db.asegurar_versiones_tablas) en cada cambio, así que cada
+lectura solo consulta ese número: si otro proceso
+(otro worker de servidor_produccion, un script) cambió la tabla, el número
+no coincide y se vuelve a leer.
+
+La ruta de la base de datos no puede venir de la tabla (está dentro de
+ella): DATABASE_PATH sale solo de config.py y del archivo.
+"""
+
+import sqlite3
+import threading
+import config
+from config import convertir_valor
+
+SQL_VERSION = '''
+    SELECT (SELECT file FROM pragma_database_list WHERE name = 'main'),
+           (SELECT version FROM VersionesTablas WHERE tabla = 'Configuracion')
+'''
+
+
+class ServicioConfiguracion:
+    """Valores de config.py con la tabla Configuracion encima, en caché por base"""
+
+    def __init__(self, modulo=config):
+        self.modulo = modulo
+        self._lock = threading.Lock()
+        self._por_base = {}      # archivo de la base -> (versión, {CLAVE: valor})
+        self.lecturas = 0        # veces que se leyó la tabla completa
+        self.aciertos = 0        # veces que bastó con comparar la versión
+
+    def defecto(self, clave, defecto=None):
+        """Valor de config.py (con el archivo aplicado), sin mirar la tabla"""
+        return getattr(self.modulo, clave.upper(), defecto)
+
+    def _leer_tabla(self, conn):
+        filas = conn.execute("SELECT clave, valor FROM Configuracion").fetchall()
+        self.lecturas += 1
+        valores = {}
+        for clave, valor in filas:
+            clave = clave.upper()
+            try:
+                valores[clave] = convertir_valor(valor, self.defecto(clave))
+            except (ValueError, TypeError):
+                print(f"⚠️ Configuracion.{clave.lower()} tiene un valor inválido: {valor!r}")
+        return valores
+
+    def valores_tabla(self, conn):
+        """{CLAVE: valor con tipo} de la tabla Configuracion ({} si no existe)"""
+        try:
+            archivo, version = conn.execute(SQL_VERSION).fetchone()
+        except sqlite3.OperationalError:
+            archivo, version = None, None
+        if version is None:
+            # Base sin versión de Configuracion (asegurar_esquema no ha
+            # corrido): se lee la tabla sin guardarla, si es que existe
+            try:
+                return self._leer_tabla(conn)
+            except sqlite3.OperationalError:
+                return {}
+
+        with self._lock:
+            guardado = self._por_base.get(archivo)
+            if guardado and guardado[0] == version:
+                self.aciertos += 1
+                return guardado[1]
+
+        valores = self._leer_tabla(conn)
+        # Dentro de una transacción la conexión puede ver cambios que
+        # todavía no están confirmados: no se guardan para los demás
+        if not conn.in_transaction:
+            with self._lock:
+                self._por_base[archivo] = (version, valores)
+        return valores
+
+    def obtener(self, clave, conn=None, defecto=None):
+        """Valor de la tabla si la clave existe ahí; si no, el de config.py"""
+        if conn is not None:
+            valores = self.valores_tabla(conn)
+            if clave.upper() in valores:
+                return valores[clave.upper()]
+        return self.defecto(clave, defecto)
+
+    def todos(self, conn=None):
+        """Todas las claves de config.py más las de la tabla, ya combinadas"""
+        valores = {clave: getattr(self.modulo, clave) for clave in self.modulo.claves_configurables()}
+        if conn is not None:
+            valores.update(self.valores_tabla(conn))
+        return valores
+
+    def guardar(self, conn, clave, valor, descripcion=None):
+        """Crea o cambia una clave de la tabla (el commit lo hace quien llama)"""
+        if isinstance(valor, bool):
+            valor = '1' if valor else '0'
+        conn.execute('''
+            INSERT INTO Configuracion (clave, valor, descripcion, fecha_modificacion)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(clave) DO UPDATE SET
+                valor = excluded.valor,
+                descripcion = COALESCE(excluded.descripcion, Configuracion.descripcion),
+                fecha_modificacion = CURRENT_TIMESTAMP
+        ''', (clave.lower(), str(valor), descripcion))
+
+    def limpiar(self):
+        with self._lock:
+            self._por_base.clear()
+
+    def estadisticas(self):
+        return {'bases': len(self._por_base), 'lecturas': self.lecturas, 'aciertos': self.aciertos}
+
+
+configuracion = ServicioConfiguracion()
+
+
+def obtener(clave, conn=None, defecto=None):
+    """Atajo a configuracion.obtener"""
+    return configuracion.obtener(clave, conn, defecto)
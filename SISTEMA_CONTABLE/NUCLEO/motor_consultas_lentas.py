@@ -0,0 +1,371 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Registro de Consultas Lentas
+Detecta las sentencias SQL que pasan de un umbral de tiempo, guarda su
+forma (literales como ?), los parámetros, y su EXPLAIN QUERY PLAN en la
+tabla ConsultasLentas. Marca los planes que recorren completas las tablas
+Egresos o Presupuestos (SCAN sin índice).
+
+El tiempo se toma con los cursores de ConexionMedida: solo lo que tardan
+execute/executemany y cada fetch dentro de SQLite, sumado por sentencia.
+El trabajo de Python entre lecturas (armar filas, escribir el libro,
+renderizar) no cuenta. El EXPLAIN se ejecuta después, sin medidor, con la
+misma conexión.
+
+Uso en scripts:
+    conn = sqlite3.connect(ruta_db, factory=ConexionMedida)
+    with vigilar(conn, 'exportar_excel'):
+        ... consultas ...
+"""
+
+import json
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from .motor_configuracion import obtener
+
+# Tablas grandes cuyo recorrido completo se marca en el registro
+TABLAS_VIGILADAS = ('Egresos', 'Presupuestos')
+
+# Literales que se reemplazan por ? para agrupar consultas por su forma
+# (los parámetros enlazados ya llegan como ?)
+_PATRON_LITERAL = re.compile(r"'(?:[^']|'')*'|(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_PATRON_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_PATRON_ESPACIOS = re.compile(r"\s+")
+_PATRON_ESCANEO = re.compile(r"^SCAN (?:TABLE )?(\w+)(.*)$")
+
+LARGO_MAXIMO_PARAMETRO = 60
+
+SQL_CREAR_TABLA = '''
+    CREATE TABLE IF NOT EXISTS ConsultasLentas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        origen TEXT,
+        forma TEXT NOT NULL,
+        parametros TEXT,
+        duracion_ms REAL NOT NULL,
+        plan TEXT,
+        escaneo_completo INTEGER DEFAULT 0,
+        tablas_escaneadas TEXT
+    )
+'''
+
+
+def normalizar_sql(sql):
+    """Forma de la consulta: sin literales, listas IN (?, ?, ...) colapsadas y en una línea"""
+    sql = _PATRON_LITERAL.sub('?', sql)
+    sql = _PATRON_LISTA.sub('(...)', sql)
+    return _PATRON_ESPACIOS.sub(' ', sql).strip()
+
+
+def extraer_parametros(sql):
+    """Valores literales de la sentencia, en orden (textos largos recortados)"""
+    parametros = []
+    for literal in _PATRON_LITERAL.findall(sql):
+        if literal.startswith("'"):
+            texto = literal[1:-1].replace("''", "'")
+            if len(texto) > LARGO_MAXIMO_PARAMETRO:
+                texto = texto[:LARGO_MAXIMO_PARAMETRO] + '…'
+            parametros.append(texto)
+        else:
+            parametros.append(float(literal) if '.' in literal or 'e' in literal.lower() else int(literal))
+    return parametros
+
+
+class _Sentencia:
+    """Una sentencia medida: su SQL, sus parámetros y el tiempo sumado en SQLite"""
+    __slots__ = ('sql', 'parametros', 'segundos')
+
+    def __init__(self, sql, parametros, segundos):
+        self.sql = sql
+        self.parametros = parametros
+        self.segundos = segundos
+
+
+class TrazadorSQL:
+    """
+    Medidor de una ConexionMedida (conn.medidor = trazador): suma el tiempo
+    de cada sentencia dentro de SQLite y separa las que pasan el umbral
+    (umbral_ms=None o 0: no separa ninguna). Con guardar_sentencias también
+    conserva todas, normalizadas.
+    """
+
+    def __init__(self, umbral_ms=None, guardar_sentencias=False):
+        self.fijar_umbral(umbral_ms)
+        self.guardar_sentencias = guardar_sentencias
+        self.cantidad = 0
+        self.segundos = 0.0
+        self.sentencias = []     # [(sql normalizado, segundos)] si guardar_sentencias
+        self.lentas = []         # [(sql, parámetros, segundos)]
+        self._abiertas = set()   # sentencias con filas aún por leer
+
+    def fijar_umbral(self, umbral_ms):
+        self.umbral = umbral_ms / 1000 if umbral_ms else None
+
+    def empezar(self, sql, parametros, segundos):
+        """Registra una sentencia recién ejecutada; su cursor suma luego las lecturas"""
+        sentencia = _Sentencia(sql, parametros, segundos)
+        self.cantidad += 1
+        self._abiertas.add(sentencia)
+        return sentencia
+
+    def cerrar(self, sentencia):
+        """La sentencia ya no tiene filas por leer: cuenta su tiempo total"""
+        if sentencia not in self._abiertas:
+            return
+        self._abiertas.discard(sentencia)
+        self.segundos += sentencia.segundos
+        if self.guardar_sentencias:
+            self.sentencias.append((normalizar_sql(sentencia.sql), sentencia.segundos))
+        if self.umbral is not None and sentencia.segundos >= self.umbral:
+            self.lentas.append((sentencia.sql, sentencia.parametros, sentencia.segundos))
+
+    def terminar(self):
+        """Cierra las sentencias cuyas filas no se leyeron completas (llamar antes de leer los resultados)"""
+        for sentencia in list(self._abiertas):
+            self.cerrar(sentencia)
+
+
+class CursorMedido(sqlite3.Cursor):
+    """
+    Cursor que mide solo el tiempo que pasa dentro de SQLite: execute,
+    executemany, executescript y cada lectura de filas. Lo que haga Python
+    entre una lectura y la siguiente no cuenta. Sin medidor en la conexión
+    no agrega más que una comprobación por llamada.
+    """
+
+    _medidor = None
+    _sentencia = None
+
+    def _ejecutar(self, ejecutar, sql, parametros, argumentos):
+        self._cerrar()
+        medidor = self.connection.medidor
+        if medidor is None:
+            return ejecutar(*argumentos)
+        inicio = time.perf_counter()
+        try:
+            ejecutar(*argumentos)
+        finally:
+            self._medidor = medidor
+            self._sentencia = medidor.empezar(sql, parametros, time.perf_counter() - inicio)
+            # Sin columnas no hay filas que leer (INSERT, UPDATE, DDL...)
+            if self.description is None:
+                self._cerrar()
+        return self
+
+    def execute(self, sql, parametros=()):
+        return self._ejecutar(super().execute, sql, parametros, (sql, parametros))
+
+    def executemany(self, sql, lista_parametros):
+        return self._ejecutar(super().executemany, sql, None, (sql, lista_parametros))
+
+    def executescript(self, script):
+        return self._ejecutar(super().executescript, script, None, (script,))
+
+    def _leer(self, leer, *argumentos):
+        sentencia = self._sentencia
+        if sentencia is None:
+            return leer(*argumentos)
+        inicio = time.perf_counter()
+        try:
+            return leer(*argumentos)
+        finally:
+            sentencia.segundos += time.perf_counter() - inicio
+
+    def _cerrar(self):
+        if self._sentencia is not None:
+            self._medidor.cerrar(self._sentencia)
+            self._medidor = self._sentencia = None
+
+    def fetchone(self):
+        fila = self._leer(super().fetchone)
+        if fila is None:
+            self._cerrar()
+        return fila
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        filas = self._leer(super().fetchmany, size)
+        if len(filas) < size:
+            self._cerrar()
+        return filas
+
+    def fetchall(self):
+        filas = self._leer(super().fetchall)
+        self._cerrar()
+        return filas
+
+    def __next__(self):
+        try:
+            return self._leer(super().__next__)
+        except StopIteration:
+            self._cerrar()
+            raise
+
+    def close(self):
+        self._cerrar()
+        super().close()
+
+
+class ConexionMedida(sqlite3.Connection):
+    """
+    Conexión cuyos cursores son CursorMedido (sqlite3.connect(ruta,
+    factory=ConexionMedida)). Mide mientras conn.medidor tenga un TrazadorSQL.
+    """
+
+    medidor = None
+
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    # Los atajos de sqlite3.Connection no pasan por cursor(): se redirigen
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, lista_parametros):
+        return self.cursor().executemany(sql, lista_parametros)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+
+def resumir_parametros(sql, parametros):
+    """
+    Parámetros de la sentencia para el registro (textos largos recortados);
+    si no se enlazó ninguno, los literales escritos en el SQL.
+    """
+    if not parametros:
+        return extraer_parametros(sql)
+
+    def recortar(valor):
+        if isinstance(valor, str) and len(valor) > LARGO_MAXIMO_PARAMETRO:
+            return valor[:LARGO_MAXIMO_PARAMETRO] + '…'
+        return valor
+
+    if isinstance(parametros, dict):
+        return {nombre: recortar(valor) for nombre, valor in parametros.items()}
+    return [recortar(valor) for valor in parametros]
+
+
+def analizar_plan(conn, sql, parametros=None):
+    """
+    (plan en texto, tablas vigiladas recorridas completas) del EXPLAIN
+    QUERY PLAN de la sentencia; (None, []) si no se puede explicar.
+    """
+    try:
+        filas = conn.execute(f"EXPLAIN QUERY PLAN {sql}", parametros or ()).fetchall()
+    except Exception:
+        return None, []
+
+    lineas, escaneadas = [], []
+    for fila in filas:
+        detalle = fila[3]
+        lineas.append(detalle)
+        coincidencia = _PATRON_ESCANEO.match(detalle)
+        # "SCAN Egresos" sin "USING ... INDEX" = recorrido de toda la tabla
+        if coincidencia and coincidencia.group(1) in TABLAS_VIGILADAS and 'INDEX' not in coincidencia.group(2):
+            escaneadas.append(coincidencia.group(1))
+    return '\n'.join(lineas), sorted(set(escaneadas))
+
+
+def asegurar_tabla(conn):
+    conn.execute(SQL_CREAR_TABLA)
+
+
+def guardar_lentas(conn, trazador, origen):
+    """
+    Explica y guarda las sentencias lentas del trazador. La conexión no
+    debe tener el medidor puesto (el EXPLAIN también se mediría).
+    Retorna cuántas guardó.
+    """
+    if not trazador.lentas or conn.in_transaction:
+        return 0
+
+    filas = []
+    for sql, parametros, segundos in trazador.lentas:
+        if sql.lstrip().upper().startswith(('EXPLAIN', 'BEGIN', 'COMMIT', 'ROLLBACK', 'PRAGMA')):
+            continue
+        plan, escaneadas = analizar_plan(conn, sql, parametros)
+        filas.append((origen, normalizar_sql(sql),
+                      json.dumps(resumir_parametros(sql, parametros), ensure_ascii=False, default=str),
+                      round(segundos * 1000, 2), plan, 1 if escaneadas else 0, ','.join(escaneadas) or None))
+    trazador.lentas = []
+    if not filas:
+        return 0
+
+    asegurar_tabla(conn)
+    conn.executemany('''
+        INSERT INTO ConsultasLentas (origen, forma, parametros, duracion_ms, plan,
+                                     escaneo_completo, tablas_escaneadas)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', filas)
+    # Conservar solo los registros más recientes
+    conn.execute('''
+        DELETE FROM ConsultasLentas
+        WHERE id <= (SELECT MAX(id) FROM ConsultasLentas) - ?
+    ''', (obtener('CONSULTAS_LENTAS_MAXIMO', conn),))
+    conn.commit()
+    return len(filas)
+
+
+@contextmanager
+def vigilar(conn, origen, umbral_ms=None):
+    """
+    Registra las consultas lentas que se ejecuten con `conn` dentro del
+    bloque (umbral: CONSULTAS_LENTAS_UMBRAL_MS de la configuración si no se
+    indica). `conn` debe haberse abierto con factory=ConexionMedida.
+    """
+    if umbral_ms is None:
+        umbral_ms = obtener('CONSULTAS_LENTAS_UMBRAL_MS', conn)
+    if not umbral_ms:
+        yield None
+        return
+    if not isinstance(conn, ConexionMedida):
+        raise TypeError("vigilar() necesita una conexión abierta con factory=ConexionMedida")
+    trazador = TrazadorSQL(umbral_ms)
+    conn.medidor = trazador
+    try:
+        yield trazador
+    finally:
+        trazador.terminar()
+        conn.medidor = None
+        guardar_lentas(conn, trazador, origen)
+
+
+def resumen_por_forma(conn, desde=None, solo_escaneos=False):
+    """
+    Registros agrupados por forma de consulta, de la más costosa (tiempo
+    total) a la menos: veces, promedio, máximo, orígenes, último plan y
+    parámetros de la ejecución más lenta.
+    """
+    if not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ConsultasLentas'"
+    ).fetchone():
+        return []
+
+    filas = conn.execute(f'''
+        SELECT forma,
+               COUNT(*) AS veces,
+               ROUND(SUM(duracion_ms), 2) AS total_ms,
+               ROUND(AVG(duracion_ms), 2) AS promedio_ms,
+               MAX(duracion_ms) AS max_ms,
+               MAX(escaneo_completo) AS escaneo_completo,
+               GROUP_CONCAT(DISTINCT origen) AS origenes,
+               MIN(fecha) AS primera, MAX(fecha) AS ultima,
+               (SELECT c2.plan FROM ConsultasLentas c2 WHERE c2.forma = c.forma
+                ORDER BY c2.id DESC LIMIT 1) AS plan,
+               (SELECT c2.tablas_escaneadas FROM ConsultasLentas c2 WHERE c2.forma = c.forma
+                ORDER BY c2.id DESC LIMIT 1) AS tablas_escaneadas,
+               (SELECT c2.parametros FROM ConsultasLentas c2 WHERE c2.forma = c.forma
+                ORDER BY c2.duracion_ms DESC LIMIT 1) AS parametros_mas_lenta
+        FROM ConsultasLentas c
+        WHERE (:desde IS NULL OR fecha >= :desde)
+        {'AND escaneo_completo = 1' if solo_escaneos else ''}
+        GROUP BY forma
+        ORDER BY total_ms DESC
+    ''', {'desde': desde}).fetchall()
+    columnas = ('forma', 'veces', 'total_ms', 'promedio_ms', 'max_ms', 'escaneo_completo', 'origenes',
+                'primera', 'ultima', 'plan', 'tablas_escaneadas', 'parametros_mas_lenta')
+    return [dict(zip(columnas, fila)) for fila in filas]
@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Motor de Exportación Columnar
+Exporta Egresos, Presupuestos, Tareas y CuentasCobro a CSV comprimido
+(.csv.gz) o a Parquet (con pyarrow, si está instalado) para abrirlos en
+herramientas de análisis sin pasar por los reportes Excel.
+
+Las filas salen de un cursor de SQLite en bloques de
+EXPORTACION_FILAS_POR_BLOQUE (fetchmany, nunca la tabla completa en
+memoria). Con partición por año los archivos quedan al estilo Hive, que
+pyarrow, pandas, DuckDB o Spark leen como una sola tabla (cada formato
+en su propia carpeta):
+
+    destino/csv/Egresos/anio=2025/parte-00001.csv.gz
+    destino/csv/Egresos/anio=2026/parte-00001.csv.gz
+    destino/csv/Egresos/_exportacion.json
+
+La columna anio de Egresos y Presupuestos va solo en la ruta, no dentro
+del archivo (igual que Spark con partitionBy).
+
+Exportación incremental: _exportacion.json guarda el rowid más alto ya
+exportado. La siguiente corrida lee solo WHERE rowid > ese valor y
+escribe archivos parte-NNNNN nuevos; los anteriores no se tocan.
+Las cuatro tablas usan AUTOINCREMENT, así que un rowid nunca se reutiliza.
+Los cambios a filas ya exportadas (un gasto que pasa a Pagado) y los
+borrados no se detectan: para recogerlos, exportar con completo=True.
+La exportación completa se escribe en <tabla>.tmp y reemplaza a la
+carpeta anterior solo cuando terminó bien: si falla, queda la anterior.
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import time
+from collections import defaultdict
+from datetime import datetime
+from .motor_configuracion import obtener
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Tabla -> expresión SQL del año de cada fila (para la partición)
+TABLAS_COLUMNARES = {
+    'Egresos': "CAST(substr(fecha_vencimiento, 1, 4) AS INTEGER)",
+    'Presupuestos': "anio",
+    'Tareas': "CAST(substr(fecha_vencimiento, 1, 4) AS INTEGER)",
+    'CuentasCobro': "CAST(substr(fecha_emision, 1, 4) AS INTEGER)",
+}
+
+FORMATOS = ('csv', 'parquet')
+EXTENSIONES = {'csv': '.csv.gz', 'parquet': '.parquet'}
+
+COLUMNA_PARTICION = 'anio'
+# Valor de partición para filas sin fecha (pyarrow y Spark lo leen como nulo)
+PARTICION_NULA = '__HIVE_DEFAULT_PARTITION__'
+ARCHIVO_ESTADO = '_exportacion.json'
+
+
+def parquet_disponible():
+    return pyarrow is not None
+
+
+def tipo_arrow(tipo_declarado):
+    """Tipo de pyarrow según la afinidad de SQLite del tipo declarado"""
+    tipo = (tipo_declarado or '').upper()
+    if 'INT' in tipo or 'BOOL' in tipo:
+        return pyarrow.int64()
+    if any(nombre in tipo for nombre in ('REAL', 'FLOA', 'DOUB', 'NUMERIC', 'DECIMAL')):
+        return pyarrow.float64()
+    return pyarrow.string()
+
+
+def columnas_tabla(conn, tabla):
+    """[(columna, tipo declarado)] incluidas las generadas; [] si la tabla no existe"""
+    # table_xinfo: hidden 0 = normal, 2/3 = generada; 1 = oculta de tabla virtual
+    return [(fila[1], fila[2]) for fila in conn.execute(f'PRAGMA table_xinfo("{tabla}")')
+            if fila[6] != 1]
+
+
+# ===============================================
+# ESCRITORES
+# ===============================================
+# Escriben a `ruta + '.tmp'`: confirmar() lo renombra al final de la
+# corrida y descartar() lo borra si la exportación falla.
+
+class EscritorCSV:
+    def __init__(self, ruta, columnas, tipos):
+        self.ruta = ruta
+        self._archivo = io.TextIOWrapper(gzip.open(ruta + '.tmp', 'wb'), encoding='utf-8', newline='')
+        self._csv = csv.writer(self._archivo)
+        self._csv.writerow(columnas)
+
+    def escribir(self, filas):
+        self._csv.writerows(filas)
+
+    def cerrar(self):
+        self._archivo.close()
+
+
+class EscritorParquet:
+    """Un grupo de filas (row group) de Parquet por cada bloque escrito"""
+
+    def __init__(self, ruta, columnas, tipos):
+        self.ruta = ruta
+        self._esquema = pyarrow.schema([(columna, tipo_arrow(tipo)) for columna, tipo in zip(columnas, tipos)])
+        self._escritor = pyarrow.parquet.ParquetWriter(ruta + '.tmp', self._esquema)
+
+    def escribir(self, filas):
+        columnas = list(zip(*filas))
+        try:
+            tabla = pyarrow.table([pyarrow.array(valores, type=campo.type)
+                                   for valores, campo in zip(columnas, self._esquema)],
+                                  schema=self._esquema)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, TypeError) as e:
+            raise ValueError(f"Valor que no corresponde al tipo de su columna: {e}")
+        self._escritor.write_table(tabla)
+
+    def cerrar(self):
+        self._escritor.close()
+
+
+ESCRITORES = {'csv': EscritorCSV, 'parquet': EscritorParquet}
+
+
+def confirmar(escritor):
+    escritor.cerrar()
+    os.replace(escritor.ruta + '.tmp', escritor.ruta)
+    return escritor.ruta
+
+
+def descartar(escritor):
+    try:
+        escritor.cerrar()
+    finally:
+        if os.path.exists(escritor.ruta + '.tmp'):
+            os.remove(escritor.ruta + '.tmp')
+
+
+# ===============================================
+# ESTADO (marca de agua de cada tabla y formato)
+# ===============================================
+
+def leer_estado(carpeta):
+    """{ultimo_rowid, filas, corridas, por_anio, columnas, actualizado} de la última corrida"""
+    ruta = os.path.join(carpeta, ARCHIVO_ESTADO)
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def guardar_estado(carpeta, estado):
+    ruta = os.path.join(carpeta, ARCHIVO_ESTADO)
+    with open(ruta + '.tmp', 'w', encoding='utf-8') as archivo:
+        json.dump(estado, archivo, ensure_ascii=False, indent=2)
+    os.replace(ruta + '.tmp', ruta)
+
+
+def reemplazar_carpeta(nueva, carpeta):
+    """Pone `nueva` (exportación completa ya confirmada) en lugar de `carpeta`"""
+    anterior = carpeta + '.anterior'
+    shutil.rmtree(anterior, ignore_errors=True)
+    if os.path.exists(carpeta):
+        os.replace(carpeta, anterior)
+    try:
+        os.replace(nueva, carpeta)
+    except OSError:
+        if os.path.exists(anterior):
+            os.replace(anterior, carpeta)
+        raise
+    shutil.rmtree(anterior, ignore_errors=True)
+
+
+def ruta_parte(carpeta, anio, corrida, formato, por_anio):
+    if por_anio:
+        carpeta = os.path.join(carpeta, f"{COLUMNA_PARTICION}={PARTICION_NULA if anio is None else anio}")
+    os.makedirs(carpeta, exist_ok=True)
+    return os.path.join(carpeta, f"parte-{corrida:05d}{EXTENSIONES[formato]}")
+
+
+# ===============================================
+# EXPORTACIÓN
+# ===============================================
+
+def exportar_tabla(conn, tabla, destino, formato='csv', por_anio=True, completo=False,
+                   filas_por_bloque=None):
+    """
+    Exporta las filas de `tabla` posteriores a la última exportación (todas
+    con completo=True) a destino/<formato>/<tabla>/. Retorna un resumen con
+    las filas, el rango de rowid y los archivos escritos. Sin filas_por_bloque
+    usa EXPORTACION_FILAS_POR_BLOQUE de la configuración.
+    """
+    if tabla not in TABLAS_COLUMNARES:
+        raise ValueError(f"Tabla no exportable: {tabla} (opciones: {', '.join(TABLAS_COLUMNARES)})")
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato} (opciones: {', '.join(FORMATOS)})")
+    if formato == 'parquet' and not parquet_disponible():
+        raise ValueError("Para exportar a Parquet hay que instalar pyarrow (pip install pyarrow)")
+
+    filas_por_bloque = filas_por_bloque or obtener('EXPORTACION_FILAS_POR_BLOQUE', conn)
+    inicio = time.perf_counter()
+    resultado = {'tabla': tabla, 'formato': formato, 'filas': 0, 'archivos': []}
+    definicion = columnas_tabla(conn, tabla)
+    if not definicion:
+        resultado['omitida'] = 'la tabla no existe en la base de datos'
+        return resultado
+    definicion = [(columna, tipo) for columna, tipo in definicion
+                  if not (por_anio and columna == COLUMNA_PARTICION)]
+    columnas = [columna for columna, _ in definicion]
+
+    carpeta = os.path.join(destino, formato, tabla)
+    anterior = {} if completo else leer_estado(carpeta)
+    if anterior and (anterior['columnas'] != columnas or anterior['por_anio'] != por_anio):
+        raise ValueError(f"{tabla}: cambiaron las columnas o la partición desde la última exportación "
+                         f"({formato}); hay que exportarla completa")
+    # Completa: se escribe aparte y solo reemplaza a la anterior al terminar
+    escritura = carpeta + '.tmp' if completo else carpeta
+    if completo:
+        shutil.rmtree(escritura, ignore_errors=True)   # restos de una corrida fallida
+
+    desde_rowid = anterior.get('ultimo_rowid', 0)
+    corrida = anterior.get('corridas', 0) + 1
+    lista_columnas = ', '.join(f'"{columna}"' for columna in columnas)
+    cursor = conn.execute(f'''
+        SELECT rowid, {TABLAS_COLUMNARES[tabla] if por_anio else 'NULL'}, {lista_columnas}
+        FROM "{tabla}"
+        WHERE rowid > ?
+        ORDER BY rowid
+    ''', (desde_rowid,))
+
+    escritores = {}   # año de partición -> escritor de esta corrida
+    ultimo_rowid = desde_rowid
+    try:
+        try:
+            while True:
+                bloque = cursor.fetchmany(filas_por_bloque)
+                if not bloque:
+                    break
+                por_particion = defaultdict(list)
+                for fila in bloque:
+                    por_particion[fila[1]].append(fila[2:])
+                for anio, filas in por_particion.items():
+                    if anio not in escritores:
+                        escritores[anio] = ESCRITORES[formato](
+                            ruta_parte(escritura, anio, corrida, formato, por_anio),
+                            columnas, [tipo for _, tipo in definicion])
+                    escritores[anio].escribir(filas)
+                resultado['filas'] += len(bloque)
+                ultimo_rowid = bloque[-1][0]
+        except BaseException:
+            for escritor in escritores.values():
+                descartar(escritor)
+            raise
+        finally:
+            cursor.close()
+
+        archivos = [confirmar(escritor) for escritor in escritores.values()]
+        if resultado['filas'] or completo:
+            os.makedirs(escritura, exist_ok=True)
+            guardar_estado(escritura, {
+                'ultimo_rowid': ultimo_rowid,
+                'filas': anterior.get('filas', 0) + resultado['filas'],
+                'corridas': corrida,
+                'por_anio': por_anio,
+                'columnas': columnas,
+                'actualizado': datetime.now().isoformat(timespec='seconds'),
+            })
+        if completo:
+            reemplazar_carpeta(escritura, carpeta)
+    except BaseException:
+        if completo:
+            shutil.rmtree(escritura, ignore_errors=True)
+        raise
+
+    resultado['archivos'] = sorted(os.path.join(carpeta, os.path.relpath(ruta, escritura))
+                                   for ruta in archivos)
+    resultado.update(desde_rowid=desde_rowid, hasta_rowid=ultimo_rowid)
+    resultado['duracion_ms'] = round((time.perf_counter() - inicio) * 1000, 1)
+    return resultado
+
+
+def exportar_tablas(conn, destino, tablas=None, formato='csv', por_anio=True, completo=False,
+                    filas_por_bloque=None):
+    """exportar_tabla para cada tabla (por defecto las cuatro de TABLAS_COLUMNARES)"""
+    return [exportar_tabla(conn, tabla, destino, formato, por_anio, completo, filas_por_bloque)
+            for tabla in (tablas or TABLAS_COLUMNARES)]
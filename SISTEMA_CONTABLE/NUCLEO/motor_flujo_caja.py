@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Motor de Flujo de Caja
+Pronostica el saldo día por día para los próximos 30/60/90 días:
+saldo actual - (gastos pendientes + gastos recurrentes proyectados),
+y marca el primer día en que el saldo cae por debajo de flujo_minimo_caja.
+
+SQLite agrupa los pendientes por día (una fila por día, no por gasto) y el
+saldo acumulado es un np.cumsum: el tiempo no depende de cuántos años de
+historia tenga la tabla Egresos.
+"""
+
+import time
+from datetime import date, timedelta
+import numpy as np
+from .motor_configuracion import obtener
+from .motor_proyecciones import proyeccion_recurrentes
+
+HORIZONTES_DIAS = (30, 60, 90)
+
+# Los vencidos sin pagar cuentan el día 0: todavía hay que pagarlos
+SQL_SALIDAS_POR_DIA = '''
+    SELECT MAX(CAST(julianday(fecha_vencimiento) - julianday(:hoy) AS INTEGER), 0) AS dia,
+           SUM(monto) AS total
+    FROM Egresos
+    WHERE estado = 'Pendiente'
+    AND fecha_vencimiento <= :hasta
+    GROUP BY dia
+'''
+
+
+def leer_configuracion_caja(conn):
+    """(saldo_caja_actual, flujo_minimo_caja) desde Configuracion; los de config.py si no existen"""
+    return float(obtener('SALDO_CAJA_ACTUAL', conn) or 0), float(obtener('FLUJO_MINIMO_CAJA', conn) or 0)
+
+
+def _acumular(salidas, dias, montos):
+    """Suma los montos en su día (np.add.at acumula aunque se repita el día)"""
+    if len(dias):
+        np.add.at(salidas, np.asarray(dias, dtype=np.int64), np.asarray(montos, dtype=np.float64))
+
+
+def pronosticar_flujo(conn, saldo_inicial=None, minimo=None, dias=max(HORIZONTES_DIAS),
+                      hoy=None, incluir_serie=False):
+    """
+    Retorna el pronóstico de caja:
+    {'saldo_inicial', 'minimo', 'horizontes': [...], 'primera_fecha_bajo_minimo',
+     'serie': [...] (solo con incluir_serie), 'duracion_ms'}
+
+    Cada horizonte trae salidas, saldo final, saldo mínimo (y su fecha) y
+    el primer día bajo el mínimo dentro de ese horizonte (o None).
+    """
+    inicio = time.perf_counter()
+    hoy = hoy or date.today()
+    hasta = hoy + timedelta(days=dias)
+
+    saldo_config, minimo_config = leer_configuracion_caja(conn)
+    saldo_inicial = saldo_config if saldo_inicial is None else saldo_inicial
+    minimo = minimo_config if minimo is None else minimo
+
+    salidas = np.zeros(dias + 1)
+
+    # Gastos pendientes ya registrados, agrupados por día en SQLite
+    filas = conn.execute(SQL_SALIDAS_POR_DIA,
+                         {'hoy': hoy.isoformat(), 'hasta': hasta.isoformat()}).fetchall()
+    _acumular(salidas, [f[0] for f in filas], [f[1] for f in filas])
+
+    # Ocurrencias futuras de los recurrentes (no existen aún en Egresos)
+    meses = dias // 28 + 1
+    proyectados = [o for o in proyeccion_recurrentes.proyectar(conn, meses, hoy)
+                   if o['fecha_vencimiento'] <= hasta.isoformat()]
+    _acumular(salidas,
+              [(date.fromisoformat(o['fecha_vencimiento']) - hoy).days for o in proyectados],
+              [o['monto'] for o in proyectados])
+
+    saldo = saldo_inicial - np.cumsum(salidas)
+    bajo_minimo = np.flatnonzero(saldo < minimo)
+    primer_dia_bajo = int(bajo_minimo[0]) if len(bajo_minimo) else None
+
+    def fecha(dia):
+        return (hoy + timedelta(days=int(dia))).isoformat()
+
+    horizontes = []
+    for horizonte in (h for h in HORIZONTES_DIAS if h <= dias):
+        tramo = saldo[:horizonte + 1]
+        dia_minimo = int(np.argmin(tramo))
+        horizontes.append({
+            'dias': horizonte,
+            'hasta': fecha(horizonte),
+            'salidas': float(salidas[:horizonte + 1].sum()),
+            'saldo_final': float(tramo[-1]),
+            'saldo_minimo': float(tramo[dia_minimo]),
+            'fecha_saldo_minimo': fecha(dia_minimo),
+            'primera_fecha_bajo_minimo': (fecha(primer_dia_bajo)
+                                          if primer_dia_bajo is not None and primer_dia_bajo <= horizonte
+                                          else None),
+        })
+
+    resultado = {
+        'fecha': hoy.isoformat(),
+        'saldo_inicial': saldo_inicial,
+        'minimo': minimo,
+        'horizontes': horizontes,
+        'primera_fecha_bajo_minimo': fecha(primer_dia_bajo) if primer_dia_bajo is not None else None,
+        'recurrentes_proyectados': len(proyectados),
+    }
+    if incluir_serie:
+        resultado['serie'] = [
+            {'fecha': fecha(dia), 'salidas': float(salidas[dia]), 'saldo': float(saldo[dia])}
+            for dia in range(dias + 1)
+        ]
+    resultado['duracion_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+    return resultado
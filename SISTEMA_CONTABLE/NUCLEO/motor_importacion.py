@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Motor de Importación de Egresos
+Carga masiva de gastos desde CSV o Excel (.xlsx).
+
+El archivo se lee fila por fila (csv o openpyxl en modo read_only, nunca
+completo en memoria), cada fila se valida y las válidas se insertan en
+lotes con executemany dentro de una sola transacción.
+
+Cada gasto importado guarda un hash de su contenido (descripción, monto,
+fecha, categoría, etiqueta) con índice único: volver a importar el mismo
+archivo, o uno que se cruza con otro ya cargado, omite los repetidos.
+"""
+
+import csv
+import hashlib
+import io
+import math
+import time
+import zipfile
+from datetime import date, datetime
+from .motor_configuracion import obtener
+from .motor_proyecciones import sincronizar_proximo_vencimiento
+from .motor_recurrencias import MESES_POR_FRECUENCIA
+
+# Nombre de columna en el archivo -> columna de Egresos
+# (encabezados sin tildes ni mayúsculas, ver _normalizar_encabezado)
+ALIAS_COLUMNAS = {
+    'descripcion': 'descripcion', 'concepto': 'descripcion', 'detalle': 'descripcion',
+    'monto': 'monto', 'valor': 'monto',
+    'fecha_vencimiento': 'fecha_vencimiento', 'fecha': 'fecha_vencimiento', 'vencimiento': 'fecha_vencimiento',
+    'categoria': 'categoria',
+    'etiqueta': 'etiqueta',
+    'estado': 'estado',
+    'observaciones': 'observaciones',
+    'es_recurrente': 'es_recurrente', 'recurrente': 'es_recurrente',
+    'frecuencia': 'frecuencia',
+}
+
+COLUMNAS_OBLIGATORIAS = ('descripcion', 'monto', 'fecha_vencimiento')
+
+ESTADOS_VALIDOS = ('Pendiente', 'Pagado')
+
+VALORES_SI = ('1', 'si', 'sí', 'true', 'x')
+
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d')
+
+# Errores detallados que se devuelven (el conteo de rechazadas es completo)
+MAX_ERRORES_REPORTADOS = 50
+
+SQL_INSERTAR = '''
+    INSERT OR IGNORE INTO Egresos (
+        descripcion, monto, fecha_vencimiento, categoria, etiqueta, estado,
+        observaciones, es_recurrente, frecuencia, fecha_pago, hash_contenido
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+class FilaInvalida(ValueError):
+    """Fila del archivo que no se puede importar (el mensaje dice por qué)"""
+
+
+def _normalizar_encabezado(texto):
+    texto = str(texto or '').strip().lower().replace(' ', '_')
+    for con_tilde, sin_tilde in zip('áéíóú', 'aeiou'):
+        texto = texto.replace(con_tilde, sin_tilde)
+    return texto
+
+
+def _numero(valor):
+    """
+    Monto desde número o texto: '1500000', '$ 1.500.000', '1.500.000,50'
+    o '1,500,000.50'. El último separador seguido de 1 o 2 dígitos es el
+    decimal; los demás son de miles. Rechaza nan e infinito.
+    """
+    if isinstance(valor, (int, float)):
+        return _finito(float(valor), valor)
+    texto = str(valor).replace('$', '').replace(' ', '').strip()
+    if not texto:
+        raise FilaInvalida('monto vacío')
+
+    ultimo = max(texto.rfind('.'), texto.rfind(','))
+    if ultimo != -1 and len(texto) - ultimo - 1 in (1, 2):
+        entero, decimales = texto[:ultimo], texto[ultimo + 1:]
+    else:
+        entero, decimales = texto, ''
+    entero = entero.replace('.', '').replace(',', '')
+    try:
+        numero = float(f"{entero}.{decimales}" if decimales else entero)
+    except ValueError:
+        raise FilaInvalida(f'monto inválido: {valor!r}')
+    return _finito(numero, valor)
+
+
+def _finito(numero, valor):
+    if not math.isfinite(numero):
+        raise FilaInvalida(f'monto inválido: {valor!r}')
+    return numero
+
+
+def _fecha(valor):
+    """'YYYY-MM-DD' desde date/datetime (Excel) o texto en los formatos usuales"""
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    texto = str(valor).strip()
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato).date().isoformat()
+        except ValueError:
+            continue
+    raise FilaInvalida(f'fecha inválida: {valor!r}')
+
+
+def _texto(valor):
+    if valor is None:
+        return None
+    texto = str(valor).strip()
+    return texto or None
+
+
+def hash_contenido(descripcion, monto, fecha_vencimiento, categoria, etiqueta):
+    """Huella del gasto: iguales en estos campos = mismo gasto"""
+    partes = (descripcion.lower(), f"{monto:.2f}", fecha_vencimiento,
+              (categoria or '').lower(), (etiqueta or '').upper())
+    return hashlib.sha1('\x1f'.join(partes).encode('utf-8')).hexdigest()
+
+
+def validar_fila(fila, categoria_defecto=None, etiqueta_defecto=None, etiquetas=None):
+    """
+    Convierte una fila {columna: valor} en la tupla de SQL_INSERTAR.
+    Lanza FilaInvalida si falta un dato obligatorio o alguno no es válido.
+    `etiquetas` son las válidas (ETIQUETAS de la configuración si no se
+    indican); la primera es la etiqueta por defecto.
+    """
+    etiquetas = etiquetas or obtener('ETIQUETAS')
+    faltantes = [c for c in COLUMNAS_OBLIGATORIAS if fila.get(c) in (None, '')]
+    if faltantes:
+        raise FilaInvalida(f"falta {', '.join(faltantes)}")
+
+    descripcion = _texto(fila['descripcion'])
+    if descripcion is None:
+        raise FilaInvalida('falta descripcion')
+    monto = _numero(fila['monto'])
+    if monto <= 0:
+        raise FilaInvalida(f'monto debe ser mayor que cero: {monto}')
+    fecha_vencimiento = _fecha(fila['fecha_vencimiento'])
+
+    categoria = _texto(fila.get('categoria')) or categoria_defecto
+    etiqueta = (_texto(fila.get('etiqueta')) or etiqueta_defecto or etiquetas[0]).upper()
+    if etiqueta not in etiquetas:
+        raise FilaInvalida(f"etiqueta inválida: {etiqueta} (use {', '.join(etiquetas)})")
+
+    estado = (_texto(fila.get('estado')) or 'Pendiente').capitalize()
+    if estado not in ESTADOS_VALIDOS:
+        raise FilaInvalida(f'estado inválido: {estado}')
+
+    es_recurrente = 1 if (_texto(fila.get('es_recurrente')) or '').lower() in VALORES_SI else 0
+    frecuencia = None
+    if es_recurrente:
+        frecuencia = (_texto(fila.get('frecuencia')) or 'Mensual').capitalize()
+        if frecuencia not in MESES_POR_FRECUENCIA:
+            raise FilaInvalida(f'frecuencia inválida: {frecuencia}')
+
+    # Un gasto histórico ya pagado se da por pagado en su vencimiento
+    fecha_pago = fecha_vencimiento if estado == 'Pagado' else None
+
+    return (descripcion, monto, fecha_vencimiento, categoria, etiqueta, estado,
+            _texto(fila.get('observaciones')), es_recurrente, frecuencia, fecha_pago,
+            hash_contenido(descripcion, monto, fecha_vencimiento, categoria, etiqueta))
+
+
+def _filas_con_encabezado(filas):
+    """
+    Recibe filas como listas (la primera es el encabezado) y genera
+    (número de fila, {columna de Egresos: valor}). Ignora filas vacías y
+    columnas que no se reconocen.
+    """
+    filas = iter(filas)
+    encabezado = next(filas, None)
+    if encabezado is None:
+        return
+    columnas = [ALIAS_COLUMNAS.get(_normalizar_encabezado(c)) for c in encabezado]
+    faltantes = [c for c in COLUMNAS_OBLIGATORIAS if c not in columnas]
+    if faltantes:
+        raise ValueError(f"El archivo no tiene las columnas: {', '.join(faltantes)}")
+
+    for numero, valores in enumerate(filas, start=2):
+        if not any(v not in (None, '') for v in valores):
+            continue
+        yield numero, {c: v for c, v in zip(columnas, valores) if c}
+
+
+def leer_csv(archivo):
+    """Filas de un CSV (ruta o archivo binario); detecta ';' o ',' como separador"""
+    if isinstance(archivo, str):
+        with open(archivo, 'rb') as f:
+            yield from leer_csv(f)
+        return
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    muestra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=';,\t')
+    except csv.Error:
+        dialecto = csv.excel
+    try:
+        yield from _filas_con_encabezado(csv.reader(texto, dialecto))
+    finally:
+        texto.detach()
+
+
+def leer_xlsx(archivo, hoja=None):
+    """Filas de un .xlsx (ruta o archivo) en modo read_only: no carga el libro completo"""
+    from openpyxl import load_workbook
+
+    try:
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+    except zipfile.BadZipFile:
+        raise ValueError("El archivo no es un Excel .xlsx válido")
+    try:
+        if hoja and hoja not in libro.sheetnames:
+            raise ValueError(f"El libro no tiene la hoja '{hoja}' (hojas: {', '.join(libro.sheetnames)})")
+        hoja_excel = libro[hoja] if hoja else libro.worksheets[0]
+        yield from _filas_con_encabezado(hoja_excel.iter_rows(values_only=True))
+    finally:
+        libro.close()
+
+
+def leer_archivo(archivo, nombre, hoja=None):
+    """Elige el lector según la extensión de `nombre` (.csv o .xlsx)"""
+    extension = nombre.lower().rsplit('.', 1)[-1]
+    if extension == 'csv':
+        return leer_csv(archivo)
+    if extension in ('xlsx', 'xlsm'):
+        return leer_xlsx(archivo, hoja)
+    raise ValueError(f"Formato no soportado: .{extension} (use .csv o .xlsx)")
+
+
+def importar_egresos(conn, filas, tamano_lote=None, simular=False, categoria_defecto=None):
+    """
+    Inserta las filas (de leer_archivo o cualquier iterable de
+    (número, {columna: valor})) en una sola transacción, en lotes de
+    `tamano_lote` (IMPORTACION_TAMANO_LOTE de la configuración si no se indica).
+
+    Retorna {'leidas', 'insertadas', 'omitidas', 'rechazadas',
+             'errores': [{'fila', 'motivo'}], 'meses_afectados',
+             'duracion_ms', 'filas_por_segundo'}
+    'omitidas' son las repetidas (ya importadas o duplicadas en el archivo).
+    Con simular=True valida e inserta, pero deshace todo al final.
+    Si el llamador ya tenía una transacción abierta, el trabajo va en un
+    SAVEPOINT y confirmar la transacción le queda al llamador.
+    """
+    inicio = time.perf_counter()
+    tamano_lote = tamano_lote or obtener('IMPORTACION_TAMANO_LOTE', conn)
+    etiquetas = obtener('ETIQUETAS', conn)
+    resultado = {'leidas': 0, 'insertadas': 0, 'omitidas': 0, 'rechazadas': 0, 'errores': []}
+    meses = set()
+    lote = []
+
+    def insertar_lote():
+        cursor = conn.executemany(SQL_INSERTAR, lote)
+        resultado['insertadas'] += cursor.rowcount
+        resultado['omitidas'] += len(lote) - cursor.rowcount
+        lote.clear()
+
+    def deshacer():
+        if propia:
+            conn.rollback()
+        else:
+            conn.execute('ROLLBACK TO importar_egresos')
+            conn.execute('RELEASE importar_egresos')
+
+    propia = not conn.in_transaction
+    conn.execute('BEGIN IMMEDIATE' if propia else 'SAVEPOINT importar_egresos')
+    try:
+        for numero, fila in filas:
+            resultado['leidas'] += 1
+            try:
+                valores = validar_fila(fila, categoria_defecto, etiquetas=etiquetas)
+            except FilaInvalida as e:
+                resultado['rechazadas'] += 1
+                if len(resultado['errores']) < MAX_ERRORES_REPORTADOS:
+                    resultado['errores'].append({'fila': numero, 'motivo': str(e)})
+                continue
+
+            lote.append(valores)
+            meses.add(valores[2][:7])
+            if len(lote) >= tamano_lote:
+                insertar_lote()
+        if lote:
+            insertar_lote()
+
+        # Los recurrentes importados necesitan su próximo vencimiento
+        sincronizar_proximo_vencimiento(conn)
+
+        if simular:
+            deshacer()
+        elif propia:
+            conn.commit()
+        else:
+            conn.execute('RELEASE importar_egresos')
+    except Exception:
+        deshacer()
+        raise
+
+    duracion = time.perf_counter() - inicio
+    resultado['meses_afectados'] = sorted(meses)
+    resultado['duracion_ms'] = round(duracion * 1000, 2)
+    resultado['filas_por_segundo'] = round(resultado['leidas'] / duracion) if duracion else 0
+    return resultado
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Motor de Pago de Gastos
+Paga uno o muchos gastos en una sola transacción: un UPDATE para todos,
+la siguiente ocurrencia de los recurrentes con un solo executemany, y los
+presupuestos al día por los triggers de Egresos (NUCLEO/esquema_db.py)
+dentro de esa misma transacción.
+"""
+
+import json
+import time
+from .motor_recurrencias import siguiente_ocurrencia, fecha_siguiente
+
+# Los ids llegan como un único parámetro JSON: sin límite de "?" por consulta
+SQL_PENDIENTES = '''
+    SELECT * FROM Egresos
+    WHERE id IN (SELECT value FROM json_each(?))
+    AND estado = 'Pendiente'
+    ORDER BY fecha_vencimiento, id
+'''
+
+SQL_PAGAR = '''
+    UPDATE Egresos
+    SET estado = 'Pagado', fecha_pago = CURRENT_TIMESTAMP, usuario_que_pago = ?
+    WHERE id IN (SELECT value FROM json_each(?))
+    AND estado = 'Pendiente'
+'''
+
+SQL_INSERTAR_SIGUIENTE = '''
+    INSERT INTO Egresos (descripcion, monto, fecha_vencimiento, categoria, etiqueta,
+                        tiene_descuento, fecha_limite_descuento, porcentaje_descuento, monto_descuento,
+                        es_recurrente, frecuencia, proximo_vencimiento)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def pagar_gastos(conn, ids, usuario):
+    """
+    Marca como pagados los gastos pendientes de `ids` y crea la siguiente
+    ocurrencia de los recurrentes. Todo o nada: si algo falla, se revierte.
+
+    Los ids inexistentes o ya pagados se ignoran (no se duplica la
+    ocurrencia siguiente de un gasto que ya se había pagado).
+
+    Si el llamador ya tenía una transacción abierta, el trabajo va en un
+    SAVEPOINT y confirmar la transacción le queda al llamador.
+    """
+    inicio = time.perf_counter()
+    ids = sorted({int(i) for i in ids})
+    ids_json = json.dumps(ids)
+
+    # Bloqueo de escritura desde la lectura: nadie paga estos gastos entre medio
+    propia = not conn.in_transaction
+    conn.execute('BEGIN IMMEDIATE' if propia else 'SAVEPOINT pagar_gastos')
+    try:
+        gastos = conn.execute(SQL_PENDIENTES, (ids_json,)).fetchall()
+        pagados = conn.execute(SQL_PAGAR, (usuario, ids_json)).rowcount
+
+        siguientes = []
+        filas = []
+        for gasto in gastos:
+            if not gasto['es_recurrente']:
+                continue
+            proxima_fecha, fecha_limite_desc = siguiente_ocurrencia(gasto)
+            siguientes.append({'id_pagado': gasto['id'],
+                               'fecha_vencimiento': proxima_fecha.strftime('%Y-%m-%d')})
+            filas.append((gasto['descripcion'], gasto['monto'], proxima_fecha.strftime('%Y-%m-%d'),
+                          gasto['categoria'], gasto['etiqueta'], gasto['tiene_descuento'],
+                          fecha_limite_desc.strftime('%Y-%m-%d') if fecha_limite_desc else None,
+                          gasto['porcentaje_descuento'], gasto['monto_descuento'], 1, gasto['frecuencia'],
+                          fecha_siguiente(proxima_fecha.strftime('%Y-%m-%d'), gasto['frecuencia'])))
+
+        if filas:
+            conn.executemany(SQL_INSERTAR_SIGUIENTE, filas)
+        if propia:
+            conn.commit()
+        else:
+            conn.execute('RELEASE pagar_gastos')
+    except Exception:
+        if propia:
+            conn.rollback()
+        else:
+            conn.execute('ROLLBACK TO pagar_gastos')
+            conn.execute('RELEASE pagar_gastos')
+        raise
+
+    pagados_ids = {gasto['id'] for gasto in gastos}
+    # Los gastos sin fecha de vencimiento no afectan a ningún mes
+    meses = sorted({(int(g['fecha_vencimiento'][:4]), int(g['fecha_vencimiento'][5:7]))
+                    for g in gastos if g['fecha_vencimiento']})
+
+    return {
+        'pagados': pagados,
+        'ids_pagados': sorted(pagados_ids),
+        'ignorados': [i for i in ids if i not in pagados_ids],
+        'siguientes': siguientes,
+        'meses_afectados': [f'{anio}-{mes:02d}' for anio, mes in meses],
+        'monto_total': sum(gasto['monto'] for gasto in gastos),
+        'duracion_ms': round((time.perf_counter() - inicio) * 1000, 2)
+    }
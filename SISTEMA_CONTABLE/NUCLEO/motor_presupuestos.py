@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Motor de Recálculo de Presupuestos
+Recalcula Presupuestos.monto_gastado a partir de los Egresos pagados con
+una sola sentencia UPDATE ... FROM agregada, en una sola transacción.
+Lo usan el panel de control y los scripts de presupuestos.
+
+En el día a día monto_gastado lo mantienen los triggers de Egresos
+(ver esquema_db.py); este motor sirve para reconstruirlo y verificarlo.
+"""
+
+import time
+
+# Una fila por presupuesto del rango con el total pagado de su categoría,
+# etiqueta y mes. El LEFT JOIN deja en 0 los presupuestos sin gastos.
+SQL_RECALCULO = '''
+    UPDATE Presupuestos
+    SET monto_gastado = calculado.total
+    FROM (
+        SELECT p.id, COALESCE(SUM(e.monto), 0) AS total
+        FROM Presupuestos p
+        LEFT JOIN Egresos e
+            ON e.categoria = p.categoria
+            AND e.etiqueta = p.etiqueta
+            AND e.anio = p.anio
+            AND e.mes = p.mes
+            AND e.estado = 'Pagado'
+        WHERE {filtro}
+        GROUP BY p.id
+    ) AS calculado
+    WHERE Presupuestos.id = calculado.id
+    AND Presupuestos.monto_gastado IS NOT calculado.total
+'''
+
+FILTRO_RANGO = "(p.anio * 12 + p.mes) BETWEEN ? AND ?"
+
+
+def _indice_mes(anio, mes):
+    """Convierte (anio, mes) en un número de mes continuo"""
+    return int(anio) * 12 + int(mes)
+
+
+def _filtro_rango(desde, hasta):
+    """
+    (filtro sobre Presupuestos p, parámetros) para el rango de meses.
+    desde / hasta: tuplas (anio, mes), inclusivas. Sin ninguna de las dos,
+    todo el historial; si se omite una, el rango queda abierto.
+    """
+    if desde is None and hasta is None:
+        return "1 = 1", []
+    inicio_rango = _indice_mes(*desde) if desde else 0
+    fin_rango = _indice_mes(*hasta) if hasta else _indice_mes(9999, 12)
+    return FILTRO_RANGO, [inicio_rango, fin_rango]
+
+
+def recalcular_presupuestos(conn, desde=None, hasta=None):
+    """
+    Recalcula el monto gastado de los presupuestos en el rango indicado
+    (ver _filtro_rango).
+
+    Retorna un diccionario con los presupuestos evaluados, los que
+    cambiaron y la duración en milisegundos.
+    """
+    filtro, params = _filtro_rango(desde, hasta)
+
+    inicio = time.perf_counter()
+    try:
+        evaluados = conn.execute(
+            f"SELECT COUNT(*) FROM Presupuestos p WHERE {filtro}", params
+        ).fetchone()[0]
+        cursor = conn.execute(SQL_RECALCULO.format(filtro=filtro), params)
+        actualizados = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return {
+        'evaluados': evaluados,
+        'actualizados': actualizados,
+        'duracion_ms': round((time.perf_counter() - inicio) * 1000, 2)
+    }
+
+
+def listar_presupuestos(conn, desde=None, hasta=None):
+    """
+    (mes, anio, categoria, etiqueta, monto_presupuestado, monto_gastado) de
+    los presupuestos del rango (ver _filtro_rango), por mes y categoría.
+    """
+    filtro, params = _filtro_rango(desde, hasta)
+    return conn.execute(f'''
+        SELECT p.mes, p.anio, p.categoria, p.etiqueta, p.monto_presupuestado, p.monto_gastado
+        FROM Presupuestos p
+        WHERE {filtro}
+        ORDER BY p.anio, p.mes, p.categoria
+    ''', params).fetchall()
+
+
+def recalcular_mes(conn, mes, anio):
+    """Recalcula los presupuestos de un solo mes"""
+    return recalcular_presupuestos(conn, (anio, mes), (anio, mes))
+
+
+def verificar_consistencia(conn, tolerancia=0.01):
+    """
+    Compara el monto_gastado mantenido por los triggers contra un
+    recálculo completo, sin modificar nada.
+    Retorna la lista de presupuestos con diferencias.
+    """
+    filas = conn.execute('''
+        SELECT p.id, p.mes, p.anio, p.categoria, p.etiqueta,
+               p.monto_gastado AS registrado,
+               COALESCE(SUM(e.monto), 0) AS calculado
+        FROM Presupuestos p
+        LEFT JOIN Egresos e
+            ON e.categoria = p.categoria
+            AND e.etiqueta = p.etiqueta
+            AND e.anio = p.anio
+            AND e.mes = p.mes
+            AND e.estado = 'Pagado'
+        GROUP BY p.id
+        HAVING ABS(COALESCE(p.monto_gastado, 0) - COALESCE(SUM(e.monto), 0)) > ?
+        ORDER BY p.anio, p.mes, p.categoria
+    ''', (tolerancia,)).fetchall()
+
+    return [
+        {'id': f[0], 'mes': f[1], 'anio': f[2], 'categoria': f[3], 'etiqueta': f[4],
+         'registrado': f[5], 'calculado': f[6]}
+        for f in filas
+    ]
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Motor de Proyección de Gastos Recurrentes
+Calcula, sin escribir filas en Egresos, las próximas ocurrencias de cada
+gasto recurrente pendiente dentro de un horizonte de meses, con las mismas
+reglas que el pago (NUCLEO/motor_recurrencias.py).
+
+Cada serie es el gasto recurrente pendiente que la encabeza (al pagarlo se
+crea el siguiente). Sus ocurrencias se guardan en memoria y se recalculan
+solo cuando cambia esa fila (fecha, monto, frecuencia, ...).
+"""
+
+import threading
+from datetime import date
+from dateutil.relativedelta import relativedelta
+from .motor_recurrencias import ocurrencias, fecha_siguiente
+from .motor_configuracion import obtener
+
+# Filas que encabezan una serie recurrente
+SQL_SERIES = '''
+    SELECT id, descripcion, monto, fecha_vencimiento, categoria, etiqueta,
+           tiene_descuento, fecha_limite_descuento, frecuencia
+    FROM Egresos
+    WHERE estado = 'Pendiente' AND es_recurrente = 1
+    AND fecha_vencimiento IS NOT NULL
+'''
+
+# Si cambia alguna de estas columnas, la proyección de la serie se recalcula
+COLUMNAS_FIRMA = ('descripcion', 'monto', 'fecha_vencimiento', 'categoria', 'etiqueta',
+                  'tiene_descuento', 'fecha_limite_descuento', 'frecuencia')
+
+
+class ProyeccionRecurrentes:
+    """Caché de ocurrencias futuras por serie (id del gasto que la encabeza)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}   # id -> (firma, hasta, [ocurrencias])
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _ocurrencias_serie(self, gasto, hasta):
+        """Ocurrencias de una serie hasta `hasta`, desde la caché si la fila no cambió"""
+        firma = tuple(gasto[columna] for columna in COLUMNAS_FIRMA)
+        with self._lock:
+            entrada = self._series.get(gasto['id'])
+            if entrada and entrada[0] == firma and entrada[1] >= hasta:
+                self.aciertos += 1
+                return [o for o in entrada[2] if o['fecha_vencimiento'] <= hasta.isoformat()]
+            self.fallos += 1
+
+        lista = []
+        for proxima_fecha, fecha_limite_desc in ocurrencias(gasto, cantidad=None):
+            if proxima_fecha > hasta:
+                break
+            lista.append({
+                'id_serie': gasto['id'],
+                'descripcion': gasto['descripcion'],
+                'monto': gasto['monto'],
+                'fecha_vencimiento': proxima_fecha.isoformat(),
+                'fecha_limite_descuento': fecha_limite_desc.isoformat() if fecha_limite_desc else None,
+                'categoria': gasto['categoria'],
+                'etiqueta': gasto['etiqueta'],
+                'frecuencia': gasto['frecuencia'],
+                'anio': proxima_fecha.year,
+                'mes': proxima_fecha.month,
+            })
+
+        with self._lock:
+            self._series[gasto['id']] = (firma, hasta, lista)
+        return lista
+
+    def proyectar(self, conn, meses=None, hoy=None):
+        """
+        Ocurrencias futuras de todos los gastos recurrentes pendientes que
+        vencen de hoy a `meses` meses (MESES_PROYECCION_RECURRENTES si no se
+        indica), ordenadas por fecha. No incluye la fila pendiente en sí
+        (esa ya existe en Egresos).
+        """
+        if meses is None:
+            meses = obtener('MESES_PROYECCION_RECURRENTES', conn)
+        hoy = hoy or date.today()
+        hasta = hoy + relativedelta(months=meses)
+
+        series = conn.execute(SQL_SERIES).fetchall()
+        resultado = []
+        for gasto in series:
+            resultado.extend(o for o in self._ocurrencias_serie(gasto, hasta)
+                             if o['fecha_vencimiento'] >= hoy.isoformat())
+
+        # Series que ya no existen (pagadas, eliminadas o no recurrentes)
+        vigentes = {gasto['id'] for gasto in series}
+        with self._lock:
+            for id_serie in list(self._series):
+                if id_serie not in vigentes:
+                    del self._series[id_serie]
+
+        resultado.sort(key=lambda o: (o['fecha_vencimiento'], o['id_serie']))
+        return resultado
+
+    def invalidar(self, id_serie=None):
+        """Olvida la proyección de una serie (o de todas)"""
+        with self._lock:
+            if id_serie is None:
+                self._series.clear()
+            else:
+                self._series.pop(id_serie, None)
+
+    def estadisticas(self):
+        with self._lock:
+            return {'series': len(self._series), 'aciertos': self.aciertos, 'fallos': self.fallos}
+
+
+proyeccion_recurrentes = ProyeccionRecurrentes()
+
+
+def resumir_por_mes(proyeccion):
+    """[{'anio', 'mes', 'cantidad', 'total'}] por mes, en orden"""
+    meses = {}
+    for o in proyeccion:
+        clave = (o['anio'], o['mes'])
+        resumen = meses.setdefault(clave, {'anio': o['anio'], 'mes': o['mes'], 'cantidad': 0, 'total': 0})
+        resumen['cantidad'] += 1
+        resumen['total'] += o['monto']
+    return [meses[clave] for clave in sorted(meses)]
+
+
+def resumir_por_presupuesto(conn, proyeccion):
+    """
+    Compromisos proyectados por (anio, mes, categoria, etiqueta), junto al
+    presupuesto de ese mes si ya existe
+    """
+    grupos = {}
+    for o in proyeccion:
+        clave = (o['anio'], o['mes'], o['categoria'], o['etiqueta'])
+        grupos[clave] = grupos.get(clave, 0) + o['monto']
+    if not grupos:
+        return []
+
+    desde = min(anio * 12 + mes for anio, mes, _, _ in grupos)
+    hasta = max(anio * 12 + mes for anio, mes, _, _ in grupos)
+    presupuestos = {
+        (p['anio'], p['mes'], p['categoria'], p['etiqueta']): p['monto_presupuestado']
+        for p in conn.execute('''
+            SELECT anio, mes, categoria, etiqueta, monto_presupuestado
+            FROM Presupuestos
+            WHERE anio * 12 + mes BETWEEN ? AND ?
+        ''', (desde, hasta)).fetchall()
+    }
+
+    return [
+        {'anio': anio, 'mes': mes, 'categoria': categoria, 'etiqueta': etiqueta,
+         'proyectado': total,
+         'presupuestado': presupuestos.get((anio, mes, categoria, etiqueta))}
+        for (anio, mes, categoria, etiqueta), total in sorted(grupos.items())
+    ]
+
+
+def sincronizar_proximo_vencimiento(conn, solo_vacios=True):
+    """
+    Llena Egresos.proximo_vencimiento de los recurrentes pendientes con la
+    fecha de su siguiente ocurrencia. Retorna cuántas filas cambió.
+    """
+    filas = conn.execute(f'''
+        SELECT id, fecha_vencimiento, frecuencia, proximo_vencimiento
+        FROM Egresos
+        WHERE estado = 'Pendiente' AND es_recurrente = 1
+        AND fecha_vencimiento IS NOT NULL
+        {'AND proximo_vencimiento IS NULL' if solo_vacios else ''}
+    ''').fetchall()
+
+    cambios = []
+    for id_gasto, fecha_vencimiento, frecuencia, proximo_actual in filas:
+        proximo = fecha_siguiente(fecha_vencimiento, frecuencia)
+        if proximo != proximo_actual:
+            cambios.append((proximo, id_gasto))
+
+    if cambios:
+        conn.executemany('UPDATE Egresos SET proximo_vencimiento = ? WHERE id = ?', cambios)
+    return len(cambios)
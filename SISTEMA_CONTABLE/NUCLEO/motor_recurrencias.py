@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Reglas de Recurrencia de Gastos
+Cuándo vence la siguiente ocurrencia de un gasto recurrente y con qué
+fecha límite de descuento. Las usan el pago de gastos (que crea la
+siguiente ocurrencia) y las proyecciones de gastos futuros.
+"""
+
+from datetime import datetime
+from itertools import count
+from dateutil.relativedelta import relativedelta
+
+# Meses entre una ocurrencia y la siguiente; frecuencias desconocidas = mensual
+MESES_POR_FRECUENCIA = {'Mensual': 1, 'Trimestral': 3, 'Semestral': 6, 'Anual': 12}
+
+
+def meses_frecuencia(frecuencia):
+    return MESES_POR_FRECUENCIA.get(frecuencia, 1)
+
+
+def _fecha(texto):
+    return datetime.strptime(texto, '%Y-%m-%d').date()
+
+
+def ocurrencias(gasto, cantidad=1, fecha_base=None):
+    """
+    Genera las siguientes `cantidad` ocurrencias de un gasto recurrente a
+    partir de su vencimiento (o de fecha_base, si se da); con cantidad=None
+    no se detiene (cortar con la fecha que se necesite).
+    Cada una es (fecha_vencimiento, fecha_limite_descuento o None).
+
+    Las fechas se calculan desde la original (original + n meses), así el
+    día 31 no se "corre" al 28 después de pasar por febrero.
+    """
+    fecha_venc = fecha_base or _fecha(gasto['fecha_vencimiento'])
+    meses = meses_frecuencia(gasto['frecuencia'])
+
+    dias_descuento = None
+    if gasto['tiene_descuento'] and gasto['fecha_limite_descuento']:
+        dias_descuento = (_fecha(gasto['fecha_vencimiento']) - _fecha(gasto['fecha_limite_descuento'])).days
+
+    for n in (range(1, cantidad + 1) if cantidad else count(1)):
+        proxima_fecha = fecha_venc + relativedelta(months=meses * n)
+        fecha_limite_desc = None
+        if dias_descuento is not None:
+            fecha_limite_desc = proxima_fecha - relativedelta(days=dias_descuento)
+        yield proxima_fecha, fecha_limite_desc
+
+
+def fecha_siguiente(fecha_vencimiento, frecuencia):
+    """Vencimiento siguiente ('YYYY-MM-DD') para guardar en Egresos.proximo_vencimiento"""
+    proxima_fecha = _fecha(fecha_vencimiento) + relativedelta(months=meses_frecuencia(frecuencia))
+    return proxima_fecha.strftime('%Y-%m-%d')
+
+
+def siguiente_ocurrencia(gasto):
+    """(fecha_vencimiento, fecha_limite_descuento) de la ocurrencia que sigue a `gasto`"""
+    return next(ocurrencias(gasto))
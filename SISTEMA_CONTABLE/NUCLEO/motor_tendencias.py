@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Motor de Detección de Tendencias
+Encuentra, con una sola consulta de ventana, las categorías que exceden su
+presupuesto durante N meses consecutivos y sincroniza AlertasTendencias.
+Los meses se numeran como anio * 12 + mes, así no se salta ni repite
+ningún mes (a diferencia de restar 30 días).
+"""
+
+import time
+from datetime import date
+from .motor_configuracion import obtener
+
+TIPO_ALERTA_EXCESO = 'EXCESO'
+
+# "Islas" de meses consecutivos con exceso: en una racha sin huecos,
+# indice_mes - ROW_NUMBER() es constante y sirve como id de la racha.
+SQL_DETECTAR = '''
+    CREATE TEMP TABLE tendencias_detectadas AS
+    WITH serie AS (
+        SELECT categoria, etiqueta,
+               anio * 12 + mes AS indice_mes,
+               monto_presupuestado, monto_gastado
+        FROM Presupuestos
+        WHERE monto_presupuestado > 0
+        AND anio * 12 + mes <= :referencia
+        AND monto_gastado * 100.0 / monto_presupuestado > 100 + :exceso
+    ),
+    rachas AS (
+        SELECT *,
+               indice_mes - ROW_NUMBER() OVER (
+                   PARTITION BY categoria, etiqueta ORDER BY indice_mes
+               ) AS racha
+        FROM serie
+    )
+    SELECT categoria, etiqueta,
+           COUNT(*) AS meses_consecutivos,
+           SUM(monto_gastado) * 100.0 / SUM(monto_presupuestado) AS porcentaje_promedio
+    FROM rachas
+    GROUP BY categoria, etiqueta, racha
+    HAVING COUNT(*) >= :meses AND MAX(indice_mes) = :referencia
+'''
+
+SQL_UPSERT = '''
+    INSERT INTO AlertasTendencias
+        (categoria, etiqueta, tipo_alerta, severidad, mensaje,
+         meses_consecutivos, porcentaje_promedio)
+    SELECT categoria, etiqueta, :tipo,
+           CASE WHEN meses_consecutivos >= 2 * :meses
+                  OR porcentaje_promedio >= 100 + 3 * :exceso
+                THEN 'Alta' ELSE 'Media' END,
+           printf('%s - %s: %d meses consecutivos sobre el presupuesto (promedio %.1f%%)',
+                  categoria, etiqueta, meses_consecutivos, porcentaje_promedio),
+           meses_consecutivos, porcentaje_promedio
+    FROM temp.tendencias_detectadas
+    WHERE 1
+    ON CONFLICT (categoria, etiqueta, tipo_alerta) WHERE activa = 1
+    DO UPDATE SET
+        severidad = excluded.severidad,
+        mensaje = excluded.mensaje,
+        meses_consecutivos = excluded.meses_consecutivos,
+        porcentaje_promedio = excluded.porcentaje_promedio
+    -- Una alerta que sigue igual no se reescribe (no cuenta como cambio)
+    WHERE AlertasTendencias.severidad IS NOT excluded.severidad
+       OR AlertasTendencias.mensaje IS NOT excluded.mensaje
+       OR AlertasTendencias.meses_consecutivos IS NOT excluded.meses_consecutivos
+       OR AlertasTendencias.porcentaje_promedio IS NOT excluded.porcentaje_promedio
+'''
+
+# Detectadas que todavía no tienen alerta activa (las que el upsert inserta)
+SQL_CONTAR_NUEVAS = '''
+    SELECT COUNT(*) FROM temp.tendencias_detectadas d
+    WHERE NOT EXISTS (
+        SELECT 1 FROM AlertasTendencias a
+        WHERE a.activa = 1 AND a.tipo_alerta = :tipo
+        AND a.categoria = d.categoria AND a.etiqueta = d.etiqueta
+    )
+'''
+
+SQL_RESOLVER = '''
+    UPDATE AlertasTendencias
+    SET activa = 0, fecha_resolucion = CURRENT_TIMESTAMP
+    WHERE activa = 1 AND tipo_alerta = :tipo
+    AND NOT EXISTS (
+        SELECT 1 FROM temp.tendencias_detectadas d
+        WHERE d.categoria = AlertasTendencias.categoria
+        AND d.etiqueta = AlertasTendencias.etiqueta
+    )
+'''
+
+
+def detectar_tendencias(conn, meses=None, porcentaje_exceso=None, referencia=None):
+    """
+    Detecta rachas de `meses` o más meses consecutivos, terminando en el
+    mes de referencia (por defecto el actual), en las que lo gastado supera
+    el presupuesto en más de `porcentaje_exceso` %. Sin esos valores usa
+    MESES_PARA_TENDENCIA y PORCENTAJE_EXCESO_ALERTA de la configuración.
+
+    Crea o actualiza una alerta activa por categoría/etiqueta y resuelve
+    las que ya no cumplen la condición. Todo en una transacción. Retorna
+    cuántas detectó y cuántas alertas insertó, actualizó y resolvió (sin
+    cambios reales, las tres en 0).
+    """
+    if meses is None:
+        meses = obtener('MESES_PARA_TENDENCIA', conn)
+    if porcentaje_exceso is None:
+        porcentaje_exceso = obtener('PORCENTAJE_EXCESO_ALERTA', conn)
+    hoy = referencia or date.today()
+    params = {
+        'referencia': hoy.year * 12 + hoy.month,
+        'meses': meses,
+        'exceso': porcentaje_exceso,
+        'tipo': TIPO_ALERTA_EXCESO,
+    }
+
+    inicio = time.perf_counter()
+    try:
+        conn.execute("DROP TABLE IF EXISTS temp.tendencias_detectadas")
+        conn.execute(SQL_DETECTAR, params)
+        detectadas = conn.execute("SELECT COUNT(*) FROM temp.tendencias_detectadas").fetchone()[0]
+        insertadas = conn.execute(SQL_CONTAR_NUEVAS, params).fetchone()[0]
+        escritas = conn.execute(SQL_UPSERT, params).rowcount
+        resueltas = conn.execute(SQL_RESOLVER, params).rowcount
+        conn.execute("DROP TABLE temp.tendencias_detectadas")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return {
+        'detectadas': detectadas,
+        'insertadas': insertadas,
+        'actualizadas': escritas - insertadas,
+        'resueltas': resueltas,
+        'duracion_ms': round((time.perf_counter() - inicio) * 1000, 2)
+    }
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Registro de Trabajos en Segundo Plano
+Cada exportación larga (reportes Excel, relación de la declaración, lote
+de cuentas de cobro) es una fila de TrabajosExportacion. La tabla es lo
+único que comparten el proceso que atiende la página y el proceso que
+ejecuta el trabajo:
+
+    Pendiente -> Ejecutando -> Completado / Error
+                     |
+                     +-> Cancelando -> Cancelado     (Pendiente -> Cancelado)
+
+El límite de trabajos simultáneos se aplica al reclamar el siguiente
+pendiente dentro de BEGIN IMMEDIATE, así que vale también entre varios
+workers de servidor_produccion.py.
+
+El trabajo informa su avance con AvanceTrabajo; cada aviso lee también el
+estado, y si alguien pidió cancelarlo lanza TrabajoCancelado.
+"""
+
+import json
+import time
+
+PENDIENTE = 'Pendiente'
+EJECUTANDO = 'Ejecutando'
+CANCELANDO = 'Cancelando'
+COMPLETADO = 'Completado'
+ERROR = 'Error'
+CANCELADO = 'Cancelado'
+
+ESTADOS_ACTIVOS = (EJECUTANDO, CANCELANDO)
+ESTADOS_FINALES = (COMPLETADO, ERROR, CANCELADO)
+
+SQL_CREAR_TABLA = '''
+    CREATE TABLE IF NOT EXISTS TrabajosExportacion (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo TEXT NOT NULL,
+        parametros TEXT,
+        estado TEXT NOT NULL DEFAULT 'Pendiente',
+        progreso REAL NOT NULL DEFAULT 0,
+        mensaje TEXT,
+        archivo TEXT,
+        nombre_descarga TEXT,
+        error TEXT,
+        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        fecha_inicio TIMESTAMP,
+        fecha_avance TIMESTAMP,
+        fecha_fin TIMESTAMP
+    )
+'''
+
+SQL_CREAR_INDICE = '''
+    CREATE INDEX IF NOT EXISTS idx_trabajos_estado ON TrabajosExportacion(estado, id)
+'''
+
+COLUMNAS = ('id', 'tipo', 'parametros', 'estado', 'progreso', 'mensaje', 'archivo',
+            'nombre_descarga', 'error', 'fecha_creacion', 'fecha_inicio', 'fecha_avance', 'fecha_fin')
+
+# Segundos mínimos entre dos escrituras de avance del mismo trabajo
+INTERVALO_AVANCE = 0.5
+
+
+class TrabajoCancelado(Exception):
+    """Se pidió cancelar el trabajo mientras se ejecutaba"""
+
+
+def asegurar_tabla(conn):
+    conn.execute(SQL_CREAR_TABLA)
+    conn.execute(SQL_CREAR_INDICE)
+    conn.commit()
+
+
+def _a_diccionario(fila):
+    trabajo = dict(zip(COLUMNAS, fila))
+    trabajo['parametros'] = json.loads(trabajo['parametros'] or '{}')
+    return trabajo
+
+
+def crear_trabajo(conn, tipo, parametros):
+    """Agrega un trabajo pendiente y retorna su id"""
+    cursor = conn.execute('''
+        INSERT INTO TrabajosExportacion (tipo, parametros, mensaje)
+        VALUES (?, ?, 'En cola')
+    ''', (tipo, json.dumps(parametros, ensure_ascii=False)))
+    conn.commit()
+    return cursor.lastrowid
+
+
+def obtener_trabajo(conn, trabajo_id):
+    fila = conn.execute(f"SELECT {', '.join(COLUMNAS)} FROM TrabajosExportacion WHERE id = ?",
+                        (trabajo_id,)).fetchone()
+    return _a_diccionario(fila) if fila else None
+
+
+def listar_trabajos(conn, limite=50):
+    """Los trabajos más recientes primero"""
+    filas = conn.execute(f'''
+        SELECT {', '.join(COLUMNAS)} FROM TrabajosExportacion
+        ORDER BY id DESC
+        LIMIT ?
+    ''', (limite,)).fetchall()
+    return [_a_diccionario(fila) for fila in filas]
+
+
+def contar_por_estado(conn):
+    """{estado: cantidad} de todos los trabajos guardados"""
+    return dict(conn.execute("SELECT estado, COUNT(*) FROM TrabajosExportacion GROUP BY estado").fetchall())
+
+
+def reclamar_siguiente(conn, simultaneos):
+    """
+    Pasa el pendiente más antiguo a Ejecutando si hay menos de
+    `simultaneos` trabajos activos (en todos los procesos) y retorna su id.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        activos = conn.execute(
+            f"SELECT COUNT(*) FROM TrabajosExportacion WHERE estado IN ({', '.join('?' * len(ESTADOS_ACTIVOS))})",
+            ESTADOS_ACTIVOS).fetchone()[0]
+        fila = None
+        if activos < simultaneos:
+            fila = conn.execute('''
+                SELECT id FROM TrabajosExportacion
+                WHERE estado = ?
+                ORDER BY id
+                LIMIT 1
+            ''', (PENDIENTE,)).fetchone()
+        if fila:
+            conn.execute('''
+                UPDATE TrabajosExportacion
+                SET estado = ?, mensaje = 'Iniciando',
+                    fecha_inicio = CURRENT_TIMESTAMP, fecha_avance = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (EJECUTANDO, fila[0]))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return fila[0] if fila else None
+
+
+def registrar_avance(conn, trabajo_id, progreso, mensaje=None):
+    """Guarda el avance (0 a 1) y retorna el estado actual del trabajo"""
+    conn.execute('''
+        UPDATE TrabajosExportacion
+        SET progreso = ?, mensaje = COALESCE(?, mensaje), fecha_avance = CURRENT_TIMESTAMP
+        WHERE id = ? AND estado = ?
+    ''', (round(min(max(progreso, 0.0), 1.0) * 100, 1), mensaje, trabajo_id, EJECUTANDO))
+    fila = conn.execute("SELECT estado FROM TrabajosExportacion WHERE id = ?", (trabajo_id,)).fetchone()
+    conn.commit()
+    return fila[0] if fila else None
+
+
+def terminar_trabajo(conn, trabajo_id, estado, mensaje=None, archivo=None, nombre_descarga=None, error=None):
+    """Deja el trabajo en un estado final"""
+    conn.execute('''
+        UPDATE TrabajosExportacion
+        SET estado = ?, mensaje = ?, archivo = ?, nombre_descarga = ?, error = ?,
+            progreso = CASE WHEN ? = ? THEN 100 ELSE progreso END,
+            fecha_fin = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', (estado, mensaje, archivo, nombre_descarga, error, estado, COMPLETADO, trabajo_id))
+    conn.commit()
+
+
+def cancelar_trabajo(conn, trabajo_id):
+    """
+    Un pendiente queda Cancelado de una vez; uno en ejecución pasa a
+    Cancelando y se detiene en su siguiente aviso de avance. Retorna el
+    estado resultante (None si el trabajo no existe).
+    """
+    conn.execute('''
+        UPDATE TrabajosExportacion
+        SET estado = CASE estado WHEN ? THEN ? ELSE ? END,
+            mensaje = 'Cancelación solicitada',
+            fecha_fin = CASE estado WHEN ? THEN CURRENT_TIMESTAMP END
+        WHERE id = ? AND estado IN (?, ?)
+    ''', (PENDIENTE, CANCELADO, CANCELANDO, PENDIENTE, trabajo_id, PENDIENTE, EJECUTANDO))
+    fila = conn.execute("SELECT estado FROM TrabajosExportacion WHERE id = ?", (trabajo_id,)).fetchone()
+    conn.commit()
+    return fila[0] if fila else None
+
+
+def marcar_interrumpidos(conn, segundos):
+    """
+    Trabajos activos sin avance en `segundos` (el proceso que los ejecutaba
+    murió o se reinició el servidor) pasan a Error. Retorna cuántos.
+    """
+    cursor = conn.execute(f'''
+        UPDATE TrabajosExportacion
+        SET estado = ?, error = 'Interrumpido: sin avance en {int(segundos)} s',
+            fecha_fin = CURRENT_TIMESTAMP
+        WHERE estado IN (?, ?) AND fecha_avance < datetime('now', ?)
+    ''', (ERROR, *ESTADOS_ACTIVOS, f'-{int(segundos)} seconds'))
+    conn.commit()
+    return cursor.rowcount
+
+
+def eliminar_antiguos(conn, dias):
+    """Borra los trabajos terminados hace más de `dias` y retorna sus archivos"""
+    condicion = f'''
+        estado IN ({', '.join('?' * len(ESTADOS_FINALES))})
+        AND fecha_fin < datetime('now', ?)
+    '''
+    parametros = (*ESTADOS_FINALES, f'-{int(dias)} days')
+    archivos = [fila[0] for fila in conn.execute(
+        f"SELECT archivo FROM TrabajosExportacion WHERE archivo IS NOT NULL AND {condicion}", parametros)]
+    conn.execute(f"DELETE FROM TrabajosExportacion WHERE {condicion}", parametros)
+    conn.commit()
+    return archivos
+
+
+class AvanceTrabajo:
+    """
+    Callback progreso(fraccion, mensaje) para los exportadores. Escribe el
+    avance a lo sumo cada INTERVALO_AVANCE segundos y, en cada escritura,
+    lanza TrabajoCancelado si el trabajo está en Cancelando.
+    """
+
+    def __init__(self, conn, trabajo_id, intervalo=INTERVALO_AVANCE):
+        self.conn = conn
+        self.trabajo_id = trabajo_id
+        self.intervalo = intervalo
+        self._ultimo = 0.0
+
+    def __call__(self, fraccion, mensaje=None):
+        ahora = time.monotonic()
+        if ahora - self._ultimo < self.intervalo:
+            return
+        self._ultimo = ahora
+        if registrar_avance(self.conn, self.trabajo_id, fraccion, mensaje) == CANCELANDO:
+            raise TrabajoCancelado(self.trabajo_id)
@@ -8,9 +8,10 @@ Crea copias de seguridad de la base de datos con fecha
 import shutil
 import os
 from datetime import datetime
+from config import DATABASE_PATH
 
 # Configuración
-DATABASE = 'SISTEMA_CONTABLE/DATOS/contabilidad.db'
+DATABASE = DATABASE_PATH
 BACKUP_FOLDER = 'SISTEMA_CONTABLE/DATOS/BACKUPS'
 
 def crear_backup():
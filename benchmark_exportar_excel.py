@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark de exportar_excel: Streaming contra Celda por Celda
+Genera bases sintéticas (generar_datos_sinteticos.py) con N gastos en el
+mes más cargado y exporta ese mes con los dos caminos de
+crear_reporte_mensual:
+
+- clásico: Workbook normal, celda por celda, todo el libro en memoria
+- streaming: Workbook(write_only=True), cursor y estilos con nombre
+
+Mide el tiempo (sin tracemalloc) y, en una ejecución aparte, el pico de
+memoria de Python. Con streaming el pico debe quedar casi igual aunque
+crezcan las filas. Los resultados se guardan como JSON en
+BENCHMARKS_FOLDER.
+
+Uso: python benchmark_exportar_excel.py [--filas N N ...] [--semilla N]
+                                        [--base RUTA] [--sin-clasico]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from config import BENCHMARKS_FOLDER
+from generar_datos_sinteticos import generar_base
+from benchmark_panel import pico_memoria_kb, commit_actual
+from exportar_excel import crear_reporte_mensual
+
+MESES_POR_BASE = 12
+
+
+def mes_mas_cargado(ruta_db):
+    """(anio, mes, gastos) del mes con más egresos"""
+    conn = sqlite3.connect(ruta_db)
+    try:
+        return conn.execute('''
+            SELECT anio, mes, COUNT(*) FROM Egresos
+            GROUP BY anio, mes
+            ORDER BY COUNT(*) DESC
+            LIMIT 1
+        ''').fetchone()
+    finally:
+        conn.close()
+
+
+def medir_exportacion(ruta_db, anio, mes, streaming, destino):
+    """Tiempo, pico de memoria y tamaño del archivo de un camino de exportación"""
+    def exportar():
+        # Sin los mensajes de crear_reporte_mensual entre las filas de la tabla
+        with contextlib.redirect_stdout(io.StringIO()):
+            crear_reporte_mensual(mes, anio, ruta_db, destino, streaming=streaming)
+
+    inicio = time.perf_counter()
+    exportar()
+    segundos = time.perf_counter() - inicio
+    return {
+        'duracion_s': round(segundos, 3),
+        'pico_memoria_kb': pico_memoria_kb(exportar),
+        'tamano_kb': round(os.path.getsize(destino) / 1024),
+    }
+
+
+def ejecutar_benchmark(filas=(10000, 50000), semilla=42, base=None, clasico=True):
+    print("=" * 70)
+    print("BENCHMARK DE EXPORTAR_EXCEL: STREAMING CONTRA CELDA POR CELDA")
+    print("=" * 70)
+
+    espacio = tempfile.mkdtemp(prefix='benchmark_excel_')
+    medidas = []
+    try:
+        bases = [base] if base else []
+        for cantidad in ([] if base else filas):
+            ruta = os.path.join(espacio, f'sintetica_{cantidad}.db')
+            print(f"\n🧪 Generando ~{cantidad:,} gastos por mes (semilla {semilla})...")
+            # Un año de datos: el mes más cargado queda cerca de `cantidad`
+            generar_base(ruta, cantidad * MESES_POR_BASE, anios=1, semilla=semilla)
+            bases.append(ruta)
+
+        print(f"\n   {'Gastos':>9} {'Camino':<10} {'tiempo':>9} {'memoria':>10} {'archivo':>10}")
+        for ruta in bases:
+            anio, mes, gastos = mes_mas_cargado(ruta)
+            caminos = [('streaming', True)] + ([('clásico', False)] if clasico else [])
+            for nombre, streaming in caminos:
+                destino = os.path.join(espacio, f'reporte_{gastos}_{nombre}.xlsx')
+                medida = medir_exportacion(ruta, anio, mes, streaming, destino)
+                medida.update({'gastos': gastos, 'anio': anio, 'mes': mes, 'camino': nombre})
+                medidas.append(medida)
+                print(f"   {gastos:>9,} {nombre:<10} {medida['duracion_s']:8.2f}s "
+                      f"{medida['pico_memoria_kb'] / 1024:8.1f}MB {medida['tamano_kb'] / 1024:8.1f}MB")
+    finally:
+        shutil.rmtree(espacio, ignore_errors=True)
+
+    if clasico:
+        print("\n📉 Streaming respecto al clásico")
+        for medida in medidas:
+            if medida['camino'] != 'streaming':
+                continue
+            referencia = next(m for m in medidas if m['gastos'] == medida['gastos'] and m['camino'] == 'clásico')
+            print(f"   {medida['gastos']:>9,} gastos: tiempo x{medida['duracion_s'] / referencia['duracion_s']:.2f}, "
+                  f"memoria x{medida['pico_memoria_kb'] / max(referencia['pico_memoria_kb'], 1):.2f}")
+
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'entorno': {
+            'commit': commit_actual(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'sistema': platform.platform(),
+        },
+        'semilla': None if base else semilla,
+        'medidas': medidas,
+    }
+    os.makedirs(BENCHMARKS_FOLDER, exist_ok=True)
+    ruta_resultado = os.path.join(BENCHMARKS_FOLDER, f"exportar_excel_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(ruta_resultado, 'w', encoding='utf-8') as archivo:
+        json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+    print(f"\n💾 Resultados guardados en {ruta_resultado}")
+    return resultado
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara los caminos de exportación de exportar_excel.py')
+    parser.add_argument('--filas', type=int, nargs='+', default=[10000, 50000],
+                        help='Gastos aproximados del mes exportado (una base por valor)')
+    parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador')
+    parser.add_argument('--base', help='Usar una base ya generada (exporta su mes más cargado)')
+    parser.add_argument('--sin-clasico', action='store_true', help='Medir solo el camino streaming')
+    args = parser.parse_args()
+
+    ejecutar_benchmark(args.filas, args.semilla, args.base, not args.sin_clasico)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark: filtros por mes con strftime() vs columnas anio/mes indexadas
+Crea una base temporal con N egresos (1.000.000 por defecto) y compara
+los tiempos de las consultas mensuales antes y después de la migración.
+
+Uso: python benchmark_indices_egresos.py [cantidad_filas]
+"""
+
+import os
+import sys
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+from SISTEMA_CONTABLE.NUCLEO.esquema_db import asegurar_columnas_periodo
+
+CATEGORIAS = ['Nómina', 'Arriendo', 'Servicios', 'Internet', 'Suscripciones',
+              'Mantenimiento', 'Cafetería', 'Impuestos', 'Otros']
+ETIQUETAS = ['OFICINA', 'GTFF']
+REPETICIONES = 5
+
+# (nombre, consulta con strftime, consulta con índice)
+CONSULTAS = [
+    ("Presupuesto de una categoría",
+     """SELECT COALESCE(SUM(monto), 0) FROM Egresos
+        WHERE categoria = 'Arriendo' AND etiqueta = 'OFICINA' AND estado = 'Pagado'
+        AND strftime('%m', fecha_vencimiento) = :mes_txt AND strftime('%Y', fecha_vencimiento) = :anio_txt""",
+     """SELECT COALESCE(SUM(monto), 0) FROM Egresos
+        WHERE categoria = 'Arriendo' AND etiqueta = 'OFICINA' AND estado = 'Pagado'
+        AND anio = :anio AND mes = :mes"""),
+    ("Estadísticas del mes (dashboard)",
+     """SELECT etiqueta, COUNT(*), SUM(monto) FROM Egresos
+        WHERE strftime('%m', fecha_vencimiento) = :mes_txt AND strftime('%Y', fecha_vencimiento) = :anio_txt
+        GROUP BY etiqueta""",
+     """SELECT etiqueta, COUNT(*), SUM(monto) FROM Egresos
+        WHERE anio = :anio AND mes = :mes
+        GROUP BY etiqueta"""),
+    ("Pendientes próximos 30 días",
+     """SELECT COUNT(*) FROM Egresos
+        WHERE estado = 'Pendiente' AND date(fecha_vencimiento) <= date(:hoy, '+30 days')""",
+     """SELECT COUNT(*) FROM Egresos
+        WHERE estado = 'Pendiente' AND fecha_vencimiento <= date(:hoy, '+30 days')"""),
+]
+
+def generar_filas(cantidad, semilla=42):
+    """Genera egresos sintéticos repartidos en 10 años"""
+    aleatorio = random.Random(semilla)
+    inicio = date(2016, 1, 1)
+    hoy = date(2020, 6, 15)
+    for i in range(cantidad):
+        fecha = inicio + timedelta(days=aleatorio.randrange(3650))
+        estado = 'Pagado' if fecha < hoy and aleatorio.random() < 0.97 else 'Pendiente'
+        yield (f"Gasto {i}", round(aleatorio.uniform(10000, 5000000), 0), fecha.isoformat(),
+               aleatorio.choice(CATEGORIAS), aleatorio.choice(ETIQUETAS), estado)
+
+def medir(conn, sql, params):
+    """Retorna el mejor tiempo (ms) de varias ejecuciones"""
+    mejor = None
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        duracion = (time.perf_counter() - inicio) * 1000
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor
+
+def plan(conn, sql, params):
+    filas = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return " | ".join(fila[3] for fila in filas)
+
+def ejecutar_benchmark(cantidad):
+    print("=" * 70)
+    print(f"BENCHMARK DE ÍNDICES EN EGRESOS ({cantidad:,} filas)")
+    print("=" * 70)
+
+    ruta = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    conn = sqlite3.connect(ruta)
+    conn.execute('''
+        CREATE TABLE Egresos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            descripcion TEXT NOT NULL,
+            monto REAL NOT NULL,
+            fecha_vencimiento DATE,
+            categoria TEXT,
+            etiqueta TEXT,
+            estado TEXT DEFAULT 'Pendiente'
+        )
+    ''')
+
+    print("\n🔄 Insertando datos sintéticos...")
+    inicio = time.perf_counter()
+    conn.executemany('''
+        INSERT INTO Egresos (descripcion, monto, fecha_vencimiento, categoria, etiqueta, estado)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', generar_filas(cantidad))
+    conn.commit()
+    print(f"   ✅ {cantidad:,} filas en {time.perf_counter() - inicio:.1f} s")
+
+    # Fecha de referencia dentro del rango de datos generados
+    hoy = date(2020, 6, 15)
+    params = {'anio': hoy.year, 'mes': hoy.month, 'anio_txt': str(hoy.year),
+              'mes_txt': f"{hoy.month:02d}", 'hoy': hoy.isoformat()}
+
+    antes = [medir(conn, sql_antes, params) for _, sql_antes, _ in CONSULTAS]
+
+    print("\n🔄 Aplicando migración (columnas anio/mes + índices)...")
+    inicio = time.perf_counter()
+    asegurar_columnas_periodo(conn)
+    conn.execute("ANALYZE")
+    conn.commit()
+    print(f"   ✅ Migración en {time.perf_counter() - inicio:.1f} s")
+
+    print("\n" + "-" * 70)
+    for (nombre, _, sql_despues), tiempo_antes in zip(CONSULTAS, antes):
+        tiempo_despues = medir(conn, sql_despues, params)
+        print(f"\n📊 {nombre}")
+        print(f"   strftime(): {tiempo_antes:9.2f} ms")
+        print(f"   índice:     {tiempo_despues:9.2f} ms  (x{tiempo_antes / max(tiempo_despues, 0.001):.0f} más rápido)")
+        print(f"   Plan: {plan(conn, sql_despues, params)}")
+
+    conn.close()
+    os.remove(ruta)
+    print("\n" + "=" * 70)
+
+if __name__ == '__main__':
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    ejecutar_benchmark(cantidad)
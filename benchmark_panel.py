@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark del Panel y los Scripts con Datos Sintéticos
+Genera una base sintética (generar_datos_sinteticos.py) o usa una ya
+generada, y mide sobre una copia:
+
+- Cada ruta del panel con el cliente de pruebas de Flask: la primera
+  petición con las cachés invalidadas (fría) y luego N repeticiones
+  (mediana y p95, con caché).
+- Los scripts por lotes: recalcular_presupuestos, crear_presupuestos_
+  automaticos y exportar_excel, cada uno sobre una copia nueva de la base.
+
+La memoria es el pico de tracemalloc en una ejecución aparte (tracemalloc
+hace más lento el código, por eso no se mezcla con los tiempos). Cada
+corrida se guarda como JSON en BENCHMARKS_FOLDER y se compara con la
+corrida anterior de la misma cantidad de datos.
+
+Uso: python benchmark_panel.py [--egresos N] [--semilla N] [--base RUTA]
+                               [--repeticiones N] [--comparar ARCHIVO.json]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from config import BENCHMARKS_FOLDER
+from generar_datos_sinteticos import generar_base, leer_fecha
+
+PANEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'SISTEMA_CONTABLE', 'MODULOS', 'panel_control')
+sys.path.insert(0, PANEL)
+
+from app import app, crear_app                      # noqa: E402
+from cache_panel import registrar_cambio            # noqa: E402
+from perfilado import percentil                     # noqa: E402
+from crear_presupuestos_automaticos import crear_presupuestos_del_mes   # noqa: E402
+from exportar_excel import crear_reporte_mensual                        # noqa: E402
+from recalcular_presupuestos import recalcular_todos_presupuestos       # noqa: E402
+
+RUTA_RELATIVA_DB = os.path.join('SISTEMA_CONTABLE', 'DATOS', 'contabilidad.db')
+
+RUTAS = [
+    '/',
+    '/gastos',
+    '/gastos?mes=TODOS',
+    '/presupuestos',
+    '/tareas',
+    '/buscar?q=arriendo',
+    '/api/gastos',
+    '/api/alertas/resumen',
+    '/api/proyecciones/recurrentes',
+    '/api/flujo-caja',
+]
+
+# Tablas de las que dependen las cachés del panel (para medir en frío)
+TABLAS_CACHE = ('Configuracion', 'Egresos', 'Presupuestos', 'PresupuestosTemplates', 'Tareas',
+                'Categorias', 'AlertasTendencias')
+
+
+def commit_actual():
+    """Commit de git del código medido (None si no se puede saber)"""
+    try:
+        salida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                timeout=10, cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return salida.stdout.strip() or None
+
+
+def copiar_base(origen, destino):
+    """Copia la base sintética (sin archivos -wal/-shm viejos en el destino)"""
+    for sufijo in ('-wal', '-shm'):
+        if os.path.exists(destino + sufijo):
+            os.remove(destino + sufijo)
+    shutil.copyfile(origen, destino)
+
+
+def pico_memoria_kb(funcion):
+    """Ejecuta `funcion` con tracemalloc y retorna el pico de memoria en KB"""
+    tracemalloc.start()
+    try:
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(pico / 1024)
+
+
+def medir_ruta(cliente, ruta, repeticiones):
+    def peticion():
+        respuesta = cliente.get(ruta)
+        respuesta.close()
+        return respuesta.status_code
+
+    registrar_cambio(*TABLAS_CACHE)
+    inicio = time.perf_counter()
+    estado = peticion()
+    primera = (time.perf_counter() - inicio) * 1000
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        peticion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+
+    registrar_cambio(*TABLAS_CACHE)
+    memoria = pico_memoria_kb(peticion)
+
+    return {
+        'ruta': ruta,
+        'estado': estado,
+        'primera_ms': round(primera, 2),
+        'mediana_ms': round(statistics.median(tiempos), 2) if tiempos else None,
+        'p95_ms': round(percentil(tiempos, 95), 2) if tiempos else None,
+        'min_ms': round(tiempos[0], 2) if tiempos else None,
+        'pico_memoria_kb': memoria,
+    }
+
+
+def ejecutar_script(funcion):
+    """(segundos, primer error impreso o None): los scripts imprimen "❌ Error ..." al fallar"""
+    salida = io.StringIO()
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(salida):
+        funcion()
+    duracion = time.perf_counter() - inicio
+    errores = [linea.strip() for linea in salida.getvalue().splitlines() if linea.strip().startswith('❌ Error ')]
+    return duracion, errores[0] if errores else None
+
+
+def medir_scripts(base, espacio):
+    """Cada script sobre una copia nueva de la base, con cwd en el espacio de trabajo"""
+    destino = os.path.join(espacio, RUTA_RELATIVA_DB)
+    conn = sqlite3.connect(base)
+    anio, mes = conn.execute('''
+        SELECT anio, mes FROM Egresos WHERE estado = 'Pagado'
+        ORDER BY fecha_vencimiento DESC LIMIT 1
+    ''').fetchone()
+    conn.close()
+
+    scripts = [
+        ('recalcular_presupuestos', recalcular_todos_presupuestos),
+        ('crear_presupuestos_automaticos', crear_presupuestos_del_mes),
+        (f'exportar_excel {anio}-{mes:02d}', lambda: crear_reporte_mensual(mes, anio)),
+    ]
+
+    resultados = []
+    directorio_original = os.getcwd()
+    os.chdir(espacio)
+    try:
+        for nombre, funcion in scripts:
+            copiar_base(base, destino)
+            segundos, error = ejecutar_script(funcion)
+            copiar_base(base, destino)
+            with contextlib.redirect_stdout(io.StringIO()):
+                memoria = pico_memoria_kb(funcion)
+            resultados.append({'script': nombre, 'segundos': round(segundos, 3),
+                               'pico_memoria_kb': memoria, 'error': error})
+            print(f"   {nombre:<38} {segundos:8.2f} s {memoria / 1024:8.1f} MB"
+                  f"{f'  ❌ {error}' if error else ''}")
+    finally:
+        os.chdir(directorio_original)
+    return resultados
+
+
+def buscar_anterior(datos):
+    """Última corrida guardada con la misma cantidad de egresos y semilla"""
+    for ruta in sorted(glob.glob(os.path.join(BENCHMARKS_FOLDER, 'benchmark_*.json')), reverse=True):
+        with open(ruta, encoding='utf-8') as archivo:
+            anterior = json.load(archivo)
+        if (anterior['datos']['conteos'].get('Egresos') == datos['conteos']['Egresos']
+                and anterior['datos'].get('semilla') == datos.get('semilla')):
+            return ruta, anterior
+    return None, None
+
+
+def cambio(actual, anterior):
+    if not actual or not anterior:
+        return ''
+    porcentaje = (actual - anterior) / anterior * 100
+    marca = '🔴' if porcentaje > 10 else ('🟢' if porcentaje < -10 else '  ')
+    return f"{marca} {porcentaje:+6.1f}%"
+
+
+def mostrar_comparacion(resultado, ruta_anterior, anterior):
+    print("\n" + "=" * 70)
+    print(f"COMPARACIÓN CON {os.path.basename(ruta_anterior)} (commit {anterior['entorno'].get('commit')})")
+    print("=" * 70)
+    rutas_anteriores = {r['ruta']: r for r in anterior['rutas']}
+    for ruta in resultado['rutas']:
+        previa = rutas_anteriores.get(ruta['ruta'])
+        if previa:
+            print(f"   {ruta['ruta']:<32} fría {ruta['primera_ms']:9.1f} ms "
+                  f"{cambio(ruta['primera_ms'], previa['primera_ms'])}   "
+                  f"mediana {ruta['mediana_ms']:8.1f} ms {cambio(ruta['mediana_ms'], previa['mediana_ms'])}")
+    scripts_anteriores = {s['script']: s for s in anterior['scripts']}
+    for script in resultado['scripts']:
+        previo = scripts_anteriores.get(script['script'])
+        if previo:
+            print(f"   {script['script']:<32} {script['segundos']:9.2f} s "
+                  f"{cambio(script['segundos'], previo['segundos'])}")
+
+
+def ejecutar_benchmark(egresos=100000, semilla=42, base=None, repeticiones=10, referencia=None, comparar=None):
+    print("=" * 70)
+    print("BENCHMARK DEL PANEL Y SCRIPTS CON DATOS SINTÉTICOS")
+    print("=" * 70)
+
+    espacio = tempfile.mkdtemp(prefix='benchmark_panel_')
+    os.makedirs(os.path.dirname(os.path.join(espacio, RUTA_RELATIVA_DB)))
+    try:
+        if base:
+            conn = sqlite3.connect(base)
+            conteos = {tabla: conn.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+                       for tabla in ('Egresos', 'Presupuestos', 'PresupuestosTemplates', 'Tareas',
+                                     'Clientes', 'CuentasCobro')}
+            conn.close()
+            datos = {'ruta': base, 'conteos': conteos, 'semilla': None,
+                     'tamano_mb': round(os.path.getsize(base) / 1024 / 1024, 1)}
+            print(f"\n📂 Base existente: {base} ({conteos['Egresos']:,} egresos)")
+        else:
+            print(f"\n🧪 Generando {egresos:,} egresos (semilla {semilla})...")
+            base = os.path.join(espacio, 'sintetica.db')
+            datos = generar_base(base, egresos, semilla=semilla, referencia=referencia)
+            print(f"   ✅ {datos['tamano_mb']} MB en {datos['duracion_s']} s")
+
+        # Rutas del panel, sobre su propia copia
+        ruta_panel = os.path.join(espacio, 'panel.db')
+        copiar_base(base, ruta_panel)
+        crear_app(ruta_panel)
+        cliente = app.test_client()
+        print(f"\n🌐 Rutas del panel ({repeticiones} repeticiones)")
+        print(f"   {'Ruta':<32} {'fría':>9} {'mediana':>9} {'p95':>9} {'memoria':>9}")
+        rutas = []
+        for ruta in RUTAS:
+            medida = medir_ruta(cliente, ruta, repeticiones)
+            rutas.append(medida)
+            aviso = f"  ⚠️ HTTP {medida['estado']}" if medida['estado'] != 200 else ""
+            print(f"   {ruta:<32} {medida['primera_ms']:7.1f}ms {medida['mediana_ms']:7.1f}ms "
+                  f"{medida['p95_ms']:7.1f}ms {medida['pico_memoria_kb'] / 1024:7.1f}MB{aviso}")
+        app.extensions['pool_conexiones'].cerrar_todas()
+
+        print("\n⚙️  Scripts por lotes")
+        scripts = medir_scripts(base, espacio)
+    finally:
+        shutil.rmtree(espacio, ignore_errors=True)
+
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'entorno': {
+            'commit': commit_actual(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'sistema': platform.platform(),
+        },
+        'datos': {clave: valor for clave, valor in datos.items() if clave != 'ruta'},
+        'repeticiones': repeticiones,
+        'rutas': rutas,
+        'scripts': scripts,
+    }
+
+    if comparar:
+        with open(comparar, encoding='utf-8') as archivo:
+            ruta_anterior, anterior = comparar, json.load(archivo)
+    else:
+        ruta_anterior, anterior = buscar_anterior(resultado['datos'])
+
+    os.makedirs(BENCHMARKS_FOLDER, exist_ok=True)
+    nombre = f"benchmark_{datetime.now():%Y%m%d_%H%M%S}_{datos['conteos']['Egresos']}.json"
+    ruta_resultado = os.path.join(BENCHMARKS_FOLDER, nombre)
+    with open(ruta_resultado, 'w', encoding='utf-8') as archivo:
+        json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+
+    if anterior:
+        mostrar_comparacion(resultado, ruta_anterior, anterior)
+    print(f"\n💾 Resultados guardados en {ruta_resultado}")
+    return resultado
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mide las rutas del panel y los scripts con datos sintéticos')
+    parser.add_argument('--egresos', type=int, default=100000, help='Egresos a generar (100.000 a 5.000.000)')
+    parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador')
+    parser.add_argument('--hasta', type=leer_fecha, help='Fecha de referencia de los datos (por defecto hoy)')
+    parser.add_argument('--base', help='Usar una base ya generada en lugar de generar una')
+    parser.add_argument('--repeticiones', type=int, default=10, help='Peticiones por ruta después de la primera')
+    parser.add_argument('--comparar', help='JSON de una corrida anterior para comparar')
+    args = parser.parse_args()
+    ejecutar_benchmark(args.egresos, args.semilla, args.base, args.repeticiones, args.hasta, args.comparar)
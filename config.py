@@ -3,8 +3,17 @@
 """
 Archivo de Configuración del Sistema
 Centraliza todas las configuraciones importantes
+
+Los valores de este archivo son los de por defecto. Se pueden reemplazar
+sin editarlo con CONFIGURACION_ARCHIVO (JSON o INI, se aplica al importar
+este módulo) y, en tiempo de ejecución, con la tabla Configuracion
+(ver SISTEMA_CONTABLE/NUCLEO/motor_configuracion.py).
 """
 
+import configparser
+import json
+import os
+
 # ==========================================
 # CONFIGURACIÓN DE SEGURIDAD
 # ==========================================
@@ -19,8 +28,11 @@ SESSION_TIMEOUT = 3600  # Segundos (1 hora)
 # CONFIGURACIÓN DE BASE DE DATOS
 # ==========================================
 
-DATABASE_PATH = 'SISTEMA_CONTABLE/DATOS/contabilidad.db'
+DATABASE_PATH = 'SISTEMA_CONTABLE/DATOS/contabilidad.db'  # Todos los scripts y módulos usan esta ruta
 BACKUP_FOLDER = 'SISTEMA_CONTABLE/DATOS/BACKUPS'
+BENCHMARKS_FOLDER = 'SISTEMA_CONTABLE/DATOS/BENCHMARKS'  # Resultados de benchmark_panel.py
+TRABAJOS_FOLDER = 'SISTEMA_CONTABLE/DATOS/Salidas/Trabajos'  # Archivos de los trabajos en segundo plano
+COLUMNAR_FOLDER = 'SISTEMA_CONTABLE/DATOS/Salidas/Columnar'  # CSV/Parquet de exportar_columnar.py
 
 # Configuración de backups automáticos
 BACKUPS_MANTENER = 30  # Número de backups a mantener
@@ -40,6 +52,9 @@ MESES_ESPECIALES = {
 # Etiquetas disponibles
 ETIQUETAS = ["OFICINA", "GTFF"]
 
+# Meses hacia adelante que se proyectan los gastos recurrentes
+MESES_PROYECCION_RECURRENTES = 3
+
 # ==========================================
 # CONFIGURACIÓN DE ALERTAS
 # ==========================================
@@ -52,6 +67,10 @@ DIAS_ALERTA_CRITICA = 3
 MESES_PARA_TENDENCIA = 3  # Cuántos meses consecutivos para alertar
 PORCENTAJE_EXCESO_ALERTA = 10  # % de exceso para generar alerta
 
+# Flujo de caja (se cambian desde el dashboard, tabla Configuracion)
+SALDO_CAJA_ACTUAL = 0.0          # Punto de partida del pronóstico
+FLUJO_MINIMO_CAJA = 2000000.0    # Saldo mínimo antes de alertar
+
 # ==========================================
 # CONFIGURACIÓN DE SERVIDOR
 # ==========================================
@@ -63,6 +82,36 @@ SERVER_HOST = '0.0.0.0'  # Para permitir conexiones externas
 # Modo debug (cambiar a False en producción)
 DEBUG_MODE = False
 
+# Servidor de producción (servidor_produccion.py)
+SERVER_HILOS = 16            # Peticiones atendidas a la vez por cada proceso
+SERVER_PROCESOS = 1          # Workers pre-forkeados (solo Linux/macOS; en Windows siempre 1)
+SERVER_ESPERA_CIERRE = 10    # Segundos para terminar las peticiones en curso al detenerse
+
+# Paginación del listado de gastos (/gastos y /api/gastos)
+GASTOS_POR_PAGINA = 50
+GASTOS_POR_PAGINA_MAXIMO = 500  # Límite para ?por_pagina=
+
+# Perfilado de peticiones (perfilado.py): Server-Timing y /debug/perf.
+# También se activa con la variable de entorno PANEL_PERFILADO=1
+PERFILADO_ACTIVO = False
+PERFILADO_MUESTRAS_POR_RUTA = 1000   # Últimas peticiones que se guardan por ruta
+PERFILADO_TOP_CONSULTAS = 20         # Consultas que se listan, por tiempo total
+PERFILADO_UMBRAL_REPETICIONES = 10   # Misma consulta N veces en un request = posible N+1
+
+# Registro de consultas lentas (tabla ConsultasLentas, ver reporte_consultas_lentas.py)
+CONSULTAS_LENTAS_UMBRAL_MS = 0       # Sentencias más lentas que esto se guardan; 0 = apagado
+CONSULTAS_LENTAS_MAXIMO = 5000       # Registros que se conservan
+
+# Importación masiva de gastos (importar_egresos.py y /gastos/importar)
+IMPORTACION_TAMANO_LOTE = 1000     # Filas por executemany
+IMPORTACION_MAX_MB = 50            # Tamaño máximo del archivo subido
+
+# Trabajos de exportación en segundo plano (trabajos_fondo.py, tabla TrabajosExportacion)
+TRABAJOS_SIMULTANEOS = 2           # Trabajos ejecutándose a la vez (entre todos los procesos)
+TRABAJOS_EN_COLA_MAXIMO = 20       # Trabajos pendientes; más solicitudes se rechazan
+TRABAJOS_SIN_AVANCE_S = 900        # Un trabajo sin avance en este tiempo se da por interrumpido
+TRABAJOS_DIAS_CONSERVAR = 7        # Trabajos terminados (y sus archivos) que se conservan
+
 # ==========================================
 # CONFIGURACIÓN DE REPORTES
 # ==========================================
@@ -75,6 +124,8 @@ SEPARADOR_DECIMALES = "."
 # Configuración de Excel
 EXCEL_EMPRESA = "Tu Empresa"
 EXCEL_LOGO = None  # Ruta al logo (opcional)
+EXPORTACIONES_EN_CACHE = 12  # Reportes mensuales que el panel guarda en memoria (/exportar/<anio>/<mes>)
+EXPORTACION_FILAS_POR_BLOQUE = 10000  # Filas por fetchmany en exportar_columnar.py (la memoria crece con esto)
 
 # ==========================================
 # CATEGORÍAS POR DEFECTO
@@ -142,19 +193,133 @@ def obtener_configuracion():
     }
 
 # ==========================================
-# PARA USO FUTURO: CONFIGURACIÓN DINÁMICA
+# CONFIGURACIÓN DESDE ARCHIVO
 # ==========================================
 
-def cargar_configuracion_desde_archivo():
+# Archivo opcional que reemplaza valores de este módulo, con las mismas
+# claves: JSON plano ({"SERVER_PORT": 8080}) o INI (cualquier sección,
+# server_port = 8080). Las claves que no existen aquí se ignoran.
+CONFIGURACION_ARCHIVO = 'SISTEMA_CONTABLE/CONFIGURACION/configuracion_local.json'
+
+VALORES_VERDADEROS = ('1', 'true', 'si', 'sí', 'yes', 'on')
+
+
+def claves_configurables():
+    """Nombres de las constantes de este módulo que se pueden reemplazar"""
+    return [clave for clave, valor in globals().items()
+            if clave.isupper() and not callable(valor)
+            and clave not in ('CONFIGURACION_ARCHIVO', 'VALORES_VERDADEROS')]
+
+
+def convertir_valor(valor, referencia=None):
     """
-    Para implementación futura:
-    Cargar configuración desde archivo JSON/INI
+    Convierte un texto (de un INI o de la tabla Configuracion) al tipo del
+    valor por defecto. Sin referencia, lo deja como número si lo parece.
     """
-    pass
+    if not isinstance(valor, str):
+        return float(valor) if isinstance(referencia, float) and isinstance(valor, int) else valor
+    texto = valor.strip()
+    if isinstance(referencia, bool):
+        return texto.lower() in VALORES_VERDADEROS
+    if isinstance(referencia, int):
+        return int(float(texto))
+    if isinstance(referencia, float):
+        return float(texto)
+    if isinstance(referencia, (list, dict)):
+        return json.loads(texto)
+    if referencia is None:
+        for tipo in (int, float):
+            try:
+                return tipo(texto)
+            except ValueError:
+                pass
+    return texto
+
 
-def guardar_configuracion_a_archivo():
+def _texto_ini(valor):
+    if isinstance(valor, bool):
+        return '1' if valor else '0'
+    if isinstance(valor, (list, dict)):
+        return json.dumps(valor, ensure_ascii=False)
+    return '' if valor is None else str(valor)
+
+
+def _leer_archivo(ruta):
+    """{CLAVE: valor} del archivo JSON o INI (sin validar las claves)"""
+    if ruta.lower().endswith('.ini'):
+        lector = configparser.ConfigParser(interpolation=None)
+        lector.optionxform = str
+        lector.read(ruta, encoding='utf-8')
+        return {clave.upper(): valor for seccion in lector.sections()
+                for clave, valor in lector.items(seccion)}
+    with open(ruta, encoding='utf-8') as archivo:
+        datos = json.load(archivo)
+    if not isinstance(datos, dict):
+        raise ValueError("el archivo debe tener un objeto JSON {clave: valor}")
+    return {clave.upper(): valor for clave, valor in datos.items()}
+
+
+def cargar_configuracion_desde_archivo(ruta=None, aplicar=True):
     """
-    Para implementación futura:
-    Guardar configuración en archivo JSON/INI
+    Lee el archivo de configuración (JSON o INI) y, con aplicar=True,
+    reemplaza los valores de este módulo. Retorna {CLAVE: valor} con los
+    valores válidos; {} si el archivo no existe o no se puede leer.
     """
-    pass
\ No newline at end of file
+    ruta = ruta or CONFIGURACION_ARCHIVO
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        leidos = _leer_archivo(ruta)
+    except (OSError, ValueError, configparser.Error) as e:
+        print(f"⚠️ No se pudo leer {ruta}: {e}")
+        return {}
+
+    conocidas = set(claves_configurables())
+    valores = {}
+    for clave, valor in leidos.items():
+        if clave not in conocidas:
+            print(f"⚠️ {ruta}: clave desconocida {clave} (se ignora)")
+            continue
+        try:
+            valores[clave] = convertir_valor(valor, globals()[clave])
+        except (ValueError, TypeError) as e:
+            print(f"⚠️ {ruta}: valor inválido para {clave}: {e}")
+
+    if aplicar:
+        globals().update(valores)
+    return valores
+
+
+def guardar_configuracion_a_archivo(valores, ruta=None):
+    """
+    Guarda {CLAVE: valor} en el archivo de configuración, conservando lo
+    que ya tenía, y lo aplica a este módulo. Retorna la ruta escrita.
+    """
+    ruta = ruta or CONFIGURACION_ARCHIVO
+    valores = {clave.upper(): valor for clave, valor in valores.items()}
+    desconocidas = set(valores) - set(claves_configurables())
+    if desconocidas:
+        raise KeyError(f"Claves desconocidas: {', '.join(sorted(desconocidas))}")
+
+    contenido = cargar_configuracion_desde_archivo(ruta, aplicar=False)
+    contenido.update(valores)
+
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    if ruta.lower().endswith('.ini'):
+        escritor = configparser.ConfigParser(interpolation=None)
+        escritor.optionxform = str
+        escritor['general'] = {clave.lower(): _texto_ini(valor) for clave, valor in sorted(contenido.items())}
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            escritor.write(archivo)
+    else:
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            json.dump(dict(sorted(contenido.items())), archivo, ensure_ascii=False, indent=2)
+
+    globals().update(contenido)
+    return ruta
+
+
+# Aplicar el archivo local (si existe) al importar la configuración
+cargar_configuracion_desde_archivo()
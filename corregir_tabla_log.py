@@ -5,16 +5,17 @@ Script de corrección para agregar columnas faltantes en LogCreacionPresupuestos
 """
 
 import sqlite3
+from config import DATABASE_PATH
 
-DATABASE = 'SISTEMA_CONTABLE/DATOS/contabilidad.db'
+DATABASE = DATABASE_PATH
 
-def corregir_tabla():
+def corregir_tabla(ruta_db=DATABASE):
     print("=" * 70)
     print("CORRECCIÓN COMPLETA DE TABLA LogCreacionPresupuestos")
     print("=" * 70)
     
     try:
-        conn = sqlite3.connect(DATABASE)
+        conn = sqlite3.connect(ruta_db)
         cursor = conn.cursor()
         
         print("\n✅ Conexión exitosa a la base de datos")
@@ -8,9 +8,12 @@ Crea presupuestos automáticamente el día 1 de cada mes basándose en templates
 import sqlite3
 from datetime import datetime
 import os
+from SISTEMA_CONTABLE.NUCLEO.esquema_db import asegurar_esquema
+from SISTEMA_CONTABLE.NUCLEO.motor_presupuestos import recalcular_mes
+from config import DATABASE_PATH
 
 # Configuración
-DATABASE = 'SISTEMA_CONTABLE/DATOS/contabilidad.db'
+DATABASE = DATABASE_PATH
 
 def obtener_monto_segun_mes(template, mes):
     """
@@ -26,26 +29,6 @@ def obtener_monto_segun_mes(template, mes):
     else:
         return template['monto_base']
 
-def actualizar_monto_gastado(conn, presupuesto_id, mes, anio, categoria, etiqueta):
-    """
-    Calcula y actualiza el monto ya gastado para un presupuesto
-    """
-    resultado = conn.execute('''
-        SELECT COALESCE(SUM(monto), 0) as total
-        FROM Egresos
-        WHERE categoria = ? 
-        AND etiqueta = ? 
-        AND estado = 'Pagado'
-        AND strftime('%m', fecha_vencimiento) = ?
-        AND strftime('%Y', fecha_vencimiento) = ?
-    ''', (categoria, etiqueta, f"{mes:02d}", str(anio))).fetchone()
-    
-    monto_gastado = resultado['total']
-    conn.execute('UPDATE Presupuestos SET monto_gastado = ? WHERE id = ?', 
-                (monto_gastado, presupuesto_id))
-    
-    return monto_gastado
-
 def crear_presupuestos_del_mes():
     """
     Función principal que crea presupuestos automáticamente
@@ -66,6 +49,7 @@ def crear_presupuestos_del_mes():
     try:
         conn = sqlite3.connect(DATABASE)
         conn.row_factory = sqlite3.Row
+        asegurar_esquema(conn)
         print("✅ Conexión a base de datos exitosa")
     except Exception as e:
         print(f"❌ Error al conectar a la base de datos: {e}")
@@ -137,10 +121,6 @@ def crear_presupuestos_del_mes():
             
             presupuesto_id = cursor.lastrowid
             
-            # Actualizar monto gastado (por si hay gastos pagados del mes)
-            monto_gastado = actualizar_monto_gastado(conn, presupuesto_id, mes_actual, 
-                                                     anio_actual, categoria, etiqueta)
-            
             # Registrar en el log
             conn.execute('''
                 INSERT INTO LogCreacionPresupuestos 
@@ -151,8 +131,6 @@ def crear_presupuestos_del_mes():
             conn.commit()
             
             print(f"   ✅ Creado: ${monto:,.0f}{mes_especial}")
-            if monto_gastado > 0:
-                print(f"      💰 Ya gastado: ${monto_gastado:,.0f}")
             
             presupuestos_creados += 1
             
@@ -161,6 +139,13 @@ def crear_presupuestos_del_mes():
             errores += 1
             conn.rollback()
     
+    # Actualizar monto gastado de todo el mes (por si hay gastos pagados)
+    # con un solo recálculo en lugar de una consulta por presupuesto
+    if presupuestos_creados > 0:
+        resultado = recalcular_mes(conn, mes_actual, anio_actual)
+        print(f"\n💰 Montos gastados recalculados: {resultado['actualizados']} presupuestos "
+              f"con gastos ya pagados ({resultado['duracion_ms']:.1f} ms)")
+    
     # Cerrar conexión
     conn.close()
     
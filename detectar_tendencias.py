@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Script de Detección de Tendencias
+Revisa los presupuestos y actualiza AlertasTendencias.
+Pensado para ejecutarse desde el Programador de Tareas (p. ej. cada noche);
+el panel de control también lo ejecuta en segundo plano tras cada escritura.
+"""
+
+import sqlite3
+from datetime import datetime
+from config import DATABASE_PATH
+from SISTEMA_CONTABLE.NUCLEO.esquema_db import asegurar_esquema
+from SISTEMA_CONTABLE.NUCLEO.motor_configuracion import obtener
+from SISTEMA_CONTABLE.NUCLEO.motor_tendencias import detectar_tendencias
+
+DATABASE = DATABASE_PATH
+
+def ejecutar_deteccion():
+    print("=" * 70)
+    print("DETECCIÓN DE TENDENCIAS DE PRESUPUESTOS")
+    print("=" * 70)
+    print(f"\n📅 Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
+
+    conn = None
+    try:
+        conn = sqlite3.connect(DATABASE)
+        conn.row_factory = sqlite3.Row
+        asegurar_esquema(conn)
+        print(f"📊 Regla: {obtener('MESES_PARA_TENDENCIA', conn)} meses consecutivos con más de "
+              f"{obtener('PORCENTAJE_EXCESO_ALERTA', conn)}% de exceso")
+
+        resultado = detectar_tendencias(conn)
+
+        print(f"\n🚨 Tendencias activas: {resultado['detectadas']}")
+        print(f"🆕 Nuevas / actualizadas: {resultado['insertadas']} / {resultado['actualizadas']}")
+        print(f"✅ Alertas resueltas:  {resultado['resueltas']}")
+        print(f"⏱️  Duración:           {resultado['duracion_ms']:.1f} ms")
+
+        alertas = conn.execute('''
+            SELECT severidad, mensaje FROM AlertasTendencias
+            WHERE activa = 1
+            ORDER BY categoria, etiqueta
+        ''').fetchall()
+        for alerta in alertas:
+            print(f"   [{alerta['severidad']}] {alerta['mensaje']}")
+
+    except Exception as e:
+        print(f"\n❌ Error al detectar tendencias: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+    print("\n" + "=" * 70)
+
+if __name__ == "__main__":
+    ejecutar_deteccion()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Exportación Columnar para Herramientas de Análisis
+Exporta Egresos, Presupuestos, Tareas y CuentasCobro a CSV comprimido o
+a Parquet, particionados por año (ver NUCLEO/motor_exportacion_columnar.py).
+Cada ejecución agrega solo las filas nuevas desde la anterior; con
+--completo se reescribe todo (recoge también filas cambiadas o borradas).
+
+Uso: python exportar_columnar.py [--formato csv|parquet] [--tablas Egresos Tareas ...]
+                                 [--destino CARPETA] [--sin-particion]
+                                 [--completo] [--bloque N]
+"""
+
+import argparse
+import os
+import sqlite3
+from config import DATABASE_PATH, COLUMNAR_FOLDER
+from SISTEMA_CONTABLE.NUCLEO.esquema_db import asegurar_esquema
+from SISTEMA_CONTABLE.NUCLEO.motor_exportacion_columnar import (TABLAS_COLUMNARES, FORMATOS,
+                                                                exportar_tablas)
+
+
+def exportar(formato='csv', tablas=None, destino=COLUMNAR_FOLDER, por_anio=True, completo=False,
+             filas_por_bloque=None):
+    print("=" * 70)
+    print("📦 EXPORTACIÓN COLUMNAR")
+    print("=" * 70)
+    print(f"Formato: {formato} | Destino: {destino}"
+          f"{' | por año' if por_anio else ''}{' | completa' if completo else ' | incremental'}")
+
+    conn = None
+    try:
+        conn = sqlite3.connect(DATABASE_PATH)
+        asegurar_esquema(conn)
+
+        resultados = exportar_tablas(conn, destino, tablas, formato, por_anio, completo, filas_por_bloque)
+
+        print(f"\n   {'Tabla':<14} {'filas':>10} {'rowid':>17} {'archivos':>9} {'tiempo':>9}")
+        for resultado in resultados:
+            if 'omitida' in resultado:
+                print(f"⏭️  {resultado['tabla']:<14} omitida: {resultado['omitida']}")
+                continue
+            rango = (f"{resultado['desde_rowid'] + 1}-{resultado['hasta_rowid']}"
+                     if resultado['filas'] else 'sin filas nuevas')
+            print(f"✅ {resultado['tabla']:<14} {resultado['filas']:>10,} {rango:>17} "
+                  f"{len(resultado['archivos']):>9} {resultado['duracion_ms'] / 1000:8.2f}s")
+
+        print(f"\n💾 Archivos en {os.path.abspath(destino)}")
+        return resultados
+
+    except ValueError as e:
+        print(f"❌ No se pudo exportar: {e}")
+    except Exception as e:
+        print(f"❌ Error durante la exportación: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Exporta el libro contable a CSV comprimido o Parquet')
+    parser.add_argument('--formato', choices=FORMATOS, default='csv',
+                        help='csv (.csv.gz) o parquet (requiere pyarrow)')
+    parser.add_argument('--tablas', nargs='+', choices=list(TABLAS_COLUMNARES),
+                        help='Tablas a exportar (por defecto todas)')
+    parser.add_argument('--destino', default=COLUMNAR_FOLDER, help='Carpeta de salida')
+    parser.add_argument('--sin-particion', action='store_true', help='No separar los archivos por año')
+    parser.add_argument('--completo', action='store_true',
+                        help='Reescribir todo en lugar de agregar solo las filas nuevas')
+    parser.add_argument('--bloque', type=int,
+                        help='Filas leídas de SQLite por bloque (por defecto EXPORTACION_FILAS_POR_BLOQUE)')
+    args = parser.parse_args()
+
+    exportar(args.formato, args.tablas, args.destino, not args.sin_particion, args.completo, args.bloque)
@@ -3,54 +3,88 @@
 """
 Módulo de Exportación a Excel
 Genera reportes detallados en formato Excel
+
+Por defecto usa el libro en modo write_only de openpyxl: cada fila se
+escribe al archivo temporal de su hoja apenas se agrega, las filas se leen
+del cursor de SQLite una a una (sin fetchall) y los formatos son estilos
+con nombre compartidos, registrados una sola vez en el libro. La memoria
+no crece con la cantidad de gastos del mes.
+
+crear_reporte_mensual(..., streaming=False) genera el reporte como antes
+(celda por celda, todo el libro en memoria); se conserva para comparar
+(ver benchmark_exportar_excel.py).
+
+crear_reporte_periodo consolida varios meses (p. ej. un año) en un solo
+libro; cada hoja sale de una sola consulta agrupada por anio, mes sobre
+todo el rango. crear_listado_egresos es el volcado de todos los egresos
+del periodo, fila por fila.
+
+Uso: python exportar_excel.py                              (mes actual)
+     python exportar_excel.py --desde 2025-01 --hasta 2025-12
 """
 
+import argparse
+import hashlib
 import sqlite3
 from datetime import datetime
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.chart import BarChart, PieChart, Reference
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, NamedStyle
+from openpyxl.utils import get_column_letter
+from SISTEMA_CONTABLE.NUCLEO.esquema_db import asegurar_esquema
+from SISTEMA_CONTABLE.NUCLEO.motor_consultas_lentas import ConexionMedida, vigilar
+from config import DATABASE_PATH
+
+DATABASE = DATABASE_PATH
 
-DATABASE = 'SISTEMA_CONTABLE/DATOS/contabilidad.db'
+# Cada cuántas filas crear_listado_egresos informa su avance
+FILAS_POR_AVANCE = 2000
 
 def formatear_moneda(valor):
     """Formatea un valor como moneda colombiana"""
     return f"${valor:,.0f}".replace(",", ".")
 
-def crear_reporte_mensual(mes, anio):
+def crear_reporte_mensual(mes, anio, ruta_db=DATABASE, destino=None, streaming=True, progreso=None):
     """
-    Crea un reporte Excel completo del mes especificado
+    Crea un reporte Excel completo del mes especificado.
+    `destino` es la ruta del archivo (por defecto Reporte_AAAA_MM.xlsx)
+    o un objeto de archivo abierto en modo binario.
+    `progreso(fraccion, mensaje)` se llama al terminar cada hoja.
     """
     print(f"\n📊 Generando reporte Excel para {mes}/{anio}...")
     
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    
-    # Crear workbook
-    wb = Workbook()
-    
-    # Eliminar hoja por defecto
-    wb.remove(wb.active)
-    
-    # HOJA 1: Resumen General
-    crear_hoja_resumen(wb, conn, mes, anio)
-    
-    # HOJA 2: Presupuestos Detallados
-    crear_hoja_presupuestos(wb, conn, mes, anio)
-    
-    # HOJA 3: Gastos Detallados
-    crear_hoja_gastos(wb, conn, mes, anio)
-    
-    # HOJA 4: Análisis por Categoría
-    crear_hoja_analisis(wb, conn, mes, anio)
-    
-    conn.close()
+    conn = sqlite3.connect(ruta_db, factory=ConexionMedida)
+    asegurar_esquema(conn)
+    
+    if streaming:
+        wb = Workbook(write_only=True)
+        registrar_estilos(wb)
+        hojas = (escribir_hoja_resumen, escribir_hoja_presupuestos,
+                 escribir_hoja_gastos, escribir_hoja_analisis)
+    else:
+        conn.row_factory = sqlite3.Row
+        wb = Workbook()
+        # Eliminar hoja por defecto
+        wb.remove(wb.active)
+        hojas = (crear_hoja_resumen, crear_hoja_presupuestos,
+                 crear_hoja_gastos, crear_hoja_analisis)
+    
+    # Las consultas que pasen CONSULTAS_LENTAS_UMBRAL_MS quedan en ConsultasLentas
+    try:
+        with vigilar(conn, 'exportar_excel'):
+            # Resumen General, Presupuestos, Gastos y Análisis por Categoría
+            for numero, crear_hoja in enumerate(hojas, 1):
+                crear_hoja(wb, conn, mes, anio)
+                if progreso:
+                    progreso(numero / (len(hojas) + 1), f"Hoja {numero} de {len(hojas)}")
+    finally:
+        conn.close()
     
     # Guardar archivo
-    nombre_archivo = f"Reporte_{anio}_{mes:02d}.xlsx"
+    nombre_archivo = destino or f"Reporte_{anio}_{mes:02d}.xlsx"
     wb.save(nombre_archivo)
     
-    print(f"✅ Reporte generado: {nombre_archivo}")
+    print(f"✅ Reporte generado: {nombre_archivo if isinstance(nombre_archivo, str) else 'en memoria'}")
     return nombre_archivo
 
 def crear_hoja_resumen(wb, conn, mes, anio):
@@ -146,8 +180,8 @@ def crear_hoja_resumen(wb, conn, mes, anio):
                SUM(monto) as monto_total,
                SUM(CASE WHEN estado = 'Pagado' THEN monto ELSE 0 END) as monto_pagado
         FROM Egresos
-        WHERE strftime('%m', fecha_vencimiento) = ? AND strftime('%Y', fecha_vencimiento) = ?
-    ''', (f"{mes:02d}", str(anio))).fetchone()
+        WHERE anio = ? AND mes = ?
+    ''', (anio, mes)).fetchone()
     
     row += 1
     ws[f'A{row}'] = f"Total de gastos: {gastos['total']}"
@@ -233,9 +267,9 @@ def crear_hoja_gastos(wb, conn, mes, anio):
     # Datos
     gastos = conn.execute('''
         SELECT * FROM Egresos
-        WHERE strftime('%m', fecha_vencimiento) = ? AND strftime('%Y', fecha_vencimiento) = ?
+        WHERE anio = ? AND mes = ?
         ORDER BY fecha_vencimiento DESC
-    ''', (f"{mes:02d}", str(anio))).fetchall()
+    ''', (anio, mes)).fetchall()
     
     row = 4
     for g in gastos:
@@ -271,10 +305,10 @@ def crear_hoja_analisis(wb, conn, mes, anio):
             SUM(monto) as total_gastos,
             AVG(monto) as promedio_gasto
         FROM Egresos
-        WHERE strftime('%m', fecha_vencimiento) = ? AND strftime('%Y', fecha_vencimiento) = ?
+        WHERE anio = ? AND mes = ?
         GROUP BY categoria
         ORDER BY total_gastos DESC
-    ''', (f"{mes:02d}", str(anio))).fetchall()
+    ''', (anio, mes)).fetchall()
     
     # Encabezados
     headers = ['Categoría', 'Cantidad', 'Total', 'Promedio', '% del Total']
@@ -301,7 +335,551 @@ def crear_hoja_analisis(wb, conn, mes, anio):
     for col in range(1, 6):
         ws.column_dimensions[chr(64 + col)].width = 15
 
+def version_datos_mes(conn, mes, anio):
+    """
+    Huella (hash) de los gastos y presupuestos del mes que entran al
+    reporte mensual: cambia con cualquier cambio de esos datos, y solo
+    entonces. El panel la usa como clave de su caché de reportes.
+    """
+    huella = hashlib.blake2b(digest_size=16)
+    for consulta in ('''
+        SELECT id, categoria, etiqueta, monto_presupuestado, monto_gastado
+        FROM Presupuestos
+        WHERE mes = ? AND anio = ?
+        ORDER BY id
+    ''', '''
+        SELECT id, descripcion, categoria, etiqueta, monto, fecha_vencimiento, estado,
+               fecha_pago, usuario_que_pago
+        FROM Egresos
+        WHERE mes = ? AND anio = ?
+        ORDER BY id
+    '''):
+        for fila in conn.execute(consulta, (mes, anio)):
+            huella.update(repr(tuple(fila)).encode('utf-8'))
+        huella.update(b'|')
+    return huella.hexdigest()
+
+# ==========================================
+# MODO STREAMING (write_only)
+# ==========================================
+
+FORMATO_MONEDA = '#,##0'
+COLOR_SECCION = "667eea"
+COLOR_ENCABEZADO = "E8E8E8"
+
+
+def registrar_estilos(wb):
+    """
+    Registra los estilos con nombre del reporte. Cada celda guarda solo el
+    nombre, no un Font/PatternFill propio. Se crean por libro porque
+    add_named_style los asocia al libro que los recibe.
+    """
+    estilos = [
+        NamedStyle('titulo_reporte', font=Font(size=16, bold=True)),
+        NamedStyle('titulo_hoja', font=Font(size=14, bold=True)),
+        NamedStyle('seccion', font=Font(size=14, bold=True, color="FFFFFF"),
+                   fill=PatternFill(start_color=COLOR_SECCION, end_color=COLOR_SECCION, fill_type="solid")),
+        NamedStyle('encabezado', font=Font(bold=True),
+                   fill=PatternFill(start_color=COLOR_ENCABEZADO, end_color=COLOR_ENCABEZADO, fill_type="solid")),
+        NamedStyle('moneda', number_format=FORMATO_MONEDA),
+        NamedStyle('total', font=Font(bold=True)),
+    ]
+    for estilo in estilos:
+        wb.add_named_style(estilo)
+
+
+def celda(ws, valor, estilo):
+    """Celda de una hoja write_only con un estilo con nombre"""
+    c = WriteOnlyCell(ws, value=valor)
+    c.style = estilo
+    return c
+
+
+def anchos_columnas(ws, anchos):
+    """En write_only los anchos se fijan antes de agregar la primera fila"""
+    for indice, ancho in enumerate(anchos, 1):
+        ws.column_dimensions[get_column_letter(indice)].width = ancho
+
+
+def titulo(ws, fila, texto, estilo, columnas):
+    """Agrega la fila `fila`: un título combinado sobre `columnas` columnas"""
+    ws.append([celda(ws, texto, estilo)])
+    ws.merged_cells.add(f"A{fila}:{get_column_letter(columnas)}{fila}")
+
+
+def porcentaje_uso(gastado, presupuestado):
+    return (gastado / presupuestado * 100) if presupuestado > 0 else 0
+
+
+def escribir_hoja_resumen(wb, conn, mes, anio):
+    """Hoja de resumen general (streaming)"""
+    ws = wb.create_sheet("📊 Resumen General")
+    anchos_columnas(ws, [20, 15, 15, 15, 15, 12])
+    
+    titulo(ws, 1, f"REPORTE FINANCIERO - {mes}/{anio}", 'titulo_reporte', 6)
+    fecha = f"Generado: {datetime.now().strftime('%d/%m/%Y %H:%M')}"
+    ws.append([fecha])
+    ws.merged_cells.add('A2:F2')
+    ws.append([])
+    
+    # SECCIÓN: Presupuestos
+    titulo(ws, 4, "PRESUPUESTOS DEL MES", 'seccion', 6)
+    ws.append([celda(ws, encabezado, 'encabezado') for encabezado in
+               ("Categoría", "Etiqueta", "Presupuestado", "Gastado", "Diferencia", "% Uso")])
+    
+    fila = 6
+    total_presupuestado = 0
+    total_gastado = 0
+    for categoria, etiqueta, presupuestado, gastado in conn.execute('''
+        SELECT categoria, etiqueta, monto_presupuestado, monto_gastado
+        FROM Presupuestos
+        WHERE mes = ? AND anio = ?
+        ORDER BY categoria
+    ''', (mes, anio)):
+        ws.append([categoria, etiqueta,
+                   celda(ws, presupuestado, 'moneda'),
+                   celda(ws, gastado, 'moneda'),
+                   celda(ws, presupuestado - gastado, 'moneda'),
+                   f"{porcentaje_uso(gastado, presupuestado):.1f}%"])
+        total_presupuestado += presupuestado
+        total_gastado += gastado
+        fila += 1
+    
+    # Totales
+    ws.append([celda(ws, "TOTAL", 'total'), None,
+               celda(ws, total_presupuestado, 'moneda'),
+               celda(ws, total_gastado, 'moneda'),
+               celda(ws, total_presupuestado - total_gastado, 'moneda'),
+               f"{porcentaje_uso(total_gastado, total_presupuestado):.1f}%"])
+    
+    # SECCIÓN: Gastos
+    ws.append([])
+    ws.append([])
+    titulo(ws, fila + 3, "GASTOS DEL MES", 'seccion', 6)
+    
+    total, pagados, pendientes, monto_total, monto_pagado = conn.execute('''
+        SELECT COUNT(*) as total, 
+               SUM(CASE WHEN estado = 'Pagado' THEN 1 ELSE 0 END) as pagados,
+               SUM(CASE WHEN estado = 'Pendiente' THEN 1 ELSE 0 END) as pendientes,
+               TOTAL(monto) as monto_total,
+               TOTAL(CASE WHEN estado = 'Pagado' THEN monto ELSE 0 END) as monto_pagado
+        FROM Egresos
+        WHERE anio = ? AND mes = ?
+    ''', (anio, mes)).fetchone()
+    
+    ws.append([f"Total de gastos: {total}"])
+    ws.append([f"Pagados: {pagados or 0}", None, celda(ws, monto_pagado, 'moneda')])
+    ws.append([f"Pendientes: {pendientes or 0}", None, celda(ws, monto_total - monto_pagado, 'moneda')])
+
+
+def escribir_hoja_presupuestos(wb, conn, mes, anio):
+    """Hoja de presupuestos detallados (streaming)"""
+    ws = wb.create_sheet("💰 Presupuestos")
+    anchos_columnas(ws, [15] * 7)
+    
+    titulo(ws, 1, f"PRESUPUESTOS DETALLADOS - {mes}/{anio}", 'titulo_hoja', 7)
+    ws.append([])
+    ws.append([celda(ws, encabezado, 'encabezado') for encabezado in
+               ('Categoría', 'Etiqueta', 'Presupuestado', 'Gastado', 'Disponible', '% Uso', 'Estado')])
+    
+    for categoria, etiqueta, presupuestado, gastado in conn.execute('''
+        SELECT categoria, etiqueta, monto_presupuestado, monto_gastado
+        FROM Presupuestos
+        WHERE mes = ? AND anio = ?
+        ORDER BY categoria
+    ''', (mes, anio)):
+        porcentaje = porcentaje_uso(gastado, presupuestado)
+        if porcentaje > 100:
+            estado = "❌ Excedido"
+        elif porcentaje > 90:
+            estado = "⚠️ Cerca"
+        else:
+            estado = "✅ OK"
+        ws.append([categoria, etiqueta,
+                   celda(ws, presupuestado, 'moneda'),
+                   celda(ws, gastado, 'moneda'),
+                   celda(ws, presupuestado - gastado, 'moneda'),
+                   f"{porcentaje:.1f}%", estado])
+
+
+def escribir_hoja_gastos(wb, conn, mes, anio):
+    """Hoja de gastos detallados (streaming): una fila por gasto, sin fetchall"""
+    ws = wb.create_sheet("📋 Gastos")
+    anchos_columnas(ws, [30] + [15] * 7)
+    
+    titulo(ws, 1, f"GASTOS DETALLADOS - {mes}/{anio}", 'titulo_hoja', 8)
+    ws.append([])
+    ws.append([celda(ws, encabezado, 'encabezado') for encabezado in
+               ('Descripción', 'Categoría', 'Etiqueta', 'Monto', 'Vencimiento', 'Estado', 'Fecha Pago', 'Usuario')])
+    
+    cursor = conn.execute('''
+        SELECT descripcion, categoria, etiqueta, monto, fecha_vencimiento, estado,
+               COALESCE(NULLIF(fecha_pago, ''), '-'),
+               COALESCE(NULLIF(usuario_que_pago, ''), '-')
+        FROM Egresos
+        WHERE anio = ? AND mes = ?
+        ORDER BY fecha_vencimiento DESC
+    ''', (anio, mes))
+    for descripcion, categoria, etiqueta, monto, vencimiento, estado, fecha_pago, usuario in cursor:
+        ws.append([descripcion, categoria, etiqueta, celda(ws, monto, 'moneda'),
+                   vencimiento, estado, fecha_pago, usuario])
+
+
+def escribir_hoja_analisis(wb, conn, mes, anio):
+    """Hoja de análisis por categoría (streaming)"""
+    ws = wb.create_sheet("📈 Análisis")
+    anchos_columnas(ws, [15] * 5)
+    
+    titulo(ws, 1, f"ANÁLISIS POR CATEGORÍA - {mes}/{anio}", 'titulo_hoja', 5)
+    ws.append([])
+    ws.append([celda(ws, encabezado, 'encabezado') for encabezado in
+               ('Categoría', 'Cantidad', 'Total', 'Promedio', '% del Total')])
+    
+    # El total general sale de la misma consulta (ventana sobre los grupos)
+    for categoria, cantidad, total, promedio, total_general in conn.execute('''
+        SELECT 
+            categoria,
+            COUNT(*) as cantidad_gastos,
+            SUM(monto) as total_gastos,
+            AVG(monto) as promedio_gasto,
+            SUM(SUM(monto)) OVER () as total_general
+        FROM Egresos
+        WHERE anio = ? AND mes = ?
+        GROUP BY categoria
+        ORDER BY total_gastos DESC
+    ''', (anio, mes)):
+        porcentaje = (total / total_general * 100) if total_general > 0 else 0
+        ws.append([categoria, cantidad, celda(ws, total, 'moneda'),
+                   celda(ws, promedio, 'moneda'), f"{porcentaje:.1f}%"])
+
+# ==========================================
+# REPORTE CONSOLIDADO DE VARIOS MESES
+# ==========================================
+
+def leer_periodo(texto):
+    """'AAAA-MM' -> (anio, mes); para argparse y la ruta del panel"""
+    try:
+        fecha = datetime.strptime(texto.strip(), '%Y-%m')
+    except ValueError:
+        raise ValueError(f"Periodo inválido: {texto} (use AAAA-MM)") from None
+    return fecha.year, fecha.month
+
+
+def siguiente_mes(anio, mes):
+    return (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+
+
+def meses_del_periodo(desde, hasta):
+    """Lista de (anio, mes) de desde a hasta, ambos incluidos"""
+    meses = []
+    actual = desde
+    while actual <= hasta:
+        meses.append(actual)
+        actual = siguiente_mes(*actual)
+    return meses
+
+
+def nombre_mes(anio, mes):
+    return f"{anio}-{mes:02d}"
+
+
+def parametros_periodo(desde, hasta):
+    """Parámetros con nombre de las consultas del periodo"""
+    fin = siguiente_mes(*hasta)
+    return {
+        'anio_desde': desde[0], 'mes_desde': desde[1],
+        'anio_hasta': hasta[0], 'mes_hasta': hasta[1],
+        # Egresos se filtra por fecha_vencimiento (índice idx_egresos_fecha)
+        'inicio': f"{desde[0]}-{desde[1]:02d}-01",
+        'fin': f"{fin[0]}-{fin[1]:02d}-01",
+    }
+
+
+FILTRO_EGRESOS_PERIODO = "fecha_vencimiento >= :inicio AND fecha_vencimiento < :fin"
+FILTRO_PRESUPUESTOS_PERIODO = "(anio, mes) BETWEEN (:anio_desde, :mes_desde) AND (:anio_hasta, :mes_hasta)"
+
+
+def crear_reporte_periodo(desde, hasta, ruta_db=DATABASE, destino=None, progreso=None):
+    """
+    Crea un reporte Excel consolidado de los meses desde..hasta, cada uno
+    un (anio, mes): resumen mes a mes, presupuestos, gastos y matriz de
+    categorías por mes. `destino` es la ruta del archivo (por defecto
+    Reporte_AAAA_MM_a_AAAA_MM.xlsx) o un objeto de archivo binario.
+    `progreso(fraccion, mensaje)` se llama al terminar cada hoja.
+    """
+    if desde > hasta:
+        raise ValueError(f"El periodo empieza ({nombre_mes(*desde)}) después de terminar ({nombre_mes(*hasta)})")
+    
+    print(f"\n📊 Generando reporte Excel de {nombre_mes(*desde)} a {nombre_mes(*hasta)}...")
+    
+    conn = sqlite3.connect(ruta_db, factory=ConexionMedida)
+    asegurar_esquema(conn)
+    
+    wb = Workbook(write_only=True)
+    registrar_estilos(wb)
+    parametros = parametros_periodo(desde, hasta)
+    hojas = (escribir_periodo_resumen, escribir_periodo_presupuestos,
+             escribir_periodo_gastos, escribir_periodo_analisis)
+    try:
+        with vigilar(conn, 'exportar_excel_periodo'):
+            for numero, escribir_hoja in enumerate(hojas, 1):
+                escribir_hoja(wb, conn, desde, hasta, parametros)
+                if progreso:
+                    progreso(numero / (len(hojas) + 1), f"Hoja {numero} de {len(hojas)}")
+    finally:
+        conn.close()
+    
+    nombre_archivo = destino or f"Reporte_{desde[0]}_{desde[1]:02d}_a_{hasta[0]}_{hasta[1]:02d}.xlsx"
+    wb.save(nombre_archivo)
+    
+    print(f"✅ Reporte generado: {nombre_archivo if isinstance(nombre_archivo, str) else 'en memoria'}")
+    return nombre_archivo
+
+
+def titulo_periodo(desde, hasta):
+    return f"{desde[1]:02d}/{desde[0]} - {hasta[1]:02d}/{hasta[0]}"
+
+
+def escribir_periodo_resumen(wb, conn, desde, hasta, parametros):
+    """Una fila por mes del periodo (también los meses sin datos) y el total"""
+    ws = wb.create_sheet("📊 Resumen por Mes")
+    anchos_columnas(ws, [12, 16, 16, 16, 10, 10, 10, 11, 16, 16, 16])
+    
+    titulo(ws, 1, f"REPORTE CONSOLIDADO - {titulo_periodo(desde, hasta)}", 'titulo_reporte', 11)
+    ws.append([f"Generado: {datetime.now().strftime('%d/%m/%Y %H:%M')}"])
+    ws.merged_cells.add('A2:K2')
+    ws.append([])
+    ws.append([celda(ws, encabezado, 'encabezado') for encabezado in
+               ('Mes', 'Presupuestado', 'Gastado', 'Diferencia', '% Uso', 'Gastos', 'Pagados',
+                'Pendientes', 'Monto Total', 'Monto Pagado', 'Monto Pendiente')])
+    
+    totales = [0] * 7
+    for anio, mes, *valores in conn.execute(f'''
+        WITH RECURSIVE meses(anio, mes) AS (
+            SELECT :anio_desde, :mes_desde
+            UNION ALL
+            SELECT anio + (mes = 12), mes % 12 + 1 FROM meses
+            WHERE (anio, mes) < (:anio_hasta, :mes_hasta)
+        ),
+        gastos_mes AS (
+            SELECT anio, mes,
+                   COUNT(*) AS cantidad,
+                   SUM(estado = 'Pagado') AS pagados,
+                   SUM(estado = 'Pendiente') AS pendientes,
+                   TOTAL(monto) AS monto_total,
+                   TOTAL(CASE WHEN estado = 'Pagado' THEN monto END) AS monto_pagado
+            FROM Egresos
+            WHERE {FILTRO_EGRESOS_PERIODO}
+            GROUP BY anio, mes
+        ),
+        presupuestos_mes AS (
+            SELECT anio, mes,
+                   TOTAL(monto_presupuestado) AS presupuestado,
+                   TOTAL(monto_gastado) AS gastado
+            FROM Presupuestos
+            WHERE {FILTRO_PRESUPUESTOS_PERIODO}
+            GROUP BY anio, mes
+        )
+        SELECT m.anio, m.mes,
+               COALESCE(p.presupuestado, 0), COALESCE(p.gastado, 0),
+               COALESCE(g.cantidad, 0), COALESCE(g.pagados, 0), COALESCE(g.pendientes, 0),
+               COALESCE(g.monto_total, 0), COALESCE(g.monto_pagado, 0)
+        FROM meses m
+        LEFT JOIN gastos_mes g USING (anio, mes)
+        LEFT JOIN presupuestos_mes p USING (anio, mes)
+        ORDER BY m.anio, m.mes
+    ''', parametros):
+        totales = [total + valor for total, valor in zip(totales, valores)]
+        ws.append(fila_resumen_periodo(ws, nombre_mes(anio, mes), *valores))
+    
+    ws.append(fila_resumen_periodo(ws, celda(ws, "TOTAL", 'total'), *totales))
+
+
+def fila_resumen_periodo(ws, mes, presupuestado, gastado, cantidad, pagados, pendientes,
+                         monto_total, monto_pagado):
+    return [mes,
+            celda(ws, presupuestado, 'moneda'),
+            celda(ws, gastado, 'moneda'),
+            celda(ws, presupuestado - gastado, 'moneda'),
+            f"{porcentaje_uso(gastado, presupuestado):.1f}%",
+            cantidad, pagados, pendientes,
+            celda(ws, monto_total, 'moneda'),
+            celda(ws, monto_pagado, 'moneda'),
+            celda(ws, monto_total - monto_pagado, 'moneda')]
+
+
+def escribir_periodo_presupuestos(wb, conn, desde, hasta, parametros):
+    """Presupuestos de cada mes del periodo"""
+    ws = wb.create_sheet("💰 Presupuestos")
+    anchos_columnas(ws, [12, 20, 15, 15, 15, 15, 10, 14])
+    
+    titulo(ws, 1, f"PRESUPUESTOS - {titulo_periodo(desde, hasta)}", 'titulo_hoja', 8)
+    ws.append([])
+    ws.append([celda(ws, encabezado, 'encabezado') for encabezado in
+               ('Mes', 'Categoría', 'Etiqueta', 'Presupuestado', 'Gastado', 'Disponible', '% Uso', 'Estado')])
+    
+    for anio, mes, categoria, etiqueta, presupuestado, gastado in conn.execute(f'''
+        SELECT anio, mes, categoria, etiqueta,
+               TOTAL(monto_presupuestado), TOTAL(monto_gastado)
+        FROM Presupuestos
+        WHERE {FILTRO_PRESUPUESTOS_PERIODO}
+        GROUP BY anio, mes, categoria, etiqueta
+        ORDER BY anio, mes, categoria, etiqueta
+    ''', parametros):
+        porcentaje = porcentaje_uso(gastado, presupuestado)
+        if porcentaje > 100:
+            estado = "❌ Excedido"
+        elif porcentaje > 90:
+            estado = "⚠️ Cerca"
+        else:
+            estado = "✅ OK"
+        ws.append([nombre_mes(anio, mes), categoria, etiqueta,
+                   celda(ws, presupuestado, 'moneda'),
+                   celda(ws, gastado, 'moneda'),
+                   celda(ws, presupuestado - gastado, 'moneda'),
+                   f"{porcentaje:.1f}%", estado])
+
+
+def escribir_periodo_gastos(wb, conn, desde, hasta, parametros):
+    """Gastos de cada mes por categoría y etiqueta (cantidad y montos)"""
+    ws = wb.create_sheet("📋 Gastos")
+    anchos_columnas(ws, [12, 20, 15, 10, 16, 16, 16])
+    
+    titulo(ws, 1, f"GASTOS POR MES - {titulo_periodo(desde, hasta)}", 'titulo_hoja', 7)
+    ws.append([])
+    ws.append([celda(ws, encabezado, 'encabezado') for encabezado in
+               ('Mes', 'Categoría', 'Etiqueta', 'Cantidad', 'Total', 'Pagado', 'Pendiente')])
+    
+    for anio, mes, categoria, etiqueta, cantidad, total, pagado, pendiente in conn.execute(f'''
+        SELECT anio, mes, categoria, etiqueta,
+               COUNT(*),
+               TOTAL(monto),
+               TOTAL(CASE WHEN estado = 'Pagado' THEN monto END),
+               TOTAL(CASE WHEN estado = 'Pendiente' THEN monto END)
+        FROM Egresos
+        WHERE {FILTRO_EGRESOS_PERIODO}
+        GROUP BY anio, mes, categoria, etiqueta
+        ORDER BY anio, mes, categoria, etiqueta
+    ''', parametros):
+        ws.append([nombre_mes(anio, mes), categoria, etiqueta, cantidad,
+                   celda(ws, total, 'moneda'),
+                   celda(ws, pagado, 'moneda'),
+                   celda(ws, pendiente, 'moneda')])
+
+
+def escribir_periodo_analisis(wb, conn, desde, hasta, parametros):
+    """Matriz categoría x mes con el total de cada categoría y su % del periodo"""
+    meses = meses_del_periodo(desde, hasta)
+    columna = {mes: indice for indice, mes in enumerate(meses)}
+    
+    matriz = {}
+    for categoria, anio, mes, total in conn.execute(f'''
+        SELECT categoria, anio, mes, TOTAL(monto)
+        FROM Egresos
+        WHERE {FILTRO_EGRESOS_PERIODO}
+        GROUP BY categoria, anio, mes
+    ''', parametros):
+        matriz.setdefault(categoria, [0.0] * len(meses))[columna[(anio, mes)]] = total
+    
+    ws = wb.create_sheet("📈 Análisis")
+    anchos_columnas(ws, [20] + [13] * len(meses) + [15, 15, 11])
+    
+    columnas = len(meses) + 4
+    titulo(ws, 1, f"ANÁLISIS POR CATEGORÍA - {titulo_periodo(desde, hasta)}", 'titulo_hoja', columnas)
+    ws.append([])
+    ws.append([celda(ws, encabezado, 'encabezado') for encabezado in
+               ['Categoría'] + [nombre_mes(*mes) for mes in meses] + ['Total', 'Promedio Mensual', '% del Total']])
+    
+    total_general = sum(sum(valores) for valores in matriz.values())
+    por_mes = [0.0] * len(meses)
+    for categoria, valores in sorted(matriz.items(), key=lambda item: sum(item[1]), reverse=True):
+        total = sum(valores)
+        por_mes = [acumulado + valor for acumulado, valor in zip(por_mes, valores)]
+        porcentaje = (total / total_general * 100) if total_general > 0 else 0
+        ws.append([categoria]
+                  + [celda(ws, valor, 'moneda') for valor in valores]
+                  + [celda(ws, total, 'moneda'), celda(ws, total / len(meses), 'moneda'), f"{porcentaje:.1f}%"])
+    
+    ws.append([celda(ws, "TOTAL", 'total')]
+              + [celda(ws, valor, 'moneda') for valor in por_mes]
+              + [celda(ws, total_general, 'moneda'), celda(ws, total_general / len(meses), 'moneda'),
+                 "100.0%" if total_general > 0 else "0.0%"])
+
+
+def crear_listado_egresos(desde, hasta, ruta_db=DATABASE, destino=None, progreso=None):
+    """
+    Exporta todos los egresos de los meses desde..hasta, uno por fila (el
+    volcado completo, p. ej. de varios años). `progreso(fraccion, mensaje)`
+    se llama cada FILAS_POR_AVANCE filas.
+    """
+    if desde > hasta:
+        raise ValueError(f"El periodo empieza ({nombre_mes(*desde)}) después de terminar ({nombre_mes(*hasta)})")
+    
+    print(f"\n📊 Exportando egresos de {nombre_mes(*desde)} a {nombre_mes(*hasta)}...")
+    
+    conn = sqlite3.connect(ruta_db, factory=ConexionMedida)
+    asegurar_esquema(conn)
+    
+    wb = Workbook(write_only=True)
+    registrar_estilos(wb)
+    parametros = parametros_periodo(desde, hasta)
+    ws = wb.create_sheet("📋 Egresos")
+    anchos_columnas(ws, [10, 12, 30, 20, 15, 15, 12, 12, 12, 15])
+    titulo(ws, 1, f"EGRESOS - {titulo_periodo(desde, hasta)}", 'titulo_hoja', 10)
+    ws.append([])
+    ws.append([celda(ws, encabezado, 'encabezado') for encabezado in
+               ('ID', 'Mes', 'Descripción', 'Categoría', 'Etiqueta', 'Monto', 'Vencimiento',
+                'Estado', 'Fecha Pago', 'Usuario')])
+    try:
+        with vigilar(conn, 'exportar_excel_egresos'):
+            total = conn.execute(f"SELECT COUNT(*) FROM Egresos WHERE {FILTRO_EGRESOS_PERIODO}",
+                                 parametros).fetchone()[0]
+            cursor = conn.execute(f'''
+                SELECT id, anio, mes, descripcion, categoria, etiqueta, monto, fecha_vencimiento, estado,
+                       COALESCE(NULLIF(fecha_pago, ''), '-'),
+                       COALESCE(NULLIF(usuario_que_pago, ''), '-')
+                FROM Egresos
+                WHERE {FILTRO_EGRESOS_PERIODO}
+                ORDER BY fecha_vencimiento, id
+            ''', parametros)
+            try:
+                for numero, (gasto_id, anio, mes, descripcion, categoria, etiqueta, monto,
+                             vencimiento, estado, fecha_pago, usuario) in enumerate(cursor, 1):
+                    ws.append([gasto_id, nombre_mes(anio, mes), descripcion, categoria, etiqueta,
+                               celda(ws, monto, 'moneda'), vencimiento, estado, fecha_pago, usuario])
+                    if progreso and numero % FILAS_POR_AVANCE == 0:
+                        # El último tramo es guardar el libro
+                        progreso(0.9 * numero / total, f"{numero:,} de {total:,} egresos")
+            finally:
+                # Si progreso() corta el recorrido, soltar la lectura antes de
+                # que vigilar() escriba las consultas lentas
+                cursor.close()
+    finally:
+        conn.close()
+    
+    if progreso:
+        progreso(0.9, "Guardando el libro")
+    nombre_archivo = destino or f"Egresos_{desde[0]}_{desde[1]:02d}_a_{hasta[0]}_{hasta[1]:02d}.xlsx"
+    wb.save(nombre_archivo)
+    
+    print(f"✅ Egresos exportados: {nombre_archivo if isinstance(nombre_archivo, str) else 'en memoria'}")
+    return nombre_archivo
+
+
 if __name__ == "__main__":
-    # Generar reporte del mes actual
+    parser = argparse.ArgumentParser(description='Genera el reporte Excel de un mes o de un periodo')
+    parser.add_argument('--desde', type=leer_periodo, help='Primer mes del periodo (AAAA-MM)')
+    parser.add_argument('--hasta', type=leer_periodo, help='Último mes del periodo (AAAA-MM, por defecto el actual)')
+    args = parser.parse_args()
+    
     ahora = datetime.now()
-    crear_reporte_mensual(ahora.month, ahora.year)
\ No newline at end of file
+    if args.desde or args.hasta:
+        hasta = args.hasta or (ahora.year, ahora.month)
+        desde = args.desde or (hasta[0], 1)
+        try:
+            crear_reporte_periodo(desde, hasta)
+        except ValueError as e:
+            print(f"❌ Error: {e}")
+    else:
+        # Generar reporte del mes actual
+        crear_reporte_mensual(ahora.month, ahora.year)
\ No newline at end of file
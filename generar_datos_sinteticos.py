@@ -0,0 +1,416 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Generador de Datos Sintéticos
+Crea una base de datos aparte con años de historial inventado para probar
+el panel y los scripts con volúmenes reales: de 100.000 a 5.000.000 de
+egresos, con sus presupuestos mensuales, templates, tareas, clientes y
+cuentas de cobro.
+
+Es determinista: la misma semilla, cantidad, años y fecha de referencia
+producen exactamente los mismos datos. La fecha de referencia hace de
+"hoy": lo anterior queda casi todo pagado y lo posterior pendiente.
+
+Distribuciones:
+- Categorías con frecuencia y montos propios (muchos gastos pequeños de
+  cafetería, pocos y grandes de arriendo o nómina), montos log-normales.
+- Etiquetas 3 a 1 entre OFICINA y el resto.
+- El volumen crece ~8% por año; los vencimientos se concentran en los
+  primeros 10 días del mes.
+- Series recurrentes mensuales (arriendo, internet, nómina...) con su
+  siguiente ocurrencia pendiente, como las deja el panel al pagarlas.
+
+Uso: python generar_datos_sinteticos.py [--egresos N] [--anios N] [--semilla N]
+                                        [--hasta AAAA-MM-DD] [--salida RUTA] [--reemplazar]
+"""
+
+import argparse
+import calendar
+import contextlib
+import io
+import math
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+from config import DATABASE_PATH, ETIQUETAS
+from corregir_tabla_log import corregir_tabla
+from migrar_templates_presupuestos import migrar_sistema_templates
+from SISTEMA_CONTABLE.MODULOS.cxc.database import inicializar_bd
+from SISTEMA_CONTABLE.NUCLEO.esquema_db import asegurar_esquema
+
+RUTA_SINTETICA = 'SISTEMA_CONTABLE/DATOS/contabilidad_sintetica.db'
+TAMANO_LOTE = 50000
+
+# categoría -> (peso en cantidad de egresos, monto típico, dispersión, descripciones)
+CATEGORIAS = {
+    'Nómina': (8, 1800000, 0.35, ['Nómina', 'Seguridad social', 'Prima de servicios',
+                                  'Auxilio de transporte', 'Horas extra', 'Cesantías']),
+    'Arriendo': (3, 2500000, 0.15, ['Arriendo oficina', 'Arriendo bodega', 'Administración edificio',
+                                    'Parqueadero']),
+    'Servicios': (10, 280000, 0.5, ['Energía eléctrica', 'Acueducto y alcantarillado', 'Gas natural',
+                                    'Recolección de aseo']),
+    'Internet': (4, 150000, 0.3, ['Internet fibra óptica', 'Plan celular', 'Telefonía fija']),
+    'Suscripciones': (8, 120000, 0.7, ['Software contable', 'Licencia ofimática', 'Almacenamiento en la nube',
+                                       'Antivirus', 'Firma electrónica']),
+    'Mantenimiento': (7, 350000, 0.9, ['Mantenimiento aire acondicionado', 'Reparación impresora',
+                                       'Mantenimiento computadores', 'Plomería', 'Pintura oficina']),
+    'Cafetería': (30, 45000, 0.8, ['Café y azúcar', 'Agua en botellón', 'Refrigerios reunión',
+                                   'Implementos de aseo', 'Almuerzo con clientes']),
+    'Impuestos': (5, 900000, 1.0, ['Retención en la fuente', 'IVA bimestral', 'Industria y comercio',
+                                   'Impuesto predial', 'Cuota de renta']),
+    'Otros': (25, 90000, 1.0, ['Papelería', 'Mensajería', 'Transporte', 'Fotocopias',
+                               'Gastos notariales', 'Renovación cámara de comercio']),
+}
+
+PROVEEDORES = ['Éxito', 'Claro', 'Movistar', 'EPM', 'Vanti', 'Alkosto', 'Servientrega', 'Siigo',
+               'Microsoft', 'Google', 'Panamericana', 'Ferretería Central', 'Juan Valdez', 'Notaría 5',
+               'Cámara de Comercio', 'DIAN', 'Secretaría de Hacienda', 'Técnicos Unidos', 'Rappi',
+               'Inmobiliaria Andes']
+
+USUARIOS = ['Administrador', 'Contabilidad', 'Gerencia']
+
+# (descripción, categoría, etiqueta, monto, día del mes) de las series mensuales
+SERIES_RECURRENTES = [
+    ('Arriendo oficina principal', 'Arriendo', 'OFICINA', 2500000, 5),
+    ('Internet fibra óptica', 'Internet', 'OFICINA', 150000, 12),
+    ('Software contable', 'Suscripciones', 'OFICINA', 120000, 20),
+    ('Nómina asistente', 'Nómina', 'OFICINA', 1800000, 28),
+    ('Plan celular familiar', 'Internet', 'GTFF', 90000, 18),
+    ('Administración apartamento', 'Arriendo', 'GTFF', 450000, 10),
+]
+
+CATEGORIAS_TAREAS = ['Declaración', 'Cliente', 'Interno', 'Favor']
+TAREAS = ['Declaración de renta', 'Declaración de IVA', 'Retención en la fuente', 'Conciliación bancaria',
+          'Revisar extractos', 'Enviar cuenta de cobro', 'Llamar al cliente', 'Actualizar RUT',
+          'Informe de exógena', 'Cierre contable del mes', 'Pagar seguridad social']
+NOMBRES = ['Andrés', 'Carolina', 'Juan', 'María', 'Luis', 'Ana', 'Carlos', 'Paula', 'Jorge', 'Diana',
+           'Felipe', 'Natalia', 'Santiago', 'Laura', 'Camilo', 'Valentina']
+APELLIDOS = ['Gómez', 'Rodríguez', 'Martínez', 'López', 'García', 'Pérez', 'Sánchez', 'Ramírez',
+             'Torres', 'Díaz', 'Vargas', 'Castro', 'Rojas', 'Moreno', 'Ortiz', 'Jiménez']
+CIUDADES = ['Bogotá', 'Medellín', 'Cali', 'Barranquilla', 'Bucaramanga', 'Pereira', 'Cartagena']
+
+NOMBRES_MES = ['enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio', 'agosto',
+               'septiembre', 'octubre', 'noviembre', 'diciembre']
+
+# Meses posteriores a la fecha de referencia que ya tienen gastos programados
+MESES_FUTUROS = 3
+
+
+def leer_fecha(texto):
+    """Convierte 'AAAA-MM-DD' en date"""
+    anio, mes, dia = (int(parte) for parte in texto.split('-'))
+    return date(anio, mes, dia)
+
+
+def sumar_meses(anio, mes, meses):
+    total = anio * 12 + (mes - 1) + meses
+    return total // 12, total % 12 + 1
+
+
+def meses_del_rango(referencia, anios):
+    """Lista de (anio, mes) desde `anios` atrás hasta MESES_FUTUROS después de la referencia"""
+    inicio = sumar_meses(referencia.year, referencia.month, -(anios * 12 - 1))
+    return [sumar_meses(*inicio, i) for i in range(anios * 12 + MESES_FUTUROS)]
+
+
+def pesos_etiquetas():
+    """La primera etiqueta (OFICINA) pesa 3 veces más que cada una de las demás"""
+    return [3 if i == 0 else 1 for i in range(len(ETIQUETAS))]
+
+
+def pesos_meses(meses):
+    """Crecimiento del ~8% anual; los meses futuros solo tienen una parte programada"""
+    indice_referencia = len(meses) - MESES_FUTUROS - 1
+    return [1.08 ** (i / 12) * (0.3 if i > indice_referencia else 1) for i in range(len(meses))]
+
+
+def generar_monto(aleatorio, tipico, dispersion):
+    """Monto log-normal alrededor del valor típico, redondeado a centenas"""
+    return max(round(aleatorio.lognormvariate(math.log(tipico), dispersion), -2), 1000.0)
+
+
+def fila_pago(aleatorio, fecha, referencia):
+    """(estado, fecha_pago, usuario) de un egreso que vence en `fecha`"""
+    # Lo vencido se paga casi todo; un 3% queda pendiente (vencido)
+    if fecha < referencia and aleatorio.random() < 0.97:
+        pago = min(fecha - timedelta(days=aleatorio.randrange(6)), referencia)
+        return 'Pagado', f"{pago.isoformat()} {aleatorio.randrange(8, 18):02d}:{aleatorio.randrange(60):02d}:00", \
+            aleatorio.choice(USUARIOS)
+    return 'Pendiente', None, None
+
+
+def generar_egresos(aleatorio, cantidad, referencia, anios):
+    """
+    Genera las filas de Egresos (sin las series recurrentes), en el orden
+    de las columnas de SQL_INSERTAR_EGRESO.
+    """
+    meses = meses_del_rango(referencia, anios)
+    pesos = pesos_meses(meses)
+
+    nombres_categorias = list(CATEGORIAS)
+    pesos_categorias = [CATEGORIAS[nombre][0] for nombre in nombres_categorias]
+    pesos_etq = pesos_etiquetas()
+
+    for inicio_lote in range(0, cantidad, TAMANO_LOTE):
+        k = min(TAMANO_LOTE, cantidad - inicio_lote)
+        periodos = aleatorio.choices(meses, weights=pesos, k=k)
+        categorias = aleatorio.choices(nombres_categorias, weights=pesos_categorias, k=k)
+        etiquetas = aleatorio.choices(ETIQUETAS, weights=pesos_etq, k=k)
+
+        for (anio, mes), categoria, etiqueta in zip(periodos, categorias, etiquetas):
+            _, tipico, dispersion, descripciones = CATEGORIAS[categoria]
+            ultimo_dia = calendar.monthrange(anio, mes)[1]
+            dia = aleatorio.randint(1, 10) if aleatorio.random() < 0.6 else aleatorio.randint(1, ultimo_dia)
+            fecha = date(anio, mes, dia)
+
+            descripcion = f"{aleatorio.choice(descripciones)} {aleatorio.choice(PROVEEDORES)}"
+            if categoria == 'Nómina':
+                descripcion = f"{descripcion} {NOMBRES_MES[mes - 1]}"
+            elif aleatorio.random() < 0.3:
+                descripcion = f"{descripcion} factura {aleatorio.randrange(1000, 99999)}"
+
+            monto = generar_monto(aleatorio, tipico, dispersion)
+            estado, fecha_pago, usuario = fila_pago(aleatorio, fecha, referencia)
+
+            tiene_descuento, limite_descuento, porcentaje, monto_descuento = 0, None, 0, 0
+            if aleatorio.random() < 0.04:
+                tiene_descuento = 1
+                limite_descuento = (fecha - timedelta(days=10)).isoformat()
+                porcentaje = aleatorio.choice((5, 10))
+                monto_descuento = round(monto * porcentaje / 100, 2)
+
+            observaciones = None
+            if aleatorio.random() < 0.1:
+                observaciones = aleatorio.choice(('Pagar por transferencia', 'Pedir factura electrónica',
+                                                  'Verificar con gerencia', 'Cuenta de cobro pendiente'))
+
+            yield (descripcion, monto, fecha.isoformat(), categoria, etiqueta, estado,
+                   tiene_descuento, limite_descuento, porcentaje, monto_descuento,
+                   usuario, fecha_pago, observaciones, 0, None)
+
+
+def generar_series_recurrentes(aleatorio, referencia, anios):
+    """
+    Una fila por mes para cada serie: las anteriores a la referencia
+    pagadas y la siguiente pendiente, como quedan al pagarlas en el panel.
+    """
+    for descripcion, categoria, etiqueta, monto, dia in SERIES_RECURRENTES:
+        if etiqueta not in ETIQUETAS:
+            continue
+        for anio, mes in meses_del_rango(referencia, anios):
+            fecha = date(anio, mes, min(dia, calendar.monthrange(anio, mes)[1]))
+            if fecha >= referencia:
+                estado, fecha_pago, usuario = 'Pendiente', None, None
+            else:
+                estado = 'Pagado'
+                fecha_pago = f"{fecha.isoformat()} 09:00:00"
+                usuario = aleatorio.choice(USUARIOS)
+            # Ajustes de precio una vez al año
+            monto_mes = round(monto * 1.07 ** (anio - referencia.year), -2)
+            yield (descripcion, monto_mes, fecha.isoformat(), categoria, etiqueta, estado,
+                   0, None, 0, 0, usuario, fecha_pago, None, 1, 'Mensual')
+            if estado == 'Pendiente':
+                break
+
+
+SQL_INSERTAR_EGRESO = '''
+    INSERT INTO Egresos (descripcion, monto, fecha_vencimiento, categoria, etiqueta, estado,
+                         tiene_descuento, fecha_limite_descuento, porcentaje_descuento, monto_descuento,
+                         usuario_que_pago, fecha_pago, observaciones, es_recurrente, frecuencia)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def generar_templates(aleatorio, egresos, meses):
+    """
+    Un template por categoría y etiqueta, con montos especiales en nómina.
+    El monto base es el gasto esperado de un mes promedio (cantidad por
+    media log-normal), entre 10% por debajo y 20% por encima.
+    """
+    templates = []
+    total_categorias = sum(peso for peso, _, _, _ in CATEGORIAS.values())
+    pesos_etq = pesos_etiquetas()
+    for categoria, (peso, tipico, dispersion, _) in CATEGORIAS.items():
+        for etiqueta, peso_etiqueta in zip(ETIQUETAS, pesos_etq):
+            cantidad_mes = egresos / meses * peso / total_categorias * peso_etiqueta / sum(pesos_etq)
+            esperado = cantidad_mes * tipico * math.exp(dispersion ** 2 / 2)
+            base = max(round(esperado * aleatorio.uniform(0.9, 1.2), -3), 100000.0)
+            especiales = (round(base * 1.5, -3), round(base * 1.5, -3), round(base * 2, -3)) \
+                if categoria == 'Nómina' else (None, None, None)
+            templates.append((categoria, etiqueta, base, *especiales, 'Generado para pruebas de volumen'))
+    return templates
+
+
+def generar_presupuestos(aleatorio, templates, referencia, anios):
+    """
+    Presupuestos mensuales desde los templates, hasta el mes anterior a la
+    referencia (el del mes actual lo crea crear_presupuestos_automaticos.py).
+    Siguen el crecimiento del gasto: cada mes se ajusta por su volumen
+    esperado frente al promedio.
+    """
+    meses = meses_del_rango(referencia, anios)
+    pesos = pesos_meses(meses)
+    promedio = sum(pesos) / len(pesos)
+    for (anio, mes), peso in list(zip(meses, pesos))[:anios * 12 - 1]:
+        for template_id, (categoria, etiqueta, base, febrero, junio, diciembre, _) in enumerate(templates, start=1):
+            monto = ({2: febrero, 6: junio, 12: diciembre}.get(mes) or base) * peso / promedio
+            yield (mes, anio, categoria, etiqueta, round(monto * aleatorio.uniform(0.95, 1.05), -3), template_id)
+
+
+def generar_clientes(aleatorio, cantidad):
+    for i in range(1, cantidad + 1):
+        nombre = f"{aleatorio.choice(NOMBRES)} {aleatorio.choice(APELLIDOS)} {aleatorio.choice(APELLIDOS)}"
+        usuario_correo = nombre.lower().replace(' ', '.').translate(str.maketrans('áéíóú', 'aeiou'))
+        grupo = f"Familia {aleatorio.choice(APELLIDOS)}" if aleatorio.random() < 0.4 else None
+        yield (nombre, f"CLI-{i:06d}", str(aleatorio.randrange(10000000, 1999999999)),
+               f"Calle {aleatorio.randrange(1, 200)} # {aleatorio.randrange(1, 100)}-{aleatorio.randrange(1, 99)}",
+               f"3{aleatorio.randrange(100000000, 999999999)}", aleatorio.choice(CIUDADES),
+               f"{usuario_correo}{i}@correo.com", grupo, 1 if grupo and aleatorio.random() < 0.5 else 0, None)
+
+
+def generar_cuentas_cobro(aleatorio, clientes, referencia, anios):
+    numero = 0
+    for cliente_id in range(1, clientes + 1):
+        for _ in range(aleatorio.randrange(0, 7)):
+            numero += 1
+            emision = referencia - timedelta(days=aleatorio.randrange(anios * 365))
+            estado = 'Pagada' if emision < referencia - timedelta(days=60) or aleatorio.random() < 0.5 else 'Pendiente'
+            yield (cliente_id, f"CXC-{numero:07d}", round(aleatorio.lognormvariate(math.log(350000), 0.6), -3),
+                   emision.isoformat(), estado)
+
+
+def generar_tareas(aleatorio, cantidad, clientes, referencia, anios):
+    for _ in range(cantidad):
+        vencimiento = referencia + timedelta(days=aleatorio.randrange(-anios * 365, 60))
+        categoria = aleatorio.choice(CATEGORIAS_TAREAS)
+        cliente = f"Cliente CLI-{aleatorio.randrange(1, clientes + 1):06d}" if categoria == 'Cliente' else None
+        if vencimiento < referencia and aleatorio.random() < 0.95:
+            estado, completado = 'Completada', f"{vencimiento.isoformat()} 17:00:00"
+        else:
+            estado, completado = 'Pendiente', None
+        yield (f"{aleatorio.choice(TAREAS)} {aleatorio.choice(APELLIDOS)}", vencimiento.isoformat(),
+               aleatorio.choices(('Alta', 'Media', 'Baja'), weights=(2, 5, 3))[0], categoria, cliente,
+               estado, f"{vencimiento.isoformat()} 08:00:00", completado)
+
+
+def crear_esquema_vacio(ruta):
+    """Tablas de una instalación nueva (los mismos scripts que usa la instalación)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicializar_bd(ruta)
+        migrar_sistema_templates(ruta)
+        corregir_tabla(ruta)
+
+
+def generar_base(ruta=RUTA_SINTETICA, egresos=100000, anios=10, semilla=42, referencia=None,
+                 reemplazar=False):
+    """
+    Crea la base sintética en `ruta` y retorna un resumen con las
+    cantidades generadas. Los índices, triggers y el índice de búsqueda
+    se crean al final (asegurar_esquema), después de cargar los datos.
+    """
+    referencia = referencia or date.today()
+    if os.path.abspath(ruta) == os.path.abspath(DATABASE_PATH):
+        raise ValueError("No se puede generar sobre la base de datos real")
+    if os.path.exists(ruta):
+        if not reemplazar:
+            raise FileExistsError(f"{ruta} ya existe (use --reemplazar)")
+        for sufijo in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(ruta + sufijo):
+                os.remove(ruta + sufijo)
+
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+
+    inicio = time.perf_counter()
+    aleatorio = random.Random(semilla)
+    crear_esquema_vacio(ruta)
+
+    conn = sqlite3.connect(ruta)
+    try:
+        # Carga masiva: sin diario ni sincronización, la base se puede regenerar
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+
+        series = list(generar_series_recurrentes(aleatorio, referencia, anios))
+        conn.executemany(SQL_INSERTAR_EGRESO, generar_egresos(aleatorio, max(egresos - len(series), 0),
+                                                              referencia, anios))
+        conn.executemany(SQL_INSERTAR_EGRESO, series)
+
+        templates = generar_templates(aleatorio, egresos, anios * 12)
+        conn.executemany('''
+            INSERT INTO PresupuestosTemplates (categoria, etiqueta, monto_base, monto_febrero,
+                                               monto_junio, monto_diciembre, observaciones)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', templates)
+        conn.executemany('''
+            INSERT INTO Presupuestos (mes, anio, categoria, etiqueta, monto_presupuestado,
+                                      template_id, creado_automaticamente)
+            VALUES (?, ?, ?, ?, ?, ?, 1)
+        ''', generar_presupuestos(aleatorio, templates, referencia, anios))
+
+        clientes = max(egresos // 500, 200)
+        conn.executemany('''
+            INSERT INTO Clientes (nombre_completo, codigo_cliente, nit_cc, direccion, telefonos, ciudad,
+                                  correo_electronico, grupo_familiar, es_titular, observaciones)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', generar_clientes(aleatorio, clientes))
+        conn.executemany('''
+            INSERT INTO CuentasCobro (cliente_id, numero_cxc, valor, fecha_emision, estado)
+            VALUES (?, ?, ?, ?, ?)
+        ''', generar_cuentas_cobro(aleatorio, clientes, referencia, anios))
+        conn.executemany('''
+            INSERT INTO Tareas (descripcion, fecha_vencimiento, prioridad, categoria, cliente_relacionado,
+                                estado, fecha_creacion, fecha_completado)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', generar_tareas(aleatorio, max(egresos // 100, 500), clientes, referencia, anios))
+        conn.commit()
+
+        # Índices, triggers (que recalculan monto_gastado) y búsqueda de una vez
+        asegurar_esquema(conn)
+        conn.execute("ANALYZE")
+        conn.commit()
+
+        conteos = {tabla: conn.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+                   for tabla in ('Egresos', 'Presupuestos', 'PresupuestosTemplates', 'Tareas',
+                                 'Clientes', 'CuentasCobro')}
+    finally:
+        conn.close()
+
+    return {
+        'ruta': ruta,
+        'semilla': semilla,
+        'anios': anios,
+        'fecha_referencia': referencia.isoformat(),
+        'conteos': conteos,
+        'tamano_mb': round(os.path.getsize(ruta) / 1024 / 1024, 1),
+        'duracion_s': round(time.perf_counter() - inicio, 1),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Genera una base de datos sintética para pruebas de volumen')
+    parser.add_argument('--egresos', type=int, default=100000, help='Cantidad de egresos (100.000 a 5.000.000)')
+    parser.add_argument('--anios', type=int, default=10, help='Años de historial')
+    parser.add_argument('--semilla', type=int, default=42, help='Semilla (misma semilla = mismos datos)')
+    parser.add_argument('--hasta', type=leer_fecha, help='Fecha de referencia AAAA-MM-DD (por defecto hoy)')
+    parser.add_argument('--salida', default=RUTA_SINTETICA, help='Ruta de la base a crear')
+    parser.add_argument('--reemplazar', action='store_true', help='Borrar la base si ya existe')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🧪 GENERACIÓN DE DATOS SINTÉTICOS")
+    print("=" * 70)
+    print(f"Egresos: {args.egresos:,} · {args.anios} años · semilla {args.semilla}")
+
+    try:
+        resumen = generar_base(args.salida, args.egresos, args.anios, args.semilla, args.hasta, args.reemplazar)
+    except (ValueError, FileExistsError) as e:
+        print(f"❌ {e}")
+    else:
+        print(f"\n✅ Base creada: {resumen['ruta']} ({resumen['tamano_mb']} MB en {resumen['duracion_s']} s)")
+        print(f"   Fecha de referencia: {resumen['fecha_referencia']}")
+        for tabla, cantidad in resumen['conteos'].items():
+            print(f"   {tabla:<22} {cantidad:>10,}")
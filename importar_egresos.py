@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Importación masiva de gastos desde CSV o Excel
+Lee el archivo fila por fila, valida e inserta en lotes en una sola
+transacción (ver NUCLEO/motor_importacion.py). Los gastos que ya se
+importaron antes se omiten, así que se puede ejecutar varias veces.
+
+Uso: python importar_egresos.py archivo.csv|archivo.xlsx [--hoja NOMBRE]
+                                [--categoria NOMBRE] [--lote N] [--simular]
+"""
+
+import argparse
+import sqlite3
+from config import DATABASE_PATH
+from SISTEMA_CONTABLE.NUCLEO.esquema_db import asegurar_esquema
+from SISTEMA_CONTABLE.NUCLEO.motor_importacion import leer_archivo, importar_egresos
+
+
+def importar(ruta, hoja=None, categoria=None, tamano_lote=None, simular=False):
+    print("=" * 70)
+    print("📥 IMPORTACIÓN MASIVA DE GASTOS")
+    print("=" * 70)
+    print(f"Archivo: {ruta}{f' (hoja {hoja})' if hoja else ''}")
+    if simular:
+        print("Modo simulación: no se guardará nada")
+
+    conn = None
+    try:
+        conn = sqlite3.connect(DATABASE_PATH)
+        asegurar_esquema(conn)
+
+        filas = leer_archivo(ruta, ruta, hoja)
+        resultado = importar_egresos(conn, filas, tamano_lote, simular, categoria)
+
+        print(f"\n📄 Filas leídas:        {resultado['leidas']:,}")
+        print(f"✅ Insertadas:          {resultado['insertadas']:,}")
+        print(f"⏭️  Omitidas (repetidas): {resultado['omitidas']:,}")
+        print(f"❌ Rechazadas:          {resultado['rechazadas']:,}")
+        print(f"⏱️  {resultado['duracion_ms'] / 1000:.2f} s ({resultado['filas_por_segundo']:,} filas/s)")
+
+        if resultado['errores']:
+            print("\nFilas rechazadas:")
+            for error in resultado['errores']:
+                print(f"   Fila {error['fila']}: {error['motivo']}")
+            if resultado['rechazadas'] > len(resultado['errores']):
+                print(f"   ... y {resultado['rechazadas'] - len(resultado['errores'])} más")
+
+        if resultado['meses_afectados'] and not simular:
+            meses = resultado['meses_afectados']
+            print(f"\nMeses afectados: {len(meses)} ({meses[0]} a {meses[-1]})")
+
+    except (ValueError, FileNotFoundError) as e:
+        print(f"❌ No se pudo importar: {e}")
+    except Exception as e:
+        print(f"❌ Error durante la importación: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Importa gastos desde un archivo CSV o Excel')
+    parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx')
+    parser.add_argument('--hoja', help='Hoja del Excel (por defecto la primera)')
+    parser.add_argument('--categoria', help='Categoría para las filas que no traen una')
+    parser.add_argument('--lote', type=int, help='Filas por lote (por defecto IMPORTACION_TAMANO_LOTE)')
+    parser.add_argument('--simular', action='store_true', help='Validar sin guardar')
+    args = parser.parse_args()
+    importar(args.archivo, args.hoja, args.categoria, args.lote, args.simular)
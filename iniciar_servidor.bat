@@ -45,7 +45,7 @@ if not exist "SISTEMA_CONTABLE\DATOS\contabilidad.db" (
 echo ✅ Base de datos encontrada
 echo.
 echo ═══════════════════════════════════════════════════════════════
-echo     📡 Iniciando servidor Flask...
+echo     📡 Iniciando servidor de producción...
 echo ═══════════════════════════════════════════════════════════════
 echo.
 echo El servidor se iniciará en: http://localhost:8000
@@ -78,7 +78,7 @@ echo.
 echo ═══════════════════════════════════════════════════════════════
 echo.
 
-python SISTEMA_CONTABLE\MODULOS\panel_control\app.py
+python SISTEMA_CONTABLE\MODULOS\panel_control\servidor_produccion.py
 
 echo.
 echo.
@@ -1,10 +1,11 @@
 
 import sqlite3
 from datetime import date, timedelta
+from config import DATABASE_PATH
 
 def insertar_gastos_prueba():
     """Inserta algunos gastos de ejemplo en la base de datos para probar el dashboard."""
-    conn = sqlite3.connect('SISTEMA_CONTABLE/DATOS/contabilidad.db')
+    conn = sqlite3.connect(DATABASE_PATH)
     cursor = conn.cursor()
 
     hoy = date.today()
@@ -103,11 +103,11 @@ echo ═════════════════════════
 echo     📦 PASO 4: Instalando dependencias de Python...
 echo ═══════════════════════════════════════════════════════════════
 echo.
-echo Instalando Flask, OpenPyXL y Python-DateUtil...
+echo Instalando Flask, OpenPyXL, Python-DateUtil y NumPy...
 echo.
 
 python -m pip install --upgrade pip
-python -m pip install flask openpyxl python-dateutil
+python -m pip install flask openpyxl python-dateutil numpy
 
 if %errorlevel% neq 0 (
     echo ❌ Error al instalar dependencias
@@ -124,6 +124,7 @@ echo Verificando instalación...
 python -m pip list | findstr flask
 python -m pip list | findstr openpyxl
 python -m pip list | findstr python-dateutil
+python -m pip list | findstr numpy
 echo.
 
 :: =========================================
@@ -199,6 +200,8 @@ if %errorlevel% neq 0 (
     exit /b 1
 )
 
+python migrar_indices_egresos.py
+
 echo.
 echo ✅ Tablas de presupuestos creadas exitosamente
 echo.
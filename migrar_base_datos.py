@@ -1,4 +1,5 @@
 import sqlite3
+from config import DATABASE_PATH
 
 def migrar_base_datos():
     """
@@ -6,7 +7,7 @@ def migrar_base_datos():
     y crea las tablas nuevas si no existen.
     """
     try:
-        conn = sqlite3.connect('SISTEMA_CONTABLE/DATOS/contabilidad.db')
+        conn = sqlite3.connect(DATABASE_PATH)
         cursor = conn.cursor()
         
         print("Iniciando migración de base de datos...")
@@ -100,7 +101,8 @@ def migrar_base_datos():
             ('dias_alerta_critica', '3', 'Días para alertas críticas'),
             ('alertas_activas', '1', 'Sistema de alertas activado'),
             ('email_notificaciones', '', 'Email para notificaciones'),
-            ('flujo_minimo_caja', '2000000', 'Monto mínimo en caja para alertar')
+            ('flujo_minimo_caja', '2000000', 'Monto mínimo en caja para alertar'),
+            ('saldo_caja_actual', '0', 'Saldo actual en caja (punto de partida del flujo de caja)')
         ]
         
         for clave, valor, descripcion in configuraciones_default:
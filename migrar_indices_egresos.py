@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Migración: columnas anio/mes e índices en Egresos
+Reemplaza los filtros strftime() por búsquedas por índice
+"""
+
+import sqlite3
+from config import DATABASE_PATH
+from SISTEMA_CONTABLE.NUCLEO.esquema_db import asegurar_columnas_periodo, tabla_existe
+
+DATABASE = DATABASE_PATH
+
+def migrar_indices_egresos():
+    print("=" * 60)
+    print("MIGRACIÓN: Columnas de periodo e índices en Egresos")
+    print("=" * 60)
+
+    conn = None
+    try:
+        conn = sqlite3.connect(DATABASE)
+
+        if not tabla_existe(conn, 'Egresos'):
+            print("\n❌ No existe la tabla Egresos. Ejecuta primero migrar_base_datos.py")
+            return
+
+        cambios = asegurar_columnas_periodo(conn)
+        conn.commit()
+
+        if cambios:
+            for cambio in cambios:
+                print(f"  ✅ Creado: {cambio}")
+        else:
+            print("  ⏭️  Columnas e índices ya existen")
+
+        # Actualizar estadísticas para que el planificador use los índices
+        conn.execute("ANALYZE Egresos")
+        conn.commit()
+
+        print("\n✅ MIGRACIÓN COMPLETADA EXITOSAMENTE")
+
+    except Exception as e:
+        print(f"\n❌ Error durante la migración: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+if __name__ == '__main__':
+    migrar_indices_egresos()
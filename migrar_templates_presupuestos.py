@@ -1,12 +1,13 @@
 import sqlite3
 from datetime import datetime
+from config import DATABASE_PATH
 
-def migrar_sistema_templates():
+def migrar_sistema_templates(ruta_db=DATABASE_PATH):
     """
     Crea las tablas necesarias para el sistema de templates y categorías dinámicas.
     """
     try:
-        conn = sqlite3.connect('SISTEMA_CONTABLE/DATOS/contabilidad.db')
+        conn = sqlite3.connect(ruta_db)
         cursor = conn.cursor()
         
         print("=" * 60)
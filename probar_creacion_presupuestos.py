@@ -7,8 +7,9 @@ Ejecutar ANTES de automatizar para verificar que funciona correctamente
 
 import sqlite3
 from datetime import datetime
+from config import DATABASE_PATH
 
-DATABASE = 'SISTEMA_CONTABLE/DATOS/contabilidad.db'
+DATABASE = DATABASE_PATH
 
 def probar_creacion():
     """
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Script de PRUEBA de las respuestas condicionales (ETag / Last-Modified)
+Verifica que /api/alertas/resumen responda 304 sin ejecutar la ruta (solo
+lee la versión de las tablas) cuando el cliente ya tiene la versión
+vigente, y 200 cuando cambian los datos, también si los cambia otro proceso.
+Ejecutar desde la raíz del proyecto.
+
+No modifica la base configurada: la lee en modo solo lectura, la copia a
+una carpeta temporal y la app (asegurar_esquema incluido) y el UPDATE que
+sube la versión de Egresos trabajan sobre la copia.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join('SISTEMA_CONTABLE', 'MODULOS', 'panel_control'))
+
+from app import crear_app, DATABASE
+
+URL = '/api/alertas/resumen'
+
+def copiar_base(destino):
+    """Copia DATABASE a `destino` sin escribir en la original"""
+    origen = sqlite3.connect(f'file:{os.path.abspath(DATABASE)}?mode=ro', uri=True)
+    copia = sqlite3.connect(destino)
+    try:
+        origen.backup(copia)
+    finally:
+        copia.close()
+        origen.close()
+
+def probar_respuestas_condicionales(app, ruta_db):
+    print("=" * 70)
+    print("PRUEBA DE RESPUESTAS CONDICIONALES (ETag / Last-Modified)")
+    print("=" * 70)
+
+    cliente = app.test_client()
+    errores = 0
+
+    def usos_del_pool():
+        """Cuántas veces se ha pedido una conexión al pool"""
+        estadisticas = app.extensions['pool_conexiones'].estadisticas()
+        return estadisticas['aciertos'] + estadisticas['fallos']
+
+    def verificar(condicion, mensaje):
+        nonlocal errores
+        print(f"{'✅' if condicion else '❌'} {mensaje}")
+        if not condicion:
+            errores += 1
+
+    # 1. Primera petición: 200 con ETag y Last-Modified
+    respuesta = cliente.get(URL)
+    etag = respuesta.headers.get('ETag')
+    ultima_modificacion = respuesta.headers.get('Last-Modified')
+    verificar(respuesta.status_code == 200, f"Primera petición: {respuesta.status_code}")
+    verificar(etag is not None, f"ETag: {etag}")
+    verificar(ultima_modificacion is not None, f"Last-Modified: {ultima_modificacion}")
+
+    # 2. Misma versión: 304 con una sola conexión, solo para leer la versión
+    antes = usos_del_pool()
+    respuesta = cliente.get(URL, headers={'If-None-Match': etag})
+    verificar(respuesta.status_code == 304, f"Con If-None-Match vigente: {respuesta.status_code}")
+    verificar(usos_del_pool() - antes <= 1, "El 304 solo leyó la versión de las tablas")
+    verificar(respuesta.data == b'', "El 304 no tiene cuerpo")
+
+    # 3. If-Modified-Since con la fecha recibida también da 304
+    respuesta = cliente.get(URL, headers={'If-Modified-Since': ultima_modificacion})
+    verificar(respuesta.status_code == 304, f"Con If-Modified-Since vigente: {respuesta.status_code}")
+
+    # 4. Otro proceso cambia los Egresos (aquí, otra conexión sin pasar por
+    # el panel): el trigger sube la versión y el ETag anterior deja de servir
+    otra = sqlite3.connect(ruta_db)
+    try:
+        otra.execute("UPDATE Egresos SET estado = estado WHERE id = (SELECT MIN(id) FROM Egresos)")
+        otra.commit()
+    finally:
+        otra.close()
+    respuesta = cliente.get(URL, headers={'If-None-Match': etag})
+    verificar(respuesta.status_code == 200, f"Tras un cambio externo en Egresos: {respuesta.status_code}")
+    verificar(respuesta.headers.get('ETag') != etag,
+              f"ETag nuevo: {respuesta.headers.get('ETag')}")
+
+    print("\n" + "=" * 70)
+    if errores:
+        print(f"❌ {errores} verificaciones fallaron")
+    else:
+        print("✅ Todas las verificaciones pasaron")
+    print("=" * 70)
+    return errores == 0
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_copia = os.path.join(carpeta, 'contabilidad.db')
+        copiar_base(ruta_copia)
+        app = crear_app(ruta_copia)
+        try:
+            correcto = probar_respuestas_condicionales(app, ruta_copia)
+        finally:
+            app.extensions['tendencias'].detener()
+            app.extensions['trabajos'].detener()
+            app.extensions['pool_conexiones'].cerrar_todas()
+    sys.exit(0 if correcto else 1)
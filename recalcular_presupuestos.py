@@ -1,68 +1,95 @@
+import sys
 import sqlite3
+from config import DATABASE_PATH
+from SISTEMA_CONTABLE.NUCLEO.esquema_db import asegurar_esquema
+from SISTEMA_CONTABLE.NUCLEO.motor_presupuestos import (recalcular_presupuestos, listar_presupuestos,
+                                                       verificar_consistencia)
 
-def recalcular_todos_presupuestos():
+def leer_periodo(texto):
+    """Convierte 'YYYY-MM' en la tupla (anio, mes)"""
+    anio, mes = texto.split('-')
+    return int(anio), int(mes)
+
+def recalcular_todos_presupuestos(desde=None, hasta=None):
     """
-    Recalcula el monto gastado de TODOS los presupuestos existentes
+    Recalcula el monto gastado de los presupuestos existentes
     basándose en los gastos PAGADOS.
+    Sin rango recalcula TODO el historial; desde/hasta son tuplas (anio, mes).
     """
+    conn = None
     try:
-        conn = sqlite3.connect('SISTEMA_CONTABLE/DATOS/contabilidad.db')
-        cursor = conn.cursor()
-        
+        conn = sqlite3.connect(DATABASE_PATH)
+        asegurar_esquema(conn)
+
         print("Recalculando todos los presupuestos...")
-        
-        # Obtener todos los presupuestos
-        presupuestos = cursor.execute('''
-            SELECT id, mes, anio, categoria, etiqueta, monto_presupuestado 
-            FROM Presupuestos
-        ''').fetchall()
-        
-        if not presupuestos:
+
+        # Recalcular en una sola sentencia (ver NUCLEO/motor_presupuestos.py)
+        resultado = recalcular_presupuestos(conn, desde, hasta)
+
+        if not resultado['evaluados']:
             print("❌ No hay presupuestos creados aún.")
             return
-        
-        print(f"\nEncontrados {len(presupuestos)} presupuestos para actualizar:\n")
-        
-        for presupuesto in presupuestos:
-            p_id, mes, anio, categoria, etiqueta, presupuestado = presupuesto
-            
-            # Calcular el total gastado (solo PAGADOS) para esa categoría
-            resultado = cursor.execute('''
-                SELECT COALESCE(SUM(monto), 0) as total
-                FROM Egresos
-                WHERE categoria = ? 
-                AND etiqueta = ? 
-                AND estado = 'Pagado'
-                AND strftime('%m', fecha_vencimiento) = ?
-                AND strftime('%Y', fecha_vencimiento) = ?
-            ''', (categoria, etiqueta, f"{mes:02d}", str(anio))).fetchone()
-            
-            monto_gastado = resultado[0]
-            
-            # Actualizar el presupuesto
-            cursor.execute('''
-                UPDATE Presupuestos 
-                SET monto_gastado = ?
-                WHERE id = ?
-            ''', (monto_gastado, p_id))
-            
+
+        print(f"\nEncontrados {resultado['evaluados']} presupuestos para actualizar:\n")
+
+        for presupuesto in listar_presupuestos(conn, desde, hasta):
+            mes, anio, categoria, etiqueta, presupuestado, monto_gastado = presupuesto
+
             porcentaje = (monto_gastado / presupuestado * 100) if presupuestado > 0 else 0
             estado = "🚨 EXCEDIDO" if porcentaje > 100 else ("⚠️ CERCA" if porcentaje > 80 else "✅ OK")
-            
+
             print(f"{estado} | {mes:02d}/{anio} | {categoria} - {etiqueta}")
             print(f"   Presupuestado: ${presupuestado:,.0f}")
             print(f"   Gastado: ${monto_gastado:,.0f} ({porcentaje:.1f}%)")
             print()
-        
-        conn.commit()
-        print(f"✅ {len(presupuestos)} presupuestos actualizados correctamente!")
+
+        print(f"✅ {resultado['evaluados']} presupuestos revisados, "
+              f"{resultado['actualizados']} con cambios ({resultado['duracion_ms']:.1f} ms)")
         print("\nAhora recarga la página de Presupuestos para ver los cambios.")
-        
+
     except Exception as e:
         print(f"❌ Error al recalcular presupuestos: {e}")
     finally:
         if conn:
             conn.close()
 
+def verificar_presupuestos():
+    """
+    Compara los montos mantenidos por los triggers contra un recálculo
+    completo, sin modificar nada. Retorna True si todo coincide.
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(DATABASE_PATH)
+        asegurar_esquema(conn)
+
+        print("Verificando consistencia de presupuestos...")
+        diferencias = verificar_consistencia(conn)
+
+        if not diferencias:
+            print("✅ Todos los presupuestos coinciden con el recálculo completo.")
+            return True
+
+        for d in diferencias:
+            print(f"🚨 {d['mes']:02d}/{d['anio']} | {d['categoria']} - {d['etiqueta']}")
+            print(f"   Registrado: ${d['registrado']:,.0f} | Calculado: ${d['calculado']:,.0f}")
+        print(f"\n⚠️  {len(diferencias)} presupuestos con diferencias. "
+              f"Ejecuta este script sin --verificar para corregirlos.")
+        return False
+
+    except Exception as e:
+        print(f"❌ Error al verificar presupuestos: {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+
 if __name__ == '__main__':
-    recalcular_todos_presupuestos()
\ No newline at end of file
+    # Uso: python recalcular_presupuestos.py [YYYY-MM [YYYY-MM]]
+    #      python recalcular_presupuestos.py --verificar   (sale con 1 si hay diferencias)
+    argumentos = sys.argv[1:]
+    if argumentos and argumentos[0] == '--verificar':
+        sys.exit(0 if verificar_presupuestos() else 1)
+    desde = leer_periodo(argumentos[0]) if len(argumentos) > 0 else None
+    hasta = leer_periodo(argumentos[1]) if len(argumentos) > 1 else desde
+    recalcular_todos_presupuestos(desde, hasta)
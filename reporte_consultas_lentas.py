@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Reporte de Consultas Lentas
+Agrupa por forma (literales como ?) las sentencias guardadas en la tabla
+ConsultasLentas por el panel y los scripts, de la que más tiempo suma a
+la que menos. Marca con ⚠️ las que recorren completas Egresos o
+Presupuestos, que suelen ser un índice que falta.
+
+Uso: python reporte_consultas_lentas.py [--desde AAAA-MM-DD] [--solo-escaneos]
+                                        [--limite N] [--limpiar]
+"""
+
+import argparse
+import json
+import sqlite3
+from config import DATABASE_PATH
+from SISTEMA_CONTABLE.NUCLEO.motor_consultas_lentas import resumen_por_forma, asegurar_tabla
+from SISTEMA_CONTABLE.NUCLEO.motor_configuracion import obtener
+
+
+def mostrar_reporte(desde=None, solo_escaneos=False, limite=20):
+    print("=" * 70)
+    print("🐢 REPORTE DE CONSULTAS LENTAS")
+    print("=" * 70)
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        umbral = obtener('CONSULTAS_LENTAS_UMBRAL_MS', conn)
+        if umbral:
+            print(f"Umbral actual: {umbral} ms")
+        else:
+            print("⚠️  El registro está apagado (CONSULTAS_LENTAS_UMBRAL_MS = 0)")
+        formas = resumen_por_forma(conn, desde, solo_escaneos)
+    finally:
+        conn.close()
+
+    if not formas:
+        print("\n✅ No hay consultas lentas registradas")
+        return
+
+    total_registros = sum(f['veces'] for f in formas)
+    con_escaneo = sum(1 for f in formas if f['escaneo_completo'])
+    print(f"\n{total_registros:,} registros en {len(formas)} formas de consulta"
+          f" ({con_escaneo} con recorrido completo de tabla)")
+
+    for numero, forma in enumerate(formas[:limite], start=1):
+        print("\n" + "-" * 70)
+        marca = f"⚠️  SCAN {forma['tablas_escaneadas']} " if forma['escaneo_completo'] else ""
+        print(f"#{numero} {marca}· {forma['veces']} veces · total {forma['total_ms']:,.1f} ms"
+              f" · prom {forma['promedio_ms']:,.1f} ms · máx {forma['max_ms']:,.1f} ms")
+        print(f"   Origen: {forma['origenes']}")
+        print(f"   Entre {forma['primera']} y {forma['ultima']}")
+        print(f"   SQL: {forma['forma']}")
+        if forma['parametros_mas_lenta'] and forma['parametros_mas_lenta'] != '[]':
+            parametros = json.loads(forma['parametros_mas_lenta'])
+            print(f"   Parámetros (ejecución más lenta): {parametros}")
+        if forma['plan']:
+            print("   Plan:")
+            for linea in forma['plan'].splitlines():
+                print(f"      {linea}")
+
+    if len(formas) > limite:
+        print(f"\n... y {len(formas) - limite} formas más (--limite para ver más)")
+
+
+def limpiar_registro():
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        asegurar_tabla(conn)
+        borrados = conn.execute("DELETE FROM ConsultasLentas").rowcount
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"🗑️  Se borraron {borrados:,} registros de consultas lentas")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Muestra las consultas lentas agrupadas por forma')
+    parser.add_argument('--desde', help='Solo registros desde esta fecha (AAAA-MM-DD)')
+    parser.add_argument('--solo-escaneos', action='store_true',
+                        help='Solo consultas que recorren completas Egresos o Presupuestos')
+    parser.add_argument('--limite', type=int, default=20, help='Formas de consulta a mostrar')
+    parser.add_argument('--limpiar', action='store_true', help='Borrar el registro')
+    args = parser.parse_args()
+
+    if args.limpiar:
+        limpiar_registro()
+    else:
+        mostrar_reporte(args.desde, args.solo_escaneos, args.limite)